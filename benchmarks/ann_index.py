@@ -0,0 +1,94 @@
+"""Recall-vs-latency benchmark of the ANN index against exact search.
+
+Samples stored embeddings as queries, computes exact top-k neighbours with
+index scans disabled, then sweeps ``hnsw.ef_search`` (or ``ivfflat.probes``)
+and reports recall@k and latency for each value.
+
+Usage:
+    python -m benchmarks.ann_index --queries 100 --k 10 --values 10 20 40 80 160
+"""
+
+import argparse
+import statistics
+import time
+
+from sqlalchemy import text
+
+from src.database import db_manager
+from src.models_gen.Agentic_CoT_RAG.config import vector_index_config
+from src.models_gen.Agentic_CoT_RAG.index import (
+    DISTANCE_OPERATORS,
+    EMBEDDING_TABLE,
+    search_settings_scope,
+)
+
+from .common import collection_id as get_collection_id, percentile, sample_queries
+
+
+def _knn_query() -> text:
+    """Build the k-nearest-neighbour query for the configured distance."""
+    operator = DISTANCE_OPERATORS[vector_index_config["distance"]]
+    return text(
+        f"SELECT id FROM {EMBEDDING_TABLE} "
+        "WHERE collection_id = :collection_id "
+        f"ORDER BY embedding {operator} CAST(:query AS vector) LIMIT :k"
+    )
+
+
+def run(num_queries: int, k: int, values) -> None:
+    """
+    Run the benchmark and print a results table.
+
+    Args:
+        num_queries: Number of stored embeddings to sample as queries
+        k: Number of neighbours per query
+        values: ef_search (HNSW) or probes (IVFFlat) values to sweep
+    """
+    db_manager.initialize()
+    method = vector_index_config["method"]
+    setting = "hnsw_ef_search" if method == "hnsw" else "ivfflat_probes"
+    query = _knn_query()
+
+    with db_manager._engine.connect() as conn:
+        collection_id = get_collection_id(conn)
+        queries = sample_queries(conn, num_queries)
+        conn.commit()
+
+        # Ground truth: exact search with index scans disabled
+        exact = []
+        with conn.begin():
+            conn.execute(text("SET LOCAL enable_indexscan = off"))
+            exact_latencies = []
+            for embedding in queries:
+                started = time.perf_counter()
+                ids = conn.execute(query, {"collection_id": collection_id, "query": embedding, "k": k}).scalars().all()
+                exact_latencies.append(time.perf_counter() - started)
+                exact.append(set(ids))
+
+        print(f"method={method} queries={len(queries)} k={k}")
+        print(f"{'setting':>18} {'recall@k':>9} {'p50 ms':>8} {'p95 ms':>8}")
+        print(f"{'exact':>18} {1.0:>9.3f} {statistics.median(exact_latencies) * 1000:>8.2f} "
+              f"{percentile(exact_latencies, 0.95) * 1000:>8.2f}")
+
+        for value in values:
+            latencies = []
+            recalls = []
+            with conn.begin():
+                with search_settings_scope(conn, **{setting: value}):
+                    for embedding, truth in zip(queries, exact):
+                        started = time.perf_counter()
+                        ids = conn.execute(query, {"collection_id": collection_id, "query": embedding, "k": k}).scalars().all()
+                        latencies.append(time.perf_counter() - started)
+                        recalls.append(len(truth.intersection(ids)) / max(len(truth), 1))
+            print(f"{setting + '=' + str(value):>18} {statistics.mean(recalls):>9.3f} "
+                  f"{statistics.median(latencies) * 1000:>8.2f} {percentile(latencies, 0.95) * 1000:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=100, help="Number of sampled queries")
+    parser.add_argument("--k", type=int, default=10, help="Neighbours per query")
+    parser.add_argument("--values", type=int, nargs="+", default=[10, 20, 40, 80, 160],
+                        help="ef_search / probes values to sweep")
+    args = parser.parse_args()
+    run(args.queries, args.k, args.values)
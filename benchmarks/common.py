@@ -0,0 +1,61 @@
+"""Shared helpers for the vector collection benchmarks."""
+
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from src.models_gen.Agentic_CoT_RAG.config import vectorstore_config
+from src.models_gen.Agentic_CoT_RAG.index import COLLECTION_TABLE, EMBEDDING_TABLE
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    Get a percentile of a list of values.
+
+    Args:
+        values: Observed values
+        fraction: Percentile as a fraction (e.g. 0.95)
+
+    Returns:
+        float: The percentile value
+    """
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def collection_id(conn: Connection) -> str:
+    """
+    Get the UUID of the configured collection.
+
+    Args:
+        conn: Database connection
+
+    Returns:
+        str: Collection UUID
+    """
+    return conn.execute(
+        text(f"SELECT uuid FROM {COLLECTION_TABLE} WHERE name = :name"),
+        {"name": vectorstore_config["collection_name"]},
+    ).scalar()
+
+
+def sample_queries(conn: Connection, num_queries: int) -> List[str]:
+    """
+    Sample stored embeddings (pgvector text form) to use as queries.
+
+    Args:
+        conn: Database connection
+        num_queries: Number of embeddings to sample
+
+    Returns:
+        list: Sampled embeddings
+    """
+    return conn.execute(
+        text(
+            f"SELECT embedding::text FROM {EMBEDDING_TABLE} "
+            f"WHERE collection_id = (SELECT uuid FROM {COLLECTION_TABLE} WHERE name = :name) "
+            "ORDER BY random() LIMIT :n"
+        ),
+        {"name": vectorstore_config["collection_name"], "n": num_queries},
+    ).scalars().all()
@@ -0,0 +1,135 @@
+"""Turn latency benchmark of parallel tool calls in the agent.
+
+Runs the agent graph (real ``keywords_search`` tool, state schema and tool
+execution) on a simulated backend: the chat model answers after a fixed
+latency with 1-5 ``keywords_search`` calls in one turn, then the final
+answer, and each search takes a fixed latency instead of querying the
+database and summarizer. Each turn is timed with the calls run one at a
+time (cap 1) and with the per-request cap.
+
+Usage:
+    python -m benchmarks.parallel_tools --runs 5 --search-latency 0.5
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Any, List
+
+from langchain_core.language_models.chat_models import BaseChatModel, agenerate_from_stream, generate_from_stream
+from langchain_core.messages import AIMessageChunk, ToolMessage
+from langchain_core.outputs import ChatGenerationChunk
+from langgraph.prebuilt import create_react_agent
+from langgraph.types import Command
+
+from src.models_gen.Agentic_CoT_RAG import tool
+from src.models_gen.Agentic_CoT_RAG.config import parallel_tool_config
+from src.models_gen.Agentic_CoT_RAG.state import AgenticCoTRAGState
+
+
+class SimulatedChatModel(BaseChatModel):
+    """Chat model calling keywords_search ``calls`` times in its first turn, then answering."""
+
+    calls: int
+    latency: float
+    turns: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "simulated"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _reply(self) -> AIMessageChunk:
+        """Get the reply of the next turn: the tool calls first, then the answer."""
+        self.turns += 1
+        if self.turns == 1:
+            tool_calls = [
+                {"name": "keywords_search", "args": f'{{"keywords": "query {index}"}}', "id": f"call{index}", "index": index}
+                for index in range(self.calls)
+            ]
+            return AIMessageChunk(content="", tool_call_chunks=tool_calls)
+        return AIMessageChunk(content="answer")
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        return generate_from_stream(iter([ChatGenerationChunk(message=self._reply())]))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        yield ChatGenerationChunk(message=self._reply())
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        return await agenerate_from_stream(self._astream(messages, stop=stop, **kwargs))
+
+
+def _simulated_search(latency: float):
+    """Get a keywords_search backend answering after a fixed latency."""
+    async def run_search(keywords: str, title: Any, department: Any, tool_call_id: str) -> Command:
+        await asyncio.sleep(latency)
+        return Command(update={"messages": [ToolMessage(f"results for {keywords}", tool_call_id=tool_call_id)]})
+    return run_search
+
+
+async def _turn(calls: int, cap: int, model_latency: float) -> float:
+    """
+    Time one user turn with parallel tool calls.
+
+    Args:
+        calls: keywords_search calls in the model turn
+        cap: Concurrent searches per request
+        model_latency: Latency of each model call in seconds
+
+    Returns:
+        float: Turn latency in seconds
+    """
+    agent = create_react_agent(
+        model=SimulatedChatModel(calls=calls, latency=model_latency),
+        tools=[tool.keywords_search],
+        state_schema=AgenticCoTRAGState,
+    )
+    tool.limit_parallel_searches(cap)
+    started = time.perf_counter()
+    state = await agent.ainvoke({"messages": [{"role": "user", "content": "question"}]})
+    elapsed = time.perf_counter() - started
+
+    # Results are merged in tool call order, whatever order they finish in
+    order = [message.tool_call_id for message in state["messages"] if isinstance(message, ToolMessage)]
+    assert order == [f"call{index}" for index in range(calls)], order
+    return elapsed
+
+
+async def run(runs: int, search_latency: float, model_latency: float, cap: int, max_calls: int) -> None:
+    """
+    Time turns with 1 to ``max_calls`` parallel tool calls, capped at 1 and at ``cap``.
+
+    Args:
+        runs: Turns measured per configuration (median reported)
+        search_latency: Simulated latency of each search in seconds
+        model_latency: Simulated latency of each model call in seconds
+        cap: Concurrent searches per request
+        max_calls: Largest number of tool calls in one turn
+    """
+    tool._run_search = _simulated_search(search_latency)
+    print(f"{'calls':>5} {'sequential (s)':>15} {f'cap {cap} (s)':>12} {'speedup':>8}")
+    for calls in range(1, max_calls + 1):
+        results: List[List[float]] = [[], []]
+        for _ in range(runs):
+            results[0].append(await _turn(calls, 1, model_latency))
+            results[1].append(await _turn(calls, cap, model_latency))
+        sequential, parallel = (statistics.median(times) for times in results)
+        print(f"{calls:>5} {sequential:>15.3f} {parallel:>12.3f} {sequential / parallel:>7.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Turns measured per configuration (median reported)")
+    parser.add_argument("--search-latency", type=float, default=0.5, help="Simulated search latency in seconds")
+    parser.add_argument("--model-latency", type=float, default=0.2, help="Simulated model call latency in seconds")
+    parser.add_argument("--cap", type=int, default=parallel_tool_config["max_concurrency"],
+                        help="Concurrent searches per request")
+    parser.add_argument("--max-calls", type=int, default=5, help="Largest number of tool calls in one turn")
+    args = parser.parse_args()
+    asyncio.run(run(args.runs, args.search_latency, args.model_latency, args.cap, args.max_calls))
@@ -0,0 +1,75 @@
+"""First-request latency benchmark of the database pool warmup.
+
+Creates fresh ``DatabaseManager`` instances (as a new worker would), either
+cold or warmed up with ``DatabaseManager.warmup``, then times the first query
+and a first burst of ``pool_size`` concurrent queries on the async engine.
+
+Usage:
+    python -m benchmarks.pool_warmup --runs 5
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import text
+
+from src.database import DatabaseManager, db_settings
+
+
+async def _query(manager: DatabaseManager) -> float:
+    """Run one trivial query and return its latency in seconds."""
+    started = time.perf_counter()
+    async with manager.get_async_session() as session:
+        await session.execute(text("SELECT 1"))
+    return time.perf_counter() - started
+
+
+async def _measure(warm: bool) -> dict:
+    """
+    Time the first query and first burst of a fresh manager.
+
+    Args:
+        warm: Whether to warm up the pools before the first query
+
+    Returns:
+        dict: First query and burst latencies in seconds, and warmup time
+    """
+    manager = DatabaseManager()
+    manager.initialize()
+    warmup_seconds = 0.0
+    if warm:
+        started = time.perf_counter()
+        await manager.warmup()
+        warmup_seconds = time.perf_counter() - started
+    try:
+        first = await _query(manager)
+        burst = await asyncio.gather(*(_query(manager) for _ in range(db_settings.pool_size)))
+    finally:
+        await manager.close_async()
+    return {"first": first, "burst": max(burst), "warmup": warmup_seconds}
+
+
+async def run(runs: int) -> None:
+    """
+    Run the benchmark and print a results table.
+
+    Args:
+        runs: Fresh managers measured per mode
+    """
+    print(f"pool_size={db_settings.pool_size}, runs={runs}")
+    print(f"{'mode':>6} {'first ms':>10} {'burst max ms':>14} {'warmup ms':>11}")
+    for mode in ("cold", "warm"):
+        results = [await _measure(mode == "warm") for _ in range(runs)]
+        first = statistics.median(r["first"] for r in results) * 1000
+        burst = statistics.median(r["burst"] for r in results) * 1000
+        warmup = statistics.median(r["warmup"] for r in results) * 1000
+        print(f"{mode:>6} {first:10.2f} {burst:14.2f} {warmup:11.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh managers measured per mode (median reported)")
+    args = parser.parse_args()
+    asyncio.run(run(args.runs))
@@ -0,0 +1,121 @@
+"""Index size, latency and recall of quantized and dimension-reduced storage.
+
+For every storage format with a built ANN index (see ``migrate storage``),
+runs the production vector query (quantized scan plus full-precision
+re-rank) and compares it with exact float32 search. For reduced
+dimensions, text-embedding-3 vectors are truncated and re-normalized
+(equivalent to requesting fewer ``dimensions``) and exact search over them
+is compared with full-dimension exact search; sizes are projected.
+
+Usage:
+    python -m benchmarks.quantization --queries 100 --k 10 --dimensions 256 512 1024
+"""
+
+import argparse
+import statistics
+import time
+
+from sqlalchemy import text
+
+from src.database import db_manager
+from src.models_gen.Agentic_CoT_RAG.config import vectorstore_config
+from src.models_gen.Agentic_CoT_RAG.index import (
+    EMBEDDING_TABLE,
+    STORAGE_FORMATS,
+    validate_vector_index,
+)
+from src.models_gen.Agentic_CoT_RAG.retrieval import vector_candidates_sql
+
+from .common import collection_id as get_collection_id, percentile, sample_queries
+
+# Bytes per stored embedding, excluding the 8-byte varlena header
+BYTES_PER_DIMENSION = {"vector": 4, "halfvec": 2, "binary": 1 / 8}
+
+WHERE = "collection_id = CAST(:collection_id AS uuid)"
+
+
+def _run_queries(conn, statement, queries, params):
+    """Run a query per embedding, returning result id sets and latencies."""
+    results, latencies = [], []
+    for embedding in queries:
+        started = time.perf_counter()
+        ids = conn.execute(statement, {**params, "embedding": embedding}).scalars().all()
+        latencies.append(time.perf_counter() - started)
+        results.append(set(ids))
+    return results, latencies
+
+
+def _recall(results, truth):
+    """Mean recall of result sets against ground-truth sets."""
+    return statistics.mean(len(r & t) / max(len(t), 1) for r, t in zip(results, truth))
+
+
+def run(num_queries: int, k: int, rerank_factor: int, dimensions) -> None:
+    """
+    Run the benchmark and print a results table.
+
+    Args:
+        num_queries: Number of stored embeddings to sample as queries
+        k: Number of neighbours per query
+        rerank_factor: Candidates fetched from quantized indexes per result
+        dimensions: Reduced dimensions to evaluate
+    """
+    db_manager.initialize()
+    full_dimensions = int(vectorstore_config["embedding_length"])
+
+    with db_manager._engine.connect() as conn:
+        collection_id = get_collection_id(conn)
+        rows = conn.execute(
+            text(f"SELECT count(*) FROM {EMBEDDING_TABLE} WHERE {WHERE}"), {"collection_id": collection_id}
+        ).scalar()
+        queries = sample_queries(conn, num_queries)
+        conn.commit()
+        params = {"collection_id": collection_id, "k": k, "rerank_factor": rerank_factor}
+
+        # Ground truth: exact float32 search
+        exact_query = text(f"SELECT id FROM ({vector_candidates_sql(WHERE, ':k', 'vector')}) v")
+        with conn.begin():
+            conn.execute(text("SET LOCAL enable_indexscan = off"))
+            truth, exact_latencies = _run_queries(conn, exact_query, queries, params)
+
+        print(f"rows={rows} queries={len(queries)} k={k} rerank_factor={rerank_factor}")
+        print(f"{'option':>16} {'index MB':>9} {'vectors MB':>11} {'recall@k':>9} {'p50 ms':>8} {'p95 ms':>8}")
+        print(f"{'exact float32':>16} {'-':>9} {rows * (4 * full_dimensions + 8) / 1e6:>11.1f} {1.0:>9.3f} "
+              f"{statistics.median(exact_latencies) * 1000:>8.2f} {percentile(exact_latencies, 0.95) * 1000:>8.2f}")
+
+        for storage in STORAGE_FORMATS:
+            report = validate_vector_index(conn, storage=storage)
+            conn.commit()
+            if report["status"] != "ok":
+                print(f"{storage:>16} (no valid index: {report['status']})")
+                continue
+            statement = text(f"SELECT id FROM ({vector_candidates_sql(WHERE, ':k', storage)}) v")
+            results, latencies = _run_queries(conn, statement, queries, params)
+            conn.commit()
+            vector_bytes = rows * (BYTES_PER_DIMENSION[storage] * full_dimensions + 8)
+            print(f"{storage:>16} {report['size_bytes'] / 1e6:>9.1f} {vector_bytes / 1e6:>11.1f} "
+                  f"{_recall(results, truth):>9.3f} {statistics.median(latencies) * 1000:>8.2f} "
+                  f"{percentile(latencies, 0.95) * 1000:>8.2f}")
+
+        for dimension in dimensions:
+            statement = text(
+                f"SELECT id FROM {EMBEDDING_TABLE} WHERE {WHERE} "
+                f"ORDER BY l2_normalize(subvector(embedding, 1, {int(dimension)})) "
+                f"<=> l2_normalize(subvector(CAST(:embedding AS vector), 1, {int(dimension)})) LIMIT :k"
+            )
+            with conn.begin():
+                conn.execute(text("SET LOCAL enable_indexscan = off"))
+                results, _ = _run_queries(conn, statement, queries, params)
+            print(f"{'dims=' + str(dimension):>16} {'-':>9} {rows * (4 * dimension + 8) / 1e6:>11.1f} "
+                  f"{_recall(results, truth):>9.3f} {'-':>8} {'-':>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=100, help="Number of sampled queries")
+    parser.add_argument("--k", type=int, default=10, help="Neighbours per query")
+    parser.add_argument("--rerank-factor", type=int, default=4, help="Quantized candidates per result")
+    parser.add_argument("--dimensions", type=int, nargs="*", default=[256, 512, 1024],
+                        help="Reduced dimensions to evaluate")
+    args = parser.parse_args()
+    run(args.queries, args.k, args.rerank_factor, args.dimensions)
@@ -1,10 +1,12 @@
 """Hypercorn configuration file."""
 
+import os
+
 # Server socket
 bind = ["0.0.0.0:8000"]
 
-# Worker processes
-workers = 4
+# Worker processes (the database connection budget is split across them)
+workers = int(os.environ.get("WEB_CONCURRENCY", 4))
 
 # Logging
 accesslog = "-"
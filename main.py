@@ -1,18 +1,65 @@
 """Main entry point for the AI Agents application."""
 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse, StreamingResponse
+import logging
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI, File, Form, Header, HTTPException, UploadFile
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
 from src.models import (
+    BatchCreateRequest,
+    BatchObject,
     ChatCompletionRequest,
+    FileObject,
+)
+from src.core.batches import (
+    batch_runner,
+    cancel_batch,
+    create_batch,
+    create_file,
+    describe_file,
+    get_batch,
+    get_file,
+    list_batches,
 )
 from src.core.completion import create_chat_completion
+from src.core.readiness import readiness
 from src.core.streaming import stream_response
+from src.database import db_manager, db_settings
+from src.http_client import close_http_clients
+from src.metrics import metrics
+from src.models_gen import MODEL_REGISTRY
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run model startup checks, warm up the database pools and start the background tasks in each worker."""
+    for generator_class in MODEL_REGISTRY.values():
+        generator_class().startup()
+    if db_settings.pool_warmup:
+        try:
+            await db_manager.warmup()
+        except Exception as e:
+            logger.error(f"Database pool warmup failed: {e}")
+    readiness.start()
+    batch_runner.start()
+    yield
+    await batch_runner.stop()
+    await readiness.stop()
+    for generator_class in MODEL_REGISTRY.values():
+        await generator_class().shutdown()
+    await close_http_clients()
+    await db_manager.close_async()
+
 
 app = FastAPI(
     title="AI Agents API",
     description="OpenAI-compatible API for AI Agents",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan,
 )
 
 
@@ -29,8 +76,12 @@ async def root():
         "status": "running",
         "endpoints": {
             "chat": "/v1/chat/completions",
+            "files": "/v1/files",
+            "batches": "/v1/batches",
             "models": "/v1/models",
             "health": "/health",
+            "readiness": "/health/ready",
+            "metrics": "/metrics",
             "docs": "/docs"
         }
     }
@@ -45,6 +96,19 @@ async def health_check():
     )
 
 
+@app.get("/health/ready")
+async def readiness_check():
+    """Deep readiness check (database, vector collection, upstream models), served from a cache."""
+    result = readiness.snapshot()
+    return JSONResponse(status_code=200 if result["ready"] else 503, content=result)
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """In-process metrics for this worker."""
+    return metrics.snapshot()
+
+
 @app.get("/v1/models")
 async def list_models():
     """List available models (OpenAI compatible)."""
@@ -68,23 +132,29 @@ async def list_models():
 
 
 @app.post("/v1/chat/completions", response_model=None)
-async def chat_completions(request: ChatCompletionRequest):
+async def chat_completions(request: ChatCompletionRequest, x_session_id: Optional[str] = Header(None)):
     """
     Create a chat completion (OpenAI compatible).
     Supports both streaming and non-streaming responses.
+
+    With an X-Session-Id header the conversation is stored server-side,
+    and follow-up requests send only the new messages. Requests without it
+    are stateless and send the full history, as with OpenAI.
     """
+    session_id = x_session_id
     try:
         # Streaming response
         if request.stream:
             return StreamingResponse(
-                stream_response(request),
+                stream_response(request, session_id=session_id),
                 media_type="text/event-stream"
             )
         
         # Non-streaming response
-        response = create_chat_completion(
+        response = await create_chat_completion(
             messages=request.messages,
-            model=request.model
+            model=request.model,
+            session_id=session_id
         )
         
         return response
@@ -93,6 +163,65 @@ async def chat_completions(request: ChatCompletionRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/v1/files", response_model=FileObject)
+async def upload_file(file: UploadFile = File(...), purpose: str = Form("batch")):
+    """Upload a batch input file (OpenAI compatible)."""
+    return await create_file(file.filename or "upload.jsonl", purpose, await file.read())
+
+
+@app.get("/v1/files/{file_id}", response_model=FileObject)
+async def retrieve_file(file_id: str):
+    """Get a file (OpenAI compatible)."""
+    file = await describe_file(file_id)
+    if file is None:
+        raise HTTPException(status_code=404, detail=f"File '{file_id}' not found")
+    return file
+
+
+@app.get("/v1/files/{file_id}/content")
+async def retrieve_file_content(file_id: str):
+    """Download the content of a file, e.g. batch results (OpenAI compatible)."""
+    file = await get_file(file_id)
+    if file is None:
+        raise HTTPException(status_code=404, detail=f"File '{file_id}' not found")
+    return Response(content=file.content, media_type="application/jsonl")
+
+
+@app.post("/v1/batches", response_model=BatchObject)
+async def create_batch_endpoint(request: BatchCreateRequest):
+    """Queue a batch of chat completion requests from an uploaded file (OpenAI compatible)."""
+    try:
+        batch = await create_batch(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    batch_runner.wake()
+    return batch
+
+
+@app.get("/v1/batches")
+async def list_batches_endpoint(limit: int = 20):
+    """List batches, newest first (OpenAI compatible)."""
+    return {"object": "list", "data": await list_batches(limit)}
+
+
+@app.get("/v1/batches/{batch_id}", response_model=BatchObject)
+async def retrieve_batch(batch_id: str):
+    """Get a batch and its progress (OpenAI compatible)."""
+    batch = await get_batch(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail=f"Batch '{batch_id}' not found")
+    return batch
+
+
+@app.post("/v1/batches/{batch_id}/cancel", response_model=BatchObject)
+async def cancel_batch_endpoint(batch_id: str):
+    """Cancel a batch; finished requests stay in its output (OpenAI compatible)."""
+    batch = await cancel_batch(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail=f"Batch '{batch_id}' not found")
+    return batch
+
+
 if __name__ == "__main__":
     import uvicorn
     # For development with uvicorn
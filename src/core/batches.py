@@ -0,0 +1,670 @@
+"""Offline batch chat completions (OpenAI-style /v1/files and /v1/batches).
+
+A batch is a JSONL file of chat completion requests, one per line::
+
+    {"custom_id": "q1", "method": "POST", "url": "/v1/chat/completions", "body": {"model": "...", "messages": [...]}}
+
+Lines holding only a request body are accepted too (the custom_id is then
+the line number).
+
+Uploaded files, batches and per-request results are stored in Postgres, so
+any worker can serve them. Each worker runs a ``BatchRunner`` that claims
+queued batches (or batches whose runner stopped heartbeating), runs their
+requests through ``create_chat_completion`` with a small, fixed concurrency
+so interactive traffic keeps its capacity, and assembles the output and
+error files. Results are stored per request, so a reclaimed batch resumes
+where it stopped.
+
+Run a batch file locally, without the server::
+
+    python -m src.core.batches requests.jsonl --output results.jsonl --concurrency 8
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import uuid
+from pathlib import Path
+from typing import Awaitable, Callable, Iterable, List, Optional, Tuple
+
+from pydantic_settings import BaseSettings
+from sqlalchemy import Boolean, Column, DateTime, Integer, LargeBinary, String, func, select, text
+from sqlalchemy.dialects.postgresql import JSONB, insert
+
+from ..database import Base, db_manager
+from ..models import (
+    BatchCreateRequest,
+    BatchErrors,
+    BatchObject,
+    BatchRequestCounts,
+    ChatCompletionRequest,
+    FileObject,
+)
+from .completion import create_chat_completion
+
+logger = logging.getLogger(__name__)
+
+# Advisory lock key serializing table creation across workers
+_TABLES_LOCK_KEY = 0x42415443  # "BATC"
+_tables = {"ready": False}
+
+
+class BatchSettings(BaseSettings):
+    """Batch runner settings (BATCH_* environment variables)."""
+
+    enabled: bool = True
+    # Requests in flight per worker
+    concurrency: int = 4
+    # Seconds between checks for queued batches
+    poll_interval: float = 5.0
+    # Batches whose runner has not heartbeated for this long are reclaimed
+    stale_seconds: float = 60.0
+
+    class Config:
+        env_file = ".env"
+        env_prefix = "BATCH_"
+        case_sensitive = False
+        extra = "ignore"
+
+
+class BatchFile(Base):
+    """Uploaded batch input file, or a batch output/error file."""
+
+    __tablename__ = "batch_files"
+
+    id = Column(String, primary_key=True)
+    filename = Column(String, nullable=False)
+    purpose = Column(String, nullable=False)
+    bytes = Column(Integer, nullable=False)
+    content = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class Batch(Base):
+    """Batch of chat completion requests."""
+
+    __tablename__ = "batches"
+
+    id = Column(String, primary_key=True)
+    endpoint = Column(String, nullable=False)
+    input_file_id = Column(String, nullable=False)
+    completion_window = Column(String, nullable=False)
+    status = Column(String, nullable=False, index=True)
+    total = Column(Integer, nullable=False, default=0)
+    output_file_id = Column(String, nullable=True)
+    error_file_id = Column(String, nullable=True)
+    errors = Column(JSONB, nullable=True)
+    batch_metadata = Column("metadata", JSONB, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    in_progress_at = Column(DateTime(timezone=True), nullable=True)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    failed_at = Column(DateTime(timezone=True), nullable=True)
+    cancelled_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class BatchResult(Base):
+    """Output line of one request of a batch."""
+
+    __tablename__ = "batch_results"
+
+    batch_id = Column(String, primary_key=True)
+    line = Column(Integer, primary_key=True)
+    custom_id = Column(String, nullable=False)
+    output = Column(JSONB, nullable=False)
+    failed = Column(Boolean, nullable=False)
+
+
+def parse_batch_lines(content: bytes) -> Tuple[List[Tuple[str, dict]], List[dict]]:
+    """
+    Parse a batch input file.
+
+    Args:
+        content: JSONL file content
+
+    Returns:
+        tuple: The (custom_id, request body) of each request, and validation errors
+    """
+    requests, errors, seen = [], [], set()
+    for number, line in enumerate(content.decode("utf-8").splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            errors.append({"code": "invalid_json", "message": f"Line {number} is not valid JSON.", "line": str(number)})
+            continue
+        if not isinstance(item, dict):
+            errors.append({"code": "invalid_request", "message": f"Line {number} is not an object.", "line": str(number)})
+            continue
+
+        if "body" in item:
+            body, custom_id = item["body"], str(item.get("custom_id", number))
+            url = item.get("url", "/v1/chat/completions")
+            if url != "/v1/chat/completions":
+                errors.append({
+                    "code": "invalid_url",
+                    "message": f"Line {number}: only /v1/chat/completions is supported, got {url}.",
+                    "line": str(number),
+                })
+                continue
+        else:
+            body, custom_id = item, str(number)
+        if not isinstance(body, dict):
+            errors.append({"code": "invalid_request", "message": f"Line {number}: body is not an object.", "line": str(number)})
+            continue
+
+        if custom_id in seen:
+            errors.append({
+                "code": "duplicate_custom_id",
+                "message": f"Line {number}: custom_id '{custom_id}' is not unique.",
+                "line": str(number),
+            })
+            continue
+        seen.add(custom_id)
+        requests.append((custom_id, body))
+    return requests, errors
+
+
+async def run_request(custom_id: str, body: dict) -> dict:
+    """
+    Run one chat completion request of a batch.
+
+    Args:
+        custom_id: Request id given in the input file
+        body: Chat completion request body
+
+    Returns:
+        dict: The output line (``response`` on success, ``error`` on failure)
+    """
+    line = {"id": f"batch_req_{uuid.uuid4().hex[:24]}", "custom_id": custom_id}
+    try:
+        request = ChatCompletionRequest(**body)
+        response = await create_chat_completion(messages=request.messages, model=request.model)
+    except ValueError as e:
+        # Invalid body or unsupported model
+        return {**line, "response": None, "error": {"code": "invalid_request", "message": str(e)}}
+    except Exception as e:
+        logger.error(f"Batch request {custom_id} failed: {e}")
+        return {**line, "response": None, "error": {"code": "server_error", "message": str(e)}}
+
+    return {
+        **line,
+        "response": {"status_code": 200, "request_id": response.id, "body": response.model_dump()},
+        "error": None,
+    }
+
+
+async def run_requests(
+    requests: Iterable[Tuple[int, str, dict]],
+    concurrency: int,
+    on_result: Callable[[int, dict], Awaitable[None]],
+    handler: Callable[[str, dict], Awaitable[dict]] = run_request,
+) -> None:
+    """
+    Run requests with at most ``concurrency`` in flight.
+
+    Args:
+        requests: (line, custom_id, body) of each request
+        concurrency: Requests in flight
+        on_result: Called with the line and output of each finished request
+        handler: Runs one request
+    """
+    iterator = iter(requests)
+
+    async def worker() -> None:
+        # Workers share the iterator, so each request runs exactly once
+        for line, custom_id, body in iterator:
+            await on_result(line, await handler(custom_id, body))
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(max(concurrency, 1))]
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        # A failing worker (or cancellation) must not leave the others running
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+def _timestamp(value) -> Optional[int]:
+    """Convert a datetime to a Unix timestamp."""
+    return int(value.timestamp()) if value is not None else None
+
+
+async def _ensure_tables(session) -> None:
+    """Create the batch tables once per worker (serialized across workers)."""
+    if _tables["ready"]:
+        return
+
+    def create(conn) -> None:
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _TABLES_LOCK_KEY})
+        Base.metadata.create_all(conn, tables=[BatchFile.__table__, Batch.__table__, BatchResult.__table__])
+
+    await (await session.connection()).run_sync(create)
+    await session.commit()
+    _tables["ready"] = True
+
+
+def _file_object(file: BatchFile) -> FileObject:
+    return FileObject(
+        id=file.id,
+        bytes=file.bytes,
+        created_at=_timestamp(file.created_at),
+        filename=file.filename,
+        purpose=file.purpose,
+    )
+
+
+async def _batch_object(session, batch: Batch) -> BatchObject:
+    counts = (await session.execute(
+        select(func.count(), func.count().filter(BatchResult.failed)).where(BatchResult.batch_id == batch.id)
+    )).one()
+    return BatchObject(
+        id=batch.id,
+        endpoint=batch.endpoint,
+        input_file_id=batch.input_file_id,
+        completion_window=batch.completion_window,
+        status=batch.status,
+        output_file_id=batch.output_file_id,
+        error_file_id=batch.error_file_id,
+        errors=BatchErrors(**batch.errors) if batch.errors else None,
+        created_at=_timestamp(batch.created_at),
+        in_progress_at=_timestamp(batch.in_progress_at),
+        completed_at=_timestamp(batch.completed_at),
+        failed_at=_timestamp(batch.failed_at),
+        cancelled_at=_timestamp(batch.cancelled_at),
+        request_counts=BatchRequestCounts(total=batch.total, completed=counts[0] - counts[1], failed=counts[1]),
+        metadata=batch.batch_metadata,
+    )
+
+
+async def create_file(filename: str, purpose: str, content: bytes) -> FileObject:
+    """
+    Store an uploaded file.
+
+    Args:
+        filename: Name of the uploaded file
+        purpose: Purpose of the file (e.g. "batch")
+        content: File content
+
+    Returns:
+        FileObject: The stored file
+    """
+    async with db_manager.get_async_session() as session:
+        await _ensure_tables(session)
+        file = BatchFile(
+            id=f"file-{uuid.uuid4().hex[:24]}", filename=filename, purpose=purpose, bytes=len(content), content=content
+        )
+        session.add(file)
+        await session.flush()
+        await session.refresh(file)
+        return _file_object(file)
+
+
+async def get_file(file_id: str) -> Optional[BatchFile]:
+    """
+    Get a stored file.
+
+    Args:
+        file_id: File id
+
+    Returns:
+        BatchFile: The file with its content, or None if it does not exist
+    """
+    async with db_manager.get_async_session() as session:
+        await _ensure_tables(session)
+        return await session.get(BatchFile, file_id)
+
+
+async def describe_file(file_id: str) -> Optional[FileObject]:
+    """
+    Get the description of a stored file.
+
+    Args:
+        file_id: File id
+
+    Returns:
+        FileObject: The file, or None if it does not exist
+    """
+    file = await get_file(file_id)
+    return _file_object(file) if file is not None else None
+
+
+async def create_batch(request: BatchCreateRequest) -> BatchObject:
+    """
+    Validate the input file and queue a batch.
+
+    Args:
+        request: Batch creation request
+
+    Returns:
+        BatchObject: The queued batch ("failed" if the input file is invalid)
+
+    Raises:
+        ValueError: If the input file does not exist
+    """
+    async with db_manager.get_async_session() as session:
+        await _ensure_tables(session)
+        file = await session.get(BatchFile, request.input_file_id)
+        if file is None:
+            raise ValueError(f"File '{request.input_file_id}' does not exist.")
+
+        requests, errors = parse_batch_lines(file.content)
+        batch = Batch(
+            id=f"batch_{uuid.uuid4().hex[:24]}",
+            endpoint=request.endpoint,
+            input_file_id=request.input_file_id,
+            completion_window=request.completion_window,
+            status="failed" if errors else "validating",
+            total=len(requests),
+            errors={"object": "list", "data": errors} if errors else None,
+            batch_metadata=request.metadata,
+            failed_at=func.now() if errors else None,
+        )
+        session.add(batch)
+        await session.flush()
+        await session.refresh(batch)
+        return await _batch_object(session, batch)
+
+
+async def get_batch(batch_id: str) -> Optional[BatchObject]:
+    """
+    Get a batch.
+
+    Args:
+        batch_id: Batch id
+
+    Returns:
+        BatchObject: The batch, or None if it does not exist
+    """
+    async with db_manager.get_async_session() as session:
+        await _ensure_tables(session)
+        batch = await session.get(Batch, batch_id)
+        return await _batch_object(session, batch) if batch is not None else None
+
+
+async def list_batches(limit: int = 20) -> List[BatchObject]:
+    """
+    List the most recent batches.
+
+    Args:
+        limit: Maximum number of batches
+
+    Returns:
+        list: Batches, newest first
+    """
+    async with db_manager.get_async_session() as session:
+        await _ensure_tables(session)
+        batches = (await session.execute(select(Batch).order_by(Batch.created_at.desc()).limit(limit))).scalars().all()
+        return [await _batch_object(session, batch) for batch in batches]
+
+
+async def cancel_batch(batch_id: str) -> Optional[BatchObject]:
+    """
+    Cancel a batch; requests already finished stay in its output.
+
+    Args:
+        batch_id: Batch id
+
+    Returns:
+        BatchObject: The batch, or None if it does not exist
+    """
+    async with db_manager.get_async_session() as session:
+        await _ensure_tables(session)
+        batch = await session.get(Batch, batch_id, with_for_update=True)
+        if batch is None:
+            return None
+        if batch.status == "validating":
+            # Not started yet: nothing to wind down
+            batch.status, batch.cancelled_at = "cancelled", func.now()
+        elif batch.status == "in_progress":
+            # The runner stops at its next heartbeat and writes the partial output
+            batch.status = "cancelling"
+        await session.flush()
+        await session.refresh(batch)
+        return await _batch_object(session, batch)
+
+
+class BatchRunner:
+    """Claims queued batches and runs them in the background of a worker."""
+
+    def __init__(self, settings: BatchSettings):
+        """
+        Initialize the runner.
+
+        Args:
+            settings: Batch runner settings
+        """
+        self.settings = settings
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+
+    def start(self) -> None:
+        """Start the background runner (call from a running event loop)."""
+        if self.settings.enabled and (self._task is None or self._task.done()):
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self) -> None:
+        """Stop the background runner; a running batch is reclaimed later."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self) -> None:
+        """Check for queued batches now instead of at the next poll."""
+        self._wake.set()
+
+    async def _run_forever(self) -> None:
+        """Run claimed batches one at a time until cancelled."""
+        while True:
+            try:
+                batch_id = await self._claim()
+                if batch_id is not None:
+                    await self.process(batch_id)
+                    continue
+            except Exception as e:
+                logger.error(f"Batch runner failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.settings.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def _claim(self) -> Optional[str]:
+        """Claim the oldest queued batch, or one whose runner stopped heartbeating."""
+        async with db_manager.get_async_session() as session:
+            await _ensure_tables(session)
+            return (await session.execute(
+                text(
+                    "UPDATE batches SET "
+                    "status = CASE WHEN status = 'cancelling' THEN status ELSE 'in_progress' END, "
+                    "in_progress_at = COALESCE(in_progress_at, now()), heartbeat_at = now() "
+                    "WHERE id = ("
+                    "  SELECT id FROM batches WHERE status = 'validating' "
+                    "  OR (status IN ('in_progress', 'finalizing', 'cancelling') "
+                    "      AND heartbeat_at < now() - make_interval(secs => CAST(:stale AS float8))) "
+                    "  ORDER BY created_at LIMIT 1 FOR UPDATE SKIP LOCKED"
+                    ") RETURNING id"
+                ),
+                {"stale": self.settings.stale_seconds},
+            )).scalar()
+
+    async def _heartbeat(self, batch_id: str, work: asyncio.Task, cancelled: asyncio.Event) -> None:
+        """Keep the claim alive, and stop the work when the batch is cancelled."""
+        while True:
+            await asyncio.sleep(self.settings.stale_seconds / 3)
+            async with db_manager.get_async_session() as session:
+                status = (await session.execute(
+                    text("UPDATE batches SET heartbeat_at = now() WHERE id = :id RETURNING status"),
+                    {"id": batch_id},
+                )).scalar()
+            if status == "cancelling":
+                cancelled.set()
+                work.cancel()
+                return
+
+    async def _store(self, batch_id: str, line: int, output: dict) -> None:
+        """Store the output of one request."""
+        async with db_manager.get_async_session() as session:
+            await session.execute(
+                insert(BatchResult)
+                .values(
+                    batch_id=batch_id,
+                    line=line,
+                    custom_id=output["custom_id"],
+                    output=output,
+                    failed=output["error"] is not None,
+                )
+                .on_conflict_do_nothing()
+            )
+
+    async def process(self, batch_id: str) -> None:
+        """
+        Run the remaining requests of a claimed batch and finalize it.
+
+        Args:
+            batch_id: Batch id
+        """
+        async with db_manager.get_async_session() as session:
+            batch = await session.get(Batch, batch_id)
+            file = await session.get(BatchFile, batch.input_file_id)
+            done = set((await session.execute(
+                select(BatchResult.line).where(BatchResult.batch_id == batch_id)
+            )).scalars().all())
+            status = batch.status
+
+        cancelled = asyncio.Event()
+        if status == "cancelling":
+            cancelled.set()
+        else:
+            requests, _ = parse_batch_lines(file.content)
+            remaining = [
+                (line, custom_id, body) for line, (custom_id, body) in enumerate(requests) if line not in done
+            ]
+            logger.info(f"Running batch {batch_id}: {len(remaining)} of {len(requests)} requests remaining")
+
+            work = asyncio.create_task(run_requests(
+                remaining,
+                self.settings.concurrency,
+                lambda line, output: self._store(batch_id, line, output),
+            ))
+            heartbeat = asyncio.create_task(self._heartbeat(batch_id, work, cancelled))
+            try:
+                await work
+            except asyncio.CancelledError:
+                if not cancelled.is_set():
+                    raise
+            finally:
+                heartbeat.cancel()
+
+        await self._finalize(batch_id, cancelled.is_set())
+
+    async def _finalize(self, batch_id: str, cancelled: bool) -> None:
+        """Write the output and error files of a batch and close it."""
+        async with db_manager.get_async_session() as session:
+            batch = await session.get(Batch, batch_id, with_for_update=True)
+            if not cancelled:
+                batch.status = "finalizing"
+                await session.flush()
+
+            results = (await session.execute(
+                select(BatchResult.output, BatchResult.failed)
+                .where(BatchResult.batch_id == batch_id)
+                .order_by(BatchResult.line)
+            )).all()
+            outputs = {
+                failed: "".join(json.dumps(output, ensure_ascii=False) + "\n" for output, is_failed in results
+                                if is_failed == failed).encode("utf-8")
+                for failed in (False, True)
+            }
+            for failed, content in outputs.items():
+                if not content:
+                    continue
+                file = BatchFile(
+                    id=f"file-{uuid.uuid4().hex[:24]}",
+                    filename=f"{batch_id}_{'error' if failed else 'output'}.jsonl",
+                    purpose="batch_output",
+                    bytes=len(content),
+                    content=content,
+                )
+                session.add(file)
+                if failed:
+                    batch.error_file_id = file.id
+                else:
+                    batch.output_file_id = file.id
+
+            if cancelled:
+                batch.status, batch.cancelled_at = "cancelled", func.now()
+            else:
+                batch.status, batch.completed_at = "completed", func.now()
+        logger.info(f"Batch {batch_id} {'cancelled' if cancelled else 'completed'}")
+
+
+# Global settings and runner instances
+batch_settings = BatchSettings()
+batch_runner = BatchRunner(batch_settings)
+
+
+async def run_file(input_path: Path, output_path: Path, errors_path: Path, concurrency: int) -> dict:
+    """
+    Run a batch input file locally, appending to the output and error files.
+
+    Requests whose custom_id is already in either file are skipped, so an
+    interrupted run resumes where it stopped.
+
+    Args:
+        input_path: Batch input file (JSONL)
+        output_path: Output file for successful requests (JSONL)
+        errors_path: Output file for failed requests (JSONL)
+        concurrency: Requests in flight
+
+    Returns:
+        dict: Counts of requests run, skipped and failed
+    """
+    requests, errors = parse_batch_lines(input_path.read_bytes())
+    if errors:
+        raise ValueError("; ".join(error["message"] for error in errors))
+
+    done = set()
+    for path in (output_path, errors_path):
+        if path.exists():
+            done.update(json.loads(line)["custom_id"] for line in path.read_text().splitlines() if line.strip())
+    remaining = [(line, custom_id, body) for line, (custom_id, body) in enumerate(requests) if custom_id not in done]
+
+    stats = {"total": len(requests), "skipped": len(requests) - len(remaining), "completed": 0, "failed": 0}
+    with output_path.open("a") as output_file, errors_path.open("a") as errors_file:
+        async def on_result(line: int, output: dict) -> None:
+            failed = output["error"] is not None
+            stats["failed" if failed else "completed"] += 1
+            target = errors_file if failed else output_file
+            target.write(json.dumps(output, ensure_ascii=False) + "\n")
+            target.flush()
+
+        await run_requests(remaining, concurrency, on_result, handler=run_request)
+    return stats
+
+
+def main(argv=None) -> None:
+    """Command line entry point for running a batch file locally."""
+    parser = argparse.ArgumentParser(description="Run a batch of chat completion requests locally.")
+    parser.add_argument("input", type=Path, help="batch input file (JSONL)")
+    parser.add_argument("--output", type=Path, required=True, help="output file for successful requests (JSONL)")
+    parser.add_argument("--errors", type=Path, help="output file for failed requests (default: <output>.errors.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=batch_settings.concurrency, help="requests in flight")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    errors_path = args.errors or args.output.with_suffix(".errors.jsonl")
+    stats = asyncio.run(run_file(args.input, args.output, errors_path, args.concurrency))
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@
 
 import time
 import uuid
-from typing import List
+from typing import List, Optional
 
 from ..models import (
     Message,
@@ -14,9 +14,10 @@ from .generator import generate_response
 from .tokenizer import estimate_tokens
 
 
-def create_chat_completion(
+async def create_chat_completion(
     messages: List[Message],
-    model: str
+    model: str,
+    session_id: Optional[str] = None
 ) -> ChatCompletionResponse:
     """
     Create a non-streaming chat completion response.
@@ -24,6 +25,7 @@ def create_chat_completion(
     Args:
         messages: List of conversation messages
         model: Model name to use
+        session_id: Conversation session id (optional)
         
     Returns:
         ChatCompletionResponse with generated content and usage info
@@ -33,7 +35,7 @@ def create_chat_completion(
     created = int(time.time())
     
     # Generate response - collect all tokens from generator
-    assistant_message = "".join(generate_response(messages, model))
+    assistant_message = "".join([token async for token in generate_response(messages, model, session_id=session_id)])
     
     # Calculate token usage
     prompt_text = " ".join([msg.content for msg in messages])
@@ -1,6 +1,6 @@
 """Response generation utilities."""
 
-from typing import List, Generator
+from typing import AsyncGenerator, List, Optional
 from ..models import Message
 from ..models_gen import MODEL_REGISTRY, BaseModelGenerator
 
@@ -25,14 +25,19 @@ def get_model_generator(model: str) -> BaseModelGenerator:
     return generator_class()
 
 
-def generate_response(messages: List[Message], model: str) -> Generator[str, None, None]:
+async def generate_response(
+    messages: List[Message],
+    model: str,
+    session_id: Optional[str] = None
+) -> AsyncGenerator[str, None]:
     """
     Generate a response based on the messages.
-    Returns a generator that yields tokens/chunks.
+    Returns an async generator that yields tokens/chunks.
 
     Args:
         messages: List of conversation messages
         model: Model name to use
+        session_id: Conversation session id (optional)
 
     Yields:
         Generated tokens/chunks
@@ -41,4 +46,5 @@ def generate_response(messages: List[Message], model: str) -> Generator[str, Non
     generator = get_model_generator(model)
 
     # Yield tokens from the generator
-    yield from generator.generate(messages)
+    async for token in generator.generate(messages, session_id=session_id):
+        yield token
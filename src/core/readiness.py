@@ -0,0 +1,122 @@
+"""Cached readiness checks for the /health/ready endpoint."""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Optional
+
+from ..database import check_database_health
+from ..metrics import metrics
+from ..models_gen import MODEL_REGISTRY
+
+logger = logging.getLogger(__name__)
+
+
+class ReadinessMonitor:
+    """
+    Periodically runs the deep readiness checks in the background.
+
+    Load-balancer probes read the cached result, so they never wait on the
+    database or the upstream model APIs.
+    """
+
+    def __init__(self, interval: float = 10.0, timeout: float = 5.0):
+        """
+        Initialize the monitor.
+
+        Args:
+            interval: Seconds between refreshes
+            timeout: Seconds each check may take before it counts as failed
+        """
+        self.interval = interval
+        self.timeout = timeout
+        self._task: Optional[asyncio.Task] = None
+        self._result = {"ready": False, "status": "starting", "checks": {}}
+        self._refreshed_at: Optional[float] = None
+
+    async def _run_check(self, check: Awaitable[dict]) -> dict:
+        """Run one check, turning timeouts and errors into a failed result."""
+        try:
+            return await asyncio.wait_for(check, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            return {"ready": False, "error": f"timed out after {self.timeout}s"}
+        except Exception as e:
+            return {"ready": False, "error": str(e)}
+
+    async def _check_database(self) -> dict:
+        """Check the database connection and pools."""
+        health = await check_database_health()
+        return {**health, "ready": health.get("status") == "healthy"}
+
+    async def refresh(self) -> dict:
+        """
+        Run all checks concurrently and cache the result.
+
+        Returns:
+            dict: The readiness result
+        """
+        started = time.perf_counter()
+        checks = {"database": self._check_database()}
+        for model, generator_class in MODEL_REGISTRY.items():
+            checks[f"model:{model}"] = generator_class().readiness()
+
+        results = await asyncio.gather(*(self._run_check(check) for check in checks.values()))
+        checks = dict(zip(checks, results))
+        ready = all(result.get("ready", False) for result in checks.values())
+        # Ready, but a check reports a dependency that does not affect readiness as failing
+        degraded = any(result.get("degraded", False) for result in checks.values())
+        status = ("degraded" if degraded else "ready") if ready else "not_ready"
+
+        if status != self._result["status"]:
+            log = logger.info if status == "ready" else logger.warning
+            log(f"Readiness changed to {status.replace('_', ' ')}")
+        self._result = {"ready": ready, "status": status, "checks": checks}
+        self._refreshed_at = time.monotonic()
+        metrics.observe("readiness.refresh_seconds", time.perf_counter() - started)
+        return self._result
+
+    async def _refresh_forever(self) -> None:
+        """Refresh the result every interval until cancelled."""
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Readiness refresh failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Start the background refresher (call from a running event loop)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_forever())
+
+    async def stop(self) -> None:
+        """Stop the background refresher."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self) -> dict:
+        """
+        Get the cached readiness result.
+
+        A result older than three intervals means the refresher stopped, and
+        is reported as not ready.
+
+        Returns:
+            dict: Readiness, status, per-check results and result age
+        """
+        if self._refreshed_at is None:
+            return {**self._result, "age_seconds": None}
+
+        age = time.monotonic() - self._refreshed_at
+        if age > 3 * self.interval:
+            return {**self._result, "ready": False, "status": "stale", "age_seconds": round(age, 3)}
+        return {**self._result, "age_seconds": round(age, 3)}
+
+
+# Global readiness monitor
+readiness = ReadinessMonitor()
@@ -1,6 +1,6 @@
 """Streaming response utilities."""
 
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 import time
 import uuid
 
@@ -13,12 +13,16 @@ from ..models import (
 from .generator import generate_response
 
 
-async def stream_response(request: ChatCompletionRequest) -> AsyncGenerator[str, None]:
+async def stream_response(
+    request: ChatCompletionRequest,
+    session_id: Optional[str] = None
+) -> AsyncGenerator[str, None]:
     """
     Generate streaming response chunks.
     
     Args:
         request: Chat completion request
+        session_id: Conversation session id (optional)
         
     Yields:
         Server-Sent Event formatted response chunks
@@ -40,7 +44,7 @@ async def stream_response(request: ChatCompletionRequest) -> AsyncGenerator[str,
     yield f"data: {initial_chunk.model_dump_json()}\n\n"
     
     # Stream content token by token from generator
-    for token in generate_response(request.messages, request.model):
+    async for token in generate_response(request.messages, request.model, session_id=session_id):
         chunk = ChatCompletionStreamResponse(
             id=response_id,
             created=created,
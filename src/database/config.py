@@ -1,9 +1,12 @@
 """Database configuration settings."""
 
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Optional
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 
 class DatabaseSettings(BaseSettings):
     """Database configuration settings."""
@@ -25,6 +28,30 @@ class DatabaseSettings(BaseSettings):
     pool_timeout: int = 30
     pool_recycle: int = 3600
     pool_pre_ping: bool = True
+    # Open pool_size connections per engine at application startup
+    pool_warmup: bool = True
+    
+    # Total Postgres connections the application may open across all workers
+    # and both engines; when set, per-engine pool sizes are derived from it
+    connection_budget: Optional[int] = None
+    # Connections per worker of the conversation checkpointer (taken from the
+    # connection budget before it is split over the engines)
+    checkpoint_pool_size: int = 2
+    # Number of server worker processes (also read by hypercorn_config.py)
+    web_concurrency: int = 4
+    
+    # Connect through PgBouncer (transaction pooling): no client-side pool and
+    # no server-side prepared statements
+    pgbouncer_mode: bool = False
+    
+    # Read replicas for retrieval queries (comma-separated URLs; not counted in
+    # the connection budget, which applies to the primary)
+    replica_urls: Optional[str] = None
+    # Replicas lagging further behind the primary are skipped
+    replica_max_lag_seconds: float = 30.0
+    # How often each replica's health and lag are re-checked
+    replica_check_interval: float = 10.0
+    replica_check_timeout: float = 2.0
     
     # Echo SQL queries (for debugging)
     echo_sql: bool = False
@@ -58,15 +85,60 @@ class DatabaseSettings(BaseSettings):
         if self.async_database_url:
             return self.async_database_url
         
-        sync_url = self.get_sync_url()
+        return self._to_async_url(self.get_sync_url())
+    
+    def get_replica_urls(self) -> List[str]:
+        """
+        Get the async URLs of the read replicas.
+        
+        Returns:
+            list: Async replica connection URLs (empty if none are configured)
+        """
+        if not self.replica_urls:
+            return []
+        return [self._to_async_url(url.strip()) for url in self.replica_urls.split(",") if url.strip()]
+    
+    @staticmethod
+    def _to_async_url(url: str) -> str:
+        """Convert a postgresql:// URL to postgresql+asyncpg://."""
+        if url.startswith("postgresql://"):
+            return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+        elif url.startswith("postgres://"):
+            return url.replace("postgres://", "postgresql+asyncpg://", 1)
+        
+        return url
+    
+    def get_pool_limits(self) -> dict:
+        """
+        Get the pool size and overflow of each engine in a worker.
+        
+        Without a connection budget the configured pool_size and max_overflow
+        are used. With one, the checkpointer connections of every worker are
+        set aside, the rest is split evenly over every engine of every worker
+        (two engines per worker), and pool_size is capped to the share so that
+        overflow connections never exceed the budget. Every engine keeps at
+        least one connection, so a budget too small for that is exceeded, with
+        a warning.
         
-        # Convert postgresql:// to postgresql+asyncpg://
-        if sync_url.startswith("postgresql://"):
-            return sync_url.replace("postgresql://", "postgresql+asyncpg://", 1)
-        elif sync_url.startswith("postgres://"):
-            return sync_url.replace("postgres://", "postgresql+asyncpg://", 1)
+        Returns:
+            dict: pool_size and max_overflow per engine
+        """
+        if not self.connection_budget:
+            return {"pool_size": self.pool_size, "max_overflow": self.max_overflow}
         
-        return sync_url
+        workers = max(self.web_concurrency, 1)
+        engines = 2 * workers
+        available = self.connection_budget - workers * self.checkpoint_pool_size
+        per_engine = available // engines
+        if per_engine < 1:
+            logger.warning(
+                f"CONNECTION_BUDGET={self.connection_budget} is too small for {workers} workers "
+                f"({engines} engines and {workers * self.checkpoint_pool_size} checkpointer connections); "
+                f"using one connection per engine, {engines + workers * self.checkpoint_pool_size} in total"
+            )
+            per_engine = 1
+        pool_size = min(self.pool_size, per_engine)
+        return {"pool_size": pool_size, "max_overflow": per_engine - pool_size}
     
     def get_connection_info(self) -> dict:
         """
@@ -81,8 +153,11 @@ class DatabaseSettings(BaseSettings):
             "host": self.postgres_host,
             "port": self.postgres_port,
             "database": self.postgres_db,
-            "pool_size": self.pool_size,
-            "max_overflow": self.max_overflow,
+            **self.get_pool_limits(),
+            "connection_budget": self.connection_budget,
+            "workers": self.web_concurrency,
+            "pgbouncer_mode": self.pgbouncer_mode,
+            "replicas": len(self.get_replica_urls()),
         }
 
 
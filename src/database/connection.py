@@ -1,14 +1,24 @@
 """Database connection management with connection pooling."""
 
+import asyncio
+import time
 from typing import Generator, AsyncGenerator, Optional
 from contextlib import contextmanager, asynccontextmanager
-from sqlalchemy import create_engine, event, pool, text
+from sqlalchemy import create_engine, pool, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.pool import QueuePool, NullPool
 import logging
 
+from ..metrics import metrics
 from .config import db_settings
+from .pool import (
+    InstrumentedAsyncAdaptedQueuePool,
+    InstrumentedNullPool,
+    InstrumentedQueuePool,
+    instrument_engine,
+    pool_metrics,
+)
 from .base import Base
 
 logger = logging.getLogger(__name__)
@@ -23,6 +33,9 @@ class DatabaseManager:
         self._async_engine = None
         self._session_factory = None
         self._async_session_factory = None
+        # Read replicas: {"url", "engine", "session_factory", "healthy", "lag", "checked", "task"}
+        self._replicas = []
+        self._replica_cursor = 0
         self._initialized = False
     
     def initialize(self):
@@ -39,26 +52,35 @@ class DatabaseManager:
             # Create synchronous engine with connection pooling
             self._engine = create_engine(
                 db_settings.get_sync_url(),
-                poolclass=QueuePool,
-                pool_size=db_settings.pool_size,
-                max_overflow=db_settings.max_overflow,
-                pool_timeout=db_settings.pool_timeout,
-                pool_recycle=db_settings.pool_recycle,
-                pool_pre_ping=db_settings.pool_pre_ping,
-                echo=db_settings.echo_sql,
+                **self._engine_options(InstrumentedQueuePool),
             )
             
-            # Create async engine with connection pooling
-            self._async_engine = create_async_engine(
-                db_settings.get_async_url(),
-                poolclass=QueuePool,
-                pool_size=db_settings.pool_size,
-                max_overflow=db_settings.max_overflow,
-                pool_timeout=db_settings.pool_timeout,
-                pool_recycle=db_settings.pool_recycle,
-                pool_pre_ping=db_settings.pool_pre_ping,
-                echo=db_settings.echo_sql,
-            )
+            # Create async engine with connection pooling (asyncio engines need the async-adapted pool)
+            async_options = self._engine_options(InstrumentedAsyncAdaptedQueuePool)
+            if db_settings.pgbouncer_mode:
+                # PgBouncer transaction pooling cannot keep named prepared statements
+                async_options["connect_args"] = {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+            self._async_engine = create_async_engine(db_settings.get_async_url(), **async_options)
+            
+            # Create async engines for the read replicas
+            self._replicas = []
+            for url in db_settings.get_replica_urls():
+                replica_engine = create_async_engine(url, **async_options)
+                self._replicas.append({
+                    "url": make_url(url).render_as_string(hide_password=True),
+                    "engine": replica_engine,
+                    "session_factory": async_sessionmaker(
+                        bind=replica_engine,
+                        class_=AsyncSession,
+                        expire_on_commit=False,
+                        autocommit=False,
+                        autoflush=False,
+                    ),
+                    "healthy": True,
+                    "lag": None,
+                    "checked": None,
+                    "task": None,
+                })
             
             # Create session factories
             self._session_factory = sessionmaker(
@@ -81,34 +103,51 @@ class DatabaseManager:
             self._setup_event_listeners()
             
             self._initialized = True
-            logger.info(f"DatabaseManager initialized successfully with pool_size={db_settings.pool_size}")
+            if db_settings.pgbouncer_mode:
+                logger.info("DatabaseManager initialized successfully in PgBouncer mode (no client-side pool)")
+            else:
+                logger.info(
+                    f"DatabaseManager initialized successfully with {db_settings.get_pool_limits()} per engine"
+                )
             
         except Exception as e:
             logger.error(f"Failed to initialize DatabaseManager: {e}")
             raise
     
+    def _engine_options(self, pool_class) -> dict:
+        """
+        Get the engine keyword arguments for the configured pooling mode.
+        
+        Args:
+            pool_class: Pool class used unless PgBouncer mode is enabled
+            
+        Returns:
+            dict: Keyword arguments for create_engine / create_async_engine
+        """
+        if db_settings.pgbouncer_mode:
+            # PgBouncer pools the server connections; keep none open here
+            return {"poolclass": InstrumentedNullPool, "echo": db_settings.echo_sql}
+        
+        return {
+            "poolclass": pool_class,
+            **db_settings.get_pool_limits(),
+            "pool_timeout": db_settings.pool_timeout,
+            "pool_recycle": db_settings.pool_recycle,
+            "pool_pre_ping": db_settings.pool_pre_ping,
+            "echo": db_settings.echo_sql,
+        }
+    
     def _setup_event_listeners(self):
-        """Set up SQLAlchemy event listeners for connection management."""
-        
-        @event.listens_for(self._engine, "connect")
-        def receive_connect(dbapi_conn, connection_record):
-            """Log when a connection is created."""
-            logger.debug("Database connection established")
-        
-        @event.listens_for(self._engine, "close")
-        def receive_close(dbapi_conn, connection_record):
-            """Log when a connection is closed."""
-            logger.debug("Database connection closed")
-        
-        @event.listens_for(self._engine, "checkout")
-        def receive_checkout(dbapi_conn, connection_record, connection_proxy):
-            """Log when a connection is checked out from the pool."""
-            logger.debug("Connection checked out from pool")
-        
-        @event.listens_for(self._engine, "checkin")
-        def receive_checkin(dbapi_conn, connection_record):
-            """Log when a connection is returned to the pool."""
-            logger.debug("Connection returned to pool")
+        """Set up SQLAlchemy event listeners recording pool metrics for both engines."""
+        instrument_engine(self._engine, "sync")
+        instrument_engine(self._async_engine.sync_engine, "async")
+        for index, replica in enumerate(self._replicas):
+            instrument_engine(replica["engine"].sync_engine, f"replica{index}")
+    
+    @property
+    def replica_engines(self) -> list:
+        """Async engines of the configured read replicas."""
+        return [replica["engine"] for replica in self._replicas]
     
     @contextmanager
     def get_session(self) -> Generator[Session, None, None]:
@@ -154,6 +193,168 @@ class DatabaseManager:
         finally:
             await session.close()
     
+    async def _check_replica(self, replica: dict) -> None:
+        """
+        Check a replica's health and replication lag.
+        
+        Args:
+            replica: Replica state to update
+        """
+        try:
+            async with replica["engine"].connect() as conn:
+                lag = (await asyncio.wait_for(
+                    conn.execute(text(
+                        "SELECT CASE "
+                        "WHEN NOT pg_is_in_recovery() THEN 0 "
+                        "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                        "ELSE COALESCE(CAST(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) AS float8), 0) "
+                        "END"
+                    )),
+                    timeout=db_settings.replica_check_timeout,
+                )).scalar()
+            if not replica["healthy"]:
+                logger.info(f"Read replica {replica['url']} is healthy again")
+            replica["healthy"], replica["lag"] = True, float(lag)
+        except Exception as e:
+            if replica["healthy"]:
+                logger.warning(f"Read replica {replica['url']} failed its health check: {e}")
+            replica["healthy"], replica["lag"] = False, None
+        finally:
+            replica["checked"] = time.monotonic()
+    
+    async def _pick_replica(self) -> Optional[dict]:
+        """
+        Pick a healthy replica within the lag limit, round-robin.
+        
+        Replicas are re-checked in the background once their last check is
+        older than replica_check_interval; only the very first check is waited
+        for.
+        
+        Returns:
+            dict: Replica state, or None if no replica is usable
+        """
+        now = time.monotonic()
+        for replica in self._replicas:
+            stale = replica["checked"] is None or now - replica["checked"] >= db_settings.replica_check_interval
+            if stale and (replica["task"] is None or replica["task"].done()):
+                replica["task"] = asyncio.ensure_future(self._check_replica(replica))
+        
+        unchecked = [replica["task"] for replica in self._replicas if replica["checked"] is None]
+        if unchecked:
+            await asyncio.gather(*unchecked)
+        
+        usable = [
+            replica for replica in self._replicas
+            if replica["healthy"] and replica["lag"] is not None
+            and replica["lag"] <= db_settings.replica_max_lag_seconds
+        ]
+        if not usable:
+            return None
+        self._replica_cursor = (self._replica_cursor + 1) % len(usable)
+        return usable[self._replica_cursor]
+    
+    @asynccontextmanager
+    async def get_read_session(self) -> AsyncGenerator[AsyncSession, None]:
+        """
+        Get an async session for read-only queries.
+        
+        Sessions go to a healthy read replica within the lag limit, and fall
+        back to the primary if there is none or connecting to it fails. Writes
+        must use get_async_session.
+        
+        Yields:
+            AsyncSession: Database session on a replica or the primary
+        """
+        if not self._initialized:
+            self.initialize()
+        
+        session = None
+        replica = await self._pick_replica() if self._replicas else None
+        if replica is not None:
+            session = replica["session_factory"]()
+            try:
+                # Connect before yielding so a failing replica can still fail over
+                await session.connection()
+                metrics.incr("db.read.replica")
+            except Exception as e:
+                await session.close()
+                replica["healthy"] = False
+                logger.warning(f"Read replica {replica['url']} unavailable, using the primary: {e}")
+                session = None
+        
+        if session is None:
+            metrics.incr("db.read.primary")
+            session = self._async_session_factory()
+        try:
+            yield session
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Read session error: {e}")
+            raise
+        finally:
+            await session.close()
+    
+    async def warmup(self, connections: Optional[int] = None) -> dict:
+        """
+        Open pooled connections ahead of the first requests.
+        
+        Connections to both engines (and the read replicas) are opened
+        concurrently and returned to their pools, so early requests do not pay
+        connection setup.
+        
+        Args:
+            connections: Connections to open per engine (defaults to pool_size)
+            
+        Returns:
+            dict: Connections opened and seconds taken per engine
+        """
+        if not self._initialized:
+            self.initialize()
+        
+        if db_settings.pgbouncer_mode:
+            # Nothing is pooled client-side, so there is nothing to warm up
+            return {"connections": 0, "async_seconds": 0.0, "sync_seconds": 0.0, "replica_seconds": []}
+        
+        connections = connections or db_settings.get_pool_limits()["pool_size"]
+        
+        async def warm_async(engine) -> float:
+            started = time.perf_counter()
+            conns = await asyncio.gather(*(engine.connect() for _ in range(connections)))
+            for conn in conns:
+                await conn.close()
+            return time.perf_counter() - started
+        
+        async def warm_replica(engine) -> Optional[float]:
+            try:
+                return await warm_async(engine)
+            except Exception as e:
+                logger.warning(f"Read replica warmup failed: {e}")
+                return None
+        
+        def warm_sync() -> float:
+            started = time.perf_counter()
+            conns = [self._engine.connect() for _ in range(connections)]
+            for conn in conns:
+                conn.close()
+            return time.perf_counter() - started
+        
+        loop = asyncio.get_running_loop()
+        async_seconds, sync_seconds, *replica_seconds = await asyncio.gather(
+            warm_async(self._async_engine),
+            loop.run_in_executor(None, warm_sync),
+            *(warm_replica(engine) for engine in self.replica_engines),
+        )
+        logger.info(
+            f"Warmed up {connections} connections per engine "
+            f"(async {async_seconds:.3f}s, sync {sync_seconds:.3f}s)"
+        )
+        return {
+            "connections": connections,
+            "async_seconds": round(async_seconds, 4),
+            "sync_seconds": round(sync_seconds, 4),
+            "replica_seconds": [None if seconds is None else round(seconds, 4) for seconds in replica_seconds],
+        }
+    
     def test_connection(self) -> bool:
         """
         Test database connection.
@@ -192,27 +393,62 @@ class DatabaseManager:
             logger.error(f"Async database connection test failed: {e}")
             return False
     
-    def get_pool_status(self) -> dict:
+    def _engine_pool_status(self, engine, name: str) -> dict:
         """
-        Get connection pool status.
+        Get the pool status and recorded pool metrics of one engine.
         
+        Args:
+            engine: Engine whose pool to inspect
+            name: Metrics prefix of the engine
+            
         Returns:
-            dict: Pool status information
+            dict: Pool occupancy, limits and metrics
         """
-        if not self._initialized or not self._engine:
-            return {"error": "Database not initialized"}
-        
-        try:
-            pool = self._engine.pool
-            return {
+        if db_settings.pgbouncer_mode:
+            status = {"pool_class": "NullPool"}
+        else:
+            pool = engine.pool
+            status = {
                 "pool_size": pool.size(),
                 "checked_in": pool.checkedin(),
                 "checked_out": pool.checkedout(),
                 "overflow": pool.overflow(),
                 "total_connections": pool.size() + pool.overflow(),
-                "max_overflow": db_settings.max_overflow,
+                "max_overflow": db_settings.get_pool_limits()["max_overflow"],
                 "pool_timeout": db_settings.pool_timeout,
             }
+        return {**status, "metrics": pool_metrics(name)}
+    
+    def get_pool_status(self) -> dict:
+        """
+        Get connection pool status of both engines.
+        
+        Returns:
+            dict: Per-engine pool status and metrics, with totals
+        """
+        if not self._initialized or not self._engine:
+            return {"error": "Database not initialized"}
+        
+        try:
+            engines = {
+                "sync": self._engine_pool_status(self._engine, "sync"),
+                "async": self._engine_pool_status(self._async_engine.sync_engine, "async"),
+            }
+            for index, replica in enumerate(self._replicas):
+                engines[f"replica{index}"] = {
+                    **self._engine_pool_status(replica["engine"].sync_engine, f"replica{index}"),
+                    "url": replica["url"],
+                    "healthy": replica["healthy"],
+                    "lag_seconds": replica["lag"],
+                }
+            return {
+                "checked_in": sum(status.get("checked_in", 0) for status in engines.values()),
+                "checked_out": sum(status.get("checked_out", 0) for status in engines.values()),
+                "pool_timeouts": sum(status["metrics"]["pool_timeouts"] for status in engines.values()),
+                "connection_budget": db_settings.connection_budget,
+                "pgbouncer_mode": db_settings.pgbouncer_mode,
+                "engines": engines,
+            }
         except Exception as e:
             logger.error(f"Failed to get pool status: {e}")
             return {"error": str(e)}
@@ -236,6 +472,10 @@ class DatabaseManager:
             await self._async_engine.dispose()
             logger.info("Async engine disposed")
         
+        for replica in self._replicas:
+            await replica["engine"].dispose()
+        self._replicas = []
+        
         if self._engine:
             self._engine.dispose()
             logger.info("Synchronous engine disposed")
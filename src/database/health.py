@@ -30,6 +30,7 @@ async def check_database_health() -> Dict[str, Any]:
                 "initialized": db_manager._initialized,
                 "pool_available": pool_status.get("checked_in", 0),
                 "pool_in_use": pool_status.get("checked_out", 0),
+                "pool_timeouts": pool_status.get("pool_timeouts", 0),
             }
         }
     except Exception as e:
@@ -63,6 +64,7 @@ def check_database_health_sync() -> Dict[str, Any]:
                 "initialized": db_manager._initialized,
                 "pool_available": pool_status.get("checked_in", 0),
                 "pool_in_use": pool_status.get("checked_out", 0),
+                "pool_timeouts": pool_status.get("pool_timeouts", 0),
             }
         }
     except Exception as e:
@@ -0,0 +1,128 @@
+"""Instrumented connection pools.
+
+Pool contention shows up as slow checkouts long before it turns into
+``TimeoutError`` 500s. The pool classes here time every checkout, and
+``instrument_engine`` attaches event listeners recording hold time per
+checkout and connection churn. Everything goes to the in-process metrics
+registry under ``db.<name>.*``:
+
+- ``checkout_wait_seconds``: time to get a connection (queueing, connecting
+  and pre-ping), observed per checkout
+- ``checkout_hold_seconds``: time a connection stays checked out
+- ``connection_lifetime_seconds``: age of connections when they are closed
+- ``connects`` / ``closes`` / ``invalidations``: connection churn
+- ``pool_timeouts``: checkouts that hit ``pool_timeout``
+"""
+
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+from ..metrics import metrics
+
+
+class _InstrumentedPoolMixin:
+    """Times checkouts and counts pool timeouts."""
+
+    # Metrics prefix, set per engine by instrument_engine
+    metrics_name = "default"
+
+    def connect(self):
+        """Check out a connection, recording the wait."""
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            metrics.incr(f"db.{self.metrics_name}.pool_timeouts")
+            raise
+        finally:
+            metrics.observe(f"db.{self.metrics_name}.checkout_wait_seconds", time.perf_counter() - started)
+
+    def recreate(self):
+        """Recreate the pool (on dispose), keeping its metrics prefix."""
+        pool = super().recreate()
+        pool.metrics_name = self.metrics_name
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    """QueuePool with checkout instrumentation."""
+
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool with checkout instrumentation."""
+
+
+class InstrumentedNullPool(_InstrumentedPoolMixin, NullPool):
+    """NullPool with checkout instrumentation (checkouts are connects)."""
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """
+    Record pool metrics of an engine under ``db.<name>.*``.
+
+    Args:
+        engine: Engine to instrument (the sync_engine of an AsyncEngine)
+        name: Metrics prefix of the engine (e.g. "sync", "async")
+    """
+    engine.pool.metrics_name = name
+
+    @event.listens_for(engine, "connect")
+    def receive_connect(dbapi_conn, connection_record):
+        """Count new connections."""
+        connection_record.info["connected_at"] = time.perf_counter()
+        metrics.incr(f"db.{name}.connects")
+
+    @event.listens_for(engine, "close")
+    def receive_close(dbapi_conn, connection_record):
+        """Count closed connections and record their lifetime."""
+        metrics.incr(f"db.{name}.closes")
+        connected_at = connection_record.info.get("connected_at") if connection_record is not None else None
+        if connected_at is not None:
+            metrics.observe(f"db.{name}.connection_lifetime_seconds", time.perf_counter() - connected_at)
+
+    @event.listens_for(engine, "invalidate")
+    def receive_invalidate(dbapi_conn, connection_record, exception):
+        """Count connections invalidated after errors."""
+        metrics.incr(f"db.{name}.invalidations")
+
+    @event.listens_for(engine, "checkout")
+    def receive_checkout(dbapi_conn, connection_record, connection_proxy):
+        """Remember when the connection was checked out."""
+        connection_record.info["checkout_at"] = time.perf_counter()
+
+    @event.listens_for(engine, "checkin")
+    def receive_checkin(dbapi_conn, connection_record):
+        """Record how long the connection was held."""
+        checkout_at = connection_record.info.pop("checkout_at", None) if connection_record is not None else None
+        if checkout_at is not None:
+            metrics.observe(f"db.{name}.checkout_hold_seconds", time.perf_counter() - checkout_at)
+
+
+def pool_metrics(name: str) -> dict:
+    """
+    Get the recorded pool metrics of an engine.
+
+    Args:
+        name: Metrics prefix of the engine
+
+    Returns:
+        dict: Checkout wait/hold summaries, lifetimes and churn counters
+    """
+    snapshot = metrics.snapshot()
+    prefix = f"db.{name}."
+    counters = {
+        key[len(prefix):]: value for key, value in snapshot["counters"].items() if key.startswith(prefix)
+    }
+    summaries = {
+        key[len(prefix):]: value for key, value in snapshot["summaries"].items() if key.startswith(prefix)
+    }
+    return {
+        "connects": counters.get("connects", 0),
+        "closes": counters.get("closes", 0),
+        "invalidations": counters.get("invalidations", 0),
+        "pool_timeouts": counters.get("pool_timeouts", 0),
+        **summaries,
+    }
@@ -0,0 +1,178 @@
+"""Shared pooled HTTP clients for upstream model APIs.
+
+Every upstream model client in a worker shares one sync and one async httpx
+client, so connections (and their TLS sessions) are kept alive and reused
+across requests instead of being negotiated per client. Connection reuse is
+recorded in the metrics registry:
+
+- ``http.requests``: requests sent
+- ``http.connections_opened``: new TCP connections
+- ``http.tls_handshakes``: TLS handshakes
+
+With warm pools ``http.connections_opened`` stays flat while
+``http.requests`` grows. Chat and embedding requests are spaced to the
+shared upstream quotas (see ``src.rate_limit``); 429 responses are counted
+as ``http.rate_limited``.
+"""
+
+import json
+import logging
+from typing import Optional
+
+import httpx
+from pydantic_settings import BaseSettings
+
+from .metrics import metrics
+from .rate_limit import estimate_request_tokens, rate_limiter
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPClientSettings(BaseSettings):
+    """Upstream HTTP client settings (HTTP_CLIENT_* environment variables)."""
+
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    http2: bool = True
+
+    connect_timeout: float = 5.0
+    read_timeout: float = 120.0
+    write_timeout: float = 30.0
+    pool_timeout: float = 10.0
+
+    class Config:
+        env_file = ".env"
+        env_prefix = "HTTP_CLIENT_"
+        case_sensitive = False
+        extra = "ignore"
+
+
+# Global settings instance
+http_settings = HTTPClientSettings()
+
+# Shared clients per worker, created on first use
+_clients = {"sync": None, "async": None}
+
+
+def _record(event_name: str) -> None:
+    """Count connection setup events reported by the transport."""
+    if event_name == "connection.connect_tcp.complete":
+        metrics.incr("http.connections_opened")
+    elif event_name == "connection.start_tls.complete":
+        metrics.incr("http.tls_handshakes")
+
+
+def _trace(event_name: str, info: dict) -> None:
+    _record(event_name)
+
+
+async def _atrace(event_name: str, info: dict) -> None:
+    _record(event_name)
+
+
+def _rate_limited_call(request: httpx.Request) -> Optional[tuple]:
+    """Get the (kind, estimated tokens) of a request subject to the upstream quotas."""
+    path = request.url.path
+    if path.endswith("/chat/completions"):
+        kind = "chat"
+    elif path.endswith("/embeddings"):
+        kind = "embedding"
+    else:
+        return None
+    try:
+        return kind, estimate_request_tokens(kind, json.loads(request.content or b"{}"))
+    except (ValueError, TypeError, AttributeError):
+        return kind, 0
+
+
+def _on_request(request: httpx.Request) -> None:
+    metrics.incr("http.requests")
+    request.extensions["trace"] = _trace
+    call = _rate_limited_call(request)
+    if call is not None:
+        rate_limiter.acquire_sync(*call)
+
+
+async def _aon_request(request: httpx.Request) -> None:
+    metrics.incr("http.requests")
+    request.extensions["trace"] = _atrace
+    call = _rate_limited_call(request)
+    if call is not None:
+        await rate_limiter.acquire(*call)
+
+
+def _on_response(response: httpx.Response) -> None:
+    if response.status_code == 429:
+        metrics.incr("http.rate_limited")
+
+
+async def _aon_response(response: httpx.Response) -> None:
+    _on_response(response)
+
+
+def _client_options() -> dict:
+    """Get the keyword arguments shared by the sync and async clients."""
+    http2 = http_settings.http2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("HTTP/2 requested but the h2 package is not installed; using HTTP/1.1")
+            http2 = False
+
+    return {
+        "http2": http2,
+        "limits": httpx.Limits(
+            max_connections=http_settings.max_connections,
+            max_keepalive_connections=http_settings.max_keepalive_connections,
+            keepalive_expiry=http_settings.keepalive_expiry,
+        ),
+        "timeout": httpx.Timeout(
+            connect=http_settings.connect_timeout,
+            read=http_settings.read_timeout,
+            write=http_settings.write_timeout,
+            pool=http_settings.pool_timeout,
+        ),
+    }
+
+
+def get_http_client() -> httpx.Client:
+    """
+    Get the shared sync HTTP client of this worker.
+
+    Returns:
+        httpx.Client: Pooled client for upstream API calls
+    """
+    if _clients["sync"] is None:
+        _clients["sync"] = httpx.Client(
+            **_client_options(),
+            event_hooks={"request": [_on_request], "response": [_on_response]},
+        )
+    return _clients["sync"]
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    Get the shared async HTTP client of this worker.
+
+    Returns:
+        httpx.AsyncClient: Pooled client for upstream API calls
+    """
+    if _clients["async"] is None:
+        _clients["async"] = httpx.AsyncClient(
+            **_client_options(),
+            event_hooks={"request": [_aon_request], "response": [_aon_response]},
+        )
+    return _clients["async"]
+
+
+async def close_http_clients() -> None:
+    """Close the shared HTTP clients (at application shutdown)."""
+    client: Optional[httpx.Client] = _clients["sync"]
+    if client is not None:
+        client.close()
+    async_client: Optional[httpx.AsyncClient] = _clients["async"]
+    if async_client is not None:
+        await async_client.aclose()
+    _clients["sync"] = _clients["async"] = None
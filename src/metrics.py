@@ -0,0 +1,83 @@
+"""Lightweight in-process metrics registry."""
+
+import threading
+from typing import Dict
+
+
+class MetricsRegistry:
+    """Thread-safe registry of counters and timing summaries."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._summaries: Dict[str, Dict[str, float]] = {}
+
+    def incr(self, name: str, value: float = 1) -> None:
+        """
+        Increment a counter.
+
+        Args:
+            name: Counter name
+            value: Amount to add
+        """
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float) -> None:
+        """
+        Record an observation (e.g. a latency in seconds) in a summary.
+
+        Args:
+            name: Summary name
+            value: Observed value
+        """
+        with self._lock:
+            summary = self._summaries.get(name)
+            if summary is None:
+                self._summaries[name] = {"count": 1, "sum": value, "min": value, "max": value}
+                return
+            summary["count"] += 1
+            summary["sum"] += value
+            summary["min"] = min(summary["min"], value)
+            summary["max"] = max(summary["max"], value)
+
+    def mean(self, name: str) -> float:
+        """
+        Get the mean of a summary.
+
+        Args:
+            name: Summary name
+
+        Returns:
+            float: Mean of the observed values, or 0.0 if nothing was observed
+        """
+        with self._lock:
+            summary = self._summaries.get(name)
+            if not summary:
+                return 0.0
+            return summary["sum"] / summary["count"]
+
+    def snapshot(self) -> dict:
+        """
+        Get a point-in-time copy of all metrics.
+
+        Returns:
+            dict: Counters and summaries (with derived means)
+        """
+        with self._lock:
+            summaries = {
+                name: {**summary, "mean": summary["sum"] / summary["count"]}
+                for name, summary in self._summaries.items()
+            }
+            return {"counters": dict(self._counters), "summaries": summaries}
+
+    def reset(self) -> None:
+        """Clear all metrics."""
+        with self._lock:
+            self._counters.clear()
+            self._summaries.clear()
+
+
+# Global metrics registry
+metrics = MetricsRegistry()
@@ -71,3 +71,56 @@ class ChatCompletionStreamResponse(BaseModel):
     created: int
     model: str
     choices: List[StreamChoice]
+
+
+class FileObject(BaseModel):
+    """Uploaded file (OpenAI compatible)."""
+    id: str
+    object: Literal["file"] = "file"
+    bytes: int
+    created_at: int
+    filename: str
+    purpose: str
+
+
+class BatchCreateRequest(BaseModel):
+    """Batch creation request (OpenAI compatible)."""
+    input_file_id: str
+    endpoint: Literal["/v1/chat/completions"] = "/v1/chat/completions"
+    completion_window: str = "24h"
+    metadata: Optional[Dict[str, str]] = None
+
+
+class BatchRequestCounts(BaseModel):
+    """Request counts of a batch."""
+    total: int
+    completed: int
+    failed: int
+
+
+class BatchErrors(BaseModel):
+    """Validation errors of a batch input file."""
+    object: Literal["list"] = "list"
+    data: List[Dict[str, str]]
+
+
+class BatchObject(BaseModel):
+    """Batch of chat completion requests (OpenAI compatible)."""
+    id: str
+    object: Literal["batch"] = "batch"
+    endpoint: str
+    input_file_id: str
+    completion_window: str
+    status: Literal[
+        "validating", "failed", "in_progress", "finalizing", "completed", "expired", "cancelling", "cancelled"
+    ]
+    output_file_id: Optional[str] = None
+    error_file_id: Optional[str] = None
+    errors: Optional[BatchErrors] = None
+    created_at: int
+    in_progress_at: Optional[int] = None
+    completed_at: Optional[int] = None
+    failed_at: Optional[int] = None
+    cancelled_at: Optional[int] = None
+    request_counts: BatchRequestCounts
+    metadata: Optional[Dict[str, str]] = None
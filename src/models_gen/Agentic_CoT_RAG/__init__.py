@@ -1,9 +1,17 @@
 """My Agentic CoT RAG model generator."""
 
-from typing import Generator, List
+import asyncio
+from typing import AsyncGenerator, List, Optional
+from langchain_core.messages import AIMessage
 from ..base import BaseModelGenerator
 from ...models import Message
+from .checkpoint import close_checkpointer, get_session_graph
+from .config import answer_stream_config, checkpoint_config, parallel_tool_config
 from .graph import graph
+from .index import ensure_vector_index
+from .titles import ensure_title_table
+from .readiness import check_collection, check_upstream
+from .tool import limit_parallel_searches
 
 
 class AgenticCoTRAGModelGenerator(BaseModelGenerator):
@@ -13,14 +21,47 @@ class AgenticCoTRAGModelGenerator(BaseModelGenerator):
         """Return the model name."""
         return "agentic-cot-rag"
     
-    def generate(self, messages: List[Message]) -> Generator[str, None, None]:
+    def startup(self) -> None:
+        """Validate the vector collection indexes and the title lookup table."""
+        ensure_vector_index()
+        ensure_title_table()
+    
+    async def readiness(self) -> dict:
+        """
+        Probe the vector collection and the upstream model API.
+        
+        An unreachable upstream is shared by every worker, so taking them all
+        out of rotation would not help; it is reported as ``degraded`` and
+        only the collection decides readiness.
+        """
+        collection, upstream = await asyncio.gather(check_collection(), check_upstream(), return_exceptions=True)
+        checks = {
+            name: {"ready": False, "error": str(result)} if isinstance(result, Exception) else result
+            for name, result in (("collection", collection), ("upstream", upstream))
+        }
+        return {"ready": checks["collection"]["ready"], "degraded": not checks["upstream"]["ready"], **checks}
+    
+    async def shutdown(self) -> None:
+        """Close the conversation checkpointer."""
+        await close_checkpointer()
+    
+    async def generate(self, messages: List[Message], session_id: Optional[str] = None) -> AsyncGenerator[str, None]:
         """
         Generate response tokens for My Agentic CoT RAG model.
         
-        This is a placeholder implementation. Replace with actual OpenAI API call.
+        Tokens of the agent's model calls are yielded as they are generated,
+        so the first token arrives without waiting for the whole run. Turns
+        calling tools, tool results and hook output are not part of the
+        answer and are skipped. Whether a turn calls tools is only known once
+        its tool call chunks arrive, so the start of each turn is held back
+        (``answer_stream_config``) and dropped if tool calls follow.
+        
+        With a session id the run resumes from the session's checkpointed
+        state, and ``messages`` are only the new messages of the turn.
         
         Args:
             messages: List of conversation messages
+            session_id: Conversation session id (optional)
             
         Yields:
             Generated tokens/chunks
@@ -30,17 +71,53 @@ class AgenticCoTRAGModelGenerator(BaseModelGenerator):
             "messages": [message.dict() for message in messages],
         }
 
-        # Stream response generation
-        for chunk in graph.stream(initial_state, stream_mode="updates", subgraphs=True):
-            # Skip empty chunks or pre-model hooks
-            if not chunk[0]:
+        # Resume the session's conversation from its checkpoint
+        run_graph, config = graph, None
+        if session_id and checkpoint_config["enabled"]:
+            run_graph = await get_session_graph()
+            config = {"configurable": {"thread_id": session_id}}
+
+        # Tool calls of a turn run concurrently, up to the per-request cap
+        limit_parallel_searches(parallel_tool_config["max_concurrency"])
+
+        # Ids of model turns that call tools, and of turns streamed as the answer
+        tool_call_turns, answer_turns = set(), set()
+        # Held back content of turns not yet known to be answers
+        held = {}
+        holdback = answer_stream_config["holdback_characters"]
+
+        # Stream response tokens
+        async for _, (message, metadata) in run_graph.astream(
+            initial_state, config=config, stream_mode="messages", subgraphs=True
+        ):
+            # Only the agent's model calls produce the answer
+            if metadata.get("langgraph_node") != "agent" or not isinstance(message, AIMessage):
                 continue
-            if "pre_model_hook" in chunk[1]:
+            if message.id not in answer_turns and (message.tool_calls or getattr(message, "tool_call_chunks", None)):
+                tool_call_turns.add(message.id)
+                held.pop(message.id, None)
+            if message.id in tool_call_turns:
                 continue
 
-            # Extract and yield the generated content
-            for update in chunk[1].values():
-                if "messages" in update:
-                    msg = update["messages"][-1]
-                    if "content" in msg:
-                        yield msg["content"]
\ No newline at end of file
+            # Extract the generated content
+            content = message.content
+            if isinstance(content, list):
+                content = "".join(part.get("text", "") for part in content if isinstance(part, dict))
+            if message.id in answer_turns:
+                if content:
+                    yield content
+                continue
+
+            # Hold the turn back until it ends or is long enough to be the answer
+            held[message.id] = held.get(message.id, "") + content
+            finished = bool(message.response_metadata.get("finish_reason"))
+            if finished or (holdback is not None and len(held[message.id]) > holdback):
+                answer_turns.add(message.id)
+                content = held.pop(message.id)
+                if content:
+                    yield content
+
+        # Turns that ended without a finish marker
+        for content in held.values():
+            if content:
+                yield content
@@ -0,0 +1,102 @@
+"""Postgres checkpointing of agent conversations, keyed by session id.
+
+Requests carrying a session id run on a graph compiled with a LangGraph
+Postgres checkpointer: the conversation state (including tool results) is
+stored per session, so follow-up turns send only the new messages and the
+agent resumes from the stored state.
+
+The checkpointer has its own psycopg pool of ``checkpoint_pool_size``
+connections per worker, counted in the database connection budget. In
+PgBouncer mode it keeps no idle connections and prepares no statements.
+"""
+import asyncio
+import logging
+from typing import Optional
+
+import psycopg
+from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+from sqlalchemy.engine import make_url
+
+from ...database import db_settings
+from .graph import workflow
+
+logger = logging.getLogger(__name__)
+
+# Advisory lock key serializing checkpoint table migrations across workers
+_SETUP_LOCK_KEY = 0x43484B50  # "CHKP"
+
+# Checkpointed graph and its connection pool, created on first use per worker
+_state = {"graph": None, "pool": None}
+_lock = asyncio.Lock()
+
+
+def _conninfo() -> str:
+    """Get the primary database URL in the form psycopg expects."""
+    url = make_url(db_settings.get_sync_url()).set(drivername="postgresql")
+    return url.render_as_string(hide_password=False)
+
+
+async def _setup(pool: AsyncConnectionPool) -> None:
+    """Create or migrate the checkpoint tables (serialized across workers)."""
+    async with pool.connection() as conn:
+        if db_settings.pgbouncer_mode:
+            # Session advisory locks do not hold across transaction pooling;
+            # migrations are idempotent, so a run losing a race is retried
+            try:
+                await AsyncPostgresSaver(conn).setup()
+            except psycopg.Error as e:
+                logger.info(f"Checkpoint table setup raced another worker, retrying: {e}")
+                await AsyncPostgresSaver(conn).setup()
+            return
+
+        # Migrate on the locked connection itself, so one connection suffices
+        await conn.execute("SELECT pg_advisory_lock(%s)", (_SETUP_LOCK_KEY,))
+        try:
+            await AsyncPostgresSaver(conn).setup()
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock(%s)", (_SETUP_LOCK_KEY,))
+
+
+async def get_session_graph():
+    """
+    Get the agent graph with Postgres checkpointing.
+
+    Returns
+    -------
+    CompiledStateGraph
+        The graph; pass ``{"configurable": {"thread_id": <session id>}}``
+        as its config.
+    """
+    if _state["graph"] is None:
+        async with _lock:
+            if _state["graph"] is None:
+                pool = AsyncConnectionPool(
+                    _conninfo(),
+                    # PgBouncer pools the server connections itself
+                    min_size=0 if db_settings.pgbouncer_mode else 1,
+                    max_size=max(db_settings.checkpoint_pool_size, 1),
+                    open=False,
+                    kwargs={
+                        "autocommit": True,
+                        # Prepared statements do not survive transaction pooling
+                        "prepare_threshold": None if db_settings.pgbouncer_mode else 0,
+                        "row_factory": dict_row,
+                    },
+                )
+                await pool.open()
+                await _setup(pool)
+                saver = AsyncPostgresSaver(pool)
+                _state["pool"] = pool
+                _state["graph"] = workflow.compile(checkpointer=saver)
+                logger.info("Conversation checkpointing ready")
+    return _state["graph"]
+
+
+async def close_checkpointer() -> None:
+    """Close the checkpointer's connection pool (at application shutdown)."""
+    pool: Optional[AsyncConnectionPool] = _state["pool"]
+    if pool is not None:
+        await pool.close()
+    _state["graph"] = _state["pool"] = None
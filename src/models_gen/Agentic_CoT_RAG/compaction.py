@@ -0,0 +1,222 @@
+"""Compaction of the agent's conversation history.
+
+- Tool results: once the model has read a tool result, and newer results
+  have arrived, the state reducer replaces it with a short digest, so it is
+  not re-sent in full on every later ReAct step.
+- History: once a conversation exceeds its token budget, the turns older
+  than the most recent ones are replaced with a rolling summary before each
+  model call. A summary is identified by a digest of the messages it
+  covers, so it is reused as long as those messages are unchanged, and
+  extended with only the newly compacted turns when the conversation grows.
+"""
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langgraph.graph.message import Messages, add_messages
+
+from ...core.tokenizer import estimate_tokens
+from ...metrics import metrics
+from .config import history_compaction_config, tool_output_compaction_config
+
+# Rolling summaries by digest of the messages they cover, per worker
+_summaries: "OrderedDict[str, str]" = OrderedDict()
+
+
+def message_text(message: BaseMessage) -> str:
+    """
+    Get the text of a message, including its tool calls.
+
+    Parameters
+    ----------
+    message : BaseMessage
+        The message.
+
+    Returns
+    -------
+    str
+        The text content, followed by the JSON of any tool calls.
+    """
+    content = message.content
+    if isinstance(content, list):
+        content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        content = f"{content}\n{json.dumps(tool_calls, ensure_ascii=False)}"
+    return content
+
+
+def digest_tool_output(content: str, max_characters: int) -> str:
+    """
+    Shorten a tool result the model has already read.
+
+    Parameters
+    ----------
+    content : str
+        The tool result (``keywords_search`` Markdown wrapped in ``<think>``).
+    max_characters : int
+        Characters of the result kept after the document titles.
+
+    Returns
+    -------
+    str
+        The titles of the documents found and the start of the result.
+    """
+    text = re.sub(r"^\s*<think>\s*(```markdown\s*)?|(\s*```)?\s*</think>\s*$", "", content)
+    titles = re.findall(r"^# Document: (.+)$", text, flags=re.MULTILINE)
+    head = text[:max_characters] + ("..." if len(text) > max_characters else "")
+    found = f" Documents: {'; '.join(titles)}." if titles else ""
+    return f"<think>\n[Earlier tool result, already read; shortened.{found}]\n{head}\n</think>"
+
+
+def add_compacted_messages(left: Messages, right: Messages) -> List[BaseMessage]:
+    """
+    Merge message updates, then compact tool results the model has already read.
+
+    A tool result is compacted once an AI message follows it (the model has
+    read it) and it is not among the ``keep_recent`` latest tool results.
+    Compacted results keep their message and tool call ids.
+
+    Parameters
+    ----------
+    left : Messages
+        The messages in the state.
+    right : Messages
+        The update.
+
+    Returns
+    -------
+    list of BaseMessage
+        The merged messages.
+    """
+    messages = add_messages(left, right)
+    config = tool_output_compaction_config
+    if not config["enabled"]:
+        return messages
+
+    last_ai = max((index for index, message in enumerate(messages) if isinstance(message, AIMessage)), default=-1)
+    tool_indexes = [index for index, message in enumerate(messages) if isinstance(message, ToolMessage)]
+    stale = tool_indexes[:max(len(tool_indexes) - config["keep_recent"], 0)]
+    for index in stale:
+        message = messages[index]
+        if index > last_ai or message.additional_kwargs.get("compacted") or not isinstance(message.content, str):
+            continue
+        digest = digest_tool_output(message.content, config["digest_characters"])
+        if len(digest) >= len(message.content):
+            continue
+        metrics.incr("tool_compaction.compacted")
+        metrics.incr("tool_compaction.characters_saved", len(message.content) - len(digest))
+        messages[index] = message.model_copy(update={
+            "content": digest,
+            "additional_kwargs": {**message.additional_kwargs, "compacted": True},
+        })
+    return messages
+
+
+def _prefix_digests(messages: Sequence[BaseMessage]) -> List[str]:
+    """Get a digest of each prefix of the messages (element i covers messages[:i + 1])."""
+    digests, digest = [], hashlib.sha256()
+    for message in messages:
+        digest.update(message.type.encode("utf-8"))
+        # Tool results are identified by their call, as they may be compacted later
+        text = message.tool_call_id if isinstance(message, ToolMessage) else message_text(message)
+        digest.update(text.encode("utf-8"))
+        digests.append(digest.copy().hexdigest())
+    return digests
+
+
+def _split_point(messages: Sequence[BaseMessage], tokens: List[int], start: int, keep_tokens: int) -> int:
+    """
+    Get the index of the first message kept verbatim.
+
+    Kept turns start at a user message, so tool calls stay with their
+    results; the latest user turn is always kept.
+    """
+    split, total = len(messages), 0
+    for index in range(len(messages) - 1, start - 1, -1):
+        total += tokens[index]
+        if isinstance(messages[index], HumanMessage):
+            if total > keep_tokens and split < len(messages):
+                break
+            split = index
+    return split if split < len(messages) else start
+
+
+async def compact_history(
+    messages: Sequence[BaseMessage],
+    summary: Optional[dict],
+    summarize: Callable[[Optional[str], Sequence[BaseMessage]], Awaitable[str]],
+) -> Tuple[List[BaseMessage], Optional[dict]]:
+    """
+    Replace older turns with a rolling summary once the history exceeds its budget.
+
+    Parameters
+    ----------
+    messages : sequence of BaseMessage
+        The conversation.
+    summary : dict, optional
+        The summary stored in the agent state (``digest``, ``count``, ``text``).
+    summarize : callable
+        Extends a previous summary (or None) with messages, returning the new summary.
+
+    Returns
+    -------
+    tuple of (list of BaseMessage, dict or None)
+        The messages to send to the model, and the summary to store in the
+        agent state (None if it is unchanged).
+    """
+    config = history_compaction_config
+    tokens = [estimate_tokens(message_text(message)) for message in messages]
+    if not config["enabled"] or sum(tokens) <= config["max_tokens"]:
+        return list(messages), None
+
+    # Leading system messages are instructions, never summarized
+    start = 0
+    while start < len(messages) and isinstance(messages[start], SystemMessage):
+        start += 1
+    split = _split_point(messages, tokens, start, config["keep_tokens"])
+    if split <= start:
+        return list(messages), None
+
+    # Reuse the longest summary of a prefix of the compacted turns
+    digests = _prefix_digests(messages[:split])
+    known = dict(_summaries)
+    if summary is not None:
+        known[summary["digest"]] = summary["text"]
+    covered, text = start, None
+    for end in range(split, start, -1):
+        if digests[end - 1] in known:
+            covered, text = end, known[digests[end - 1]]
+            break
+
+    if covered < split:
+        started = time.perf_counter()
+        text = await summarize(text, messages[covered:split])
+        metrics.observe("history_compaction.summarize_seconds", time.perf_counter() - started)
+        metrics.incr("history_compaction.summarized_messages", split - covered)
+    else:
+        metrics.incr("history_compaction.summary_reused")
+
+    digest = digests[split - 1]
+    _summaries[digest] = text
+    _summaries.move_to_end(digest)
+    while len(_summaries) > config["cache_size"]:
+        _summaries.popitem(last=False)
+
+    compacted = [
+        *messages[:start],
+        SystemMessage(f"Summary of the earlier conversation:\n{text}"),
+        *messages[split:],
+    ]
+    metrics.incr(
+        "history_compaction.tokens_saved",
+        sum(tokens[start:split]) - estimate_tokens(message_text(compacted[start])),
+    )
+    updated = None if summary is not None and summary["digest"] == digest else {
+        "digest": digest, "count": split, "text": text,
+    }
+    return compacted, updated
@@ -1,19 +1,183 @@
 """Default configurations for Agentic CoT RAG model generator."""
 
-# Embedding model configuration
+# Embedding model configuration.
+# "dimensions" shortens text-embedding-3 vectors and must equal the vector
+# store "embedding_length" (change both with the migrate command).
 embedding_model_config = {
     "model": "text-embedding-3-small",
+    "dimensions": 1536,
 }
 
 # Vector store configuration
 vectorstore_config = {
     "collection_name": "my_docs",
+    "embedding_length": 1536,
     "use_jsonb": True,
     "pre_delete_collection": False,
 }
 
+# ANN index configuration for the vector store
+vector_index_config = {
+    "method": "hnsw",  # "hnsw" or "ivfflat"
+    "distance": "cosine",  # must match the vector store distance strategy
+    # Indexed representation: "vector" (float32), "halfvec" (float16) or
+    # "binary" (1 bit per dimension, Hamming distance)
+    "storage": "vector",
+    # Quantized storage fetches rerank_factor * k candidates, re-ranked at full precision
+    "rerank_factor": 4,
+    "hnsw_m": 16,
+    "hnsw_ef_construction": 64,
+    "hnsw_ef_search": 40,
+    "ivfflat_lists": 100,
+    "ivfflat_probes": 10,
+    # With pgvector 0.8+, keep scanning the index until enough rows pass the
+    # title/department filters: "relaxed_order", "strict_order" (HNSW) or None.
+    # Older versions search filtered queries exactly instead.
+    "iterative_scan": "relaxed_order",
+    "create_on_startup": False,
+    # Metadata keys filtered on by the tools (indexed as cmetadata->>'<key>')
+    "metadata_keys": ["title", "department", "source", "ingest_key"],
+}
+
+# Retrieval configuration for keywords_search
+retrieval_config = {
+    "mode": "hybrid",  # "vector" or "hybrid" (lexical + vector, fused with RRF)
+    "k": 10,
+    # Hybrid search settings
+    "candidates": 40,  # candidates per ranking before fusion
+    "rrf_k": 60,
+    "vector_weight": 1.0,
+    "lexical_weight": 1.0,
+    "text_search_config": "simple",  # language-agnostic; CJK relies on trigram matching
+}
+
+# Adaptive top-k for keywords_search.
+# Vector hits farther than max_distance, or after the first distance gap of at
+# least elbow_gap (once min_k hits are kept), are dropped in SQL. None uses the
+# thresholds calibrated for the collection (`index calibrate`).
+adaptive_retrieval_config = {
+    "enabled": True,
+    "min_k": 3,
+    "max_distance": None,
+    "elbow_gap": None,
+    # Calibration on query embeddings: max_distance is this percentile of
+    # distances between queries and random chunks, elbow_gap this percentile of
+    # gaps between the queries' nearest neighbours. Without real queries, the
+    # first calibration_query_words words of sampled chunks stand in for them.
+    "calibration_queries": 200,
+    "calibration_query_words": 8,
+    "distance_percentile": 0.05,
+    "gap_percentile": 0.95,
+    "cache_seconds": 300,  # how long workers cache the calibrated thresholds
+}
+
+# Maximal marginal relevance (MMR) reranking for keywords_search.
+# fetch_k candidates are retrieved per keyword and k diverse hits selected.
+mmr_config = {
+    "enabled": True,
+    "fetch_k": 30,
+    "lambda_mult": 0.5,  # 1.0 ranks by relevance only, 0.0 by diversity only
+}
+
+# Fuzzy title resolution for the "title" filter of keywords_search
+title_resolution_config = {
+    "enabled": True,
+    "min_similarity": 0.3,
+    "max_candidates": 3,
+}
+
+# Per-department partitions of the collection.
+# Departments with at least min_rows chunks get their own partial ANN index, and
+# searches filtered to a department (or to titles of one department) use it.
+partition_config = {
+    "enabled": False,  # rebuild partitions after each ingestion run
+    "min_rows": 5000,
+    "cache_seconds": 60,  # how long workers cache the partition registry
+}
+
 # Chat model configuration
 chatmodel_config = {
     "model": "gpt-5-nano",
     "max_completion_tokens": 4096,
 }
+
+# Hedged requests and retries for chat model calls (agent and summarizer).
+# A call still unanswered at hedge_percentile of recent latencies is duplicated
+# and the first response wins; transient errors are retried with jittered
+# backoff. Hedges and retries share a budget of extra_call_ratio extra calls
+# per request (at most extra_call_burst at once).
+hedging_config = {
+    "enabled": True,
+    "hedge_percentile": 0.95,  # None disables hedging (retries only)
+    "hedge_min_samples": 20,
+    "hedge_initial_delay": None,  # hedge delay before enough latencies are observed
+    "latency_window": 200,
+    "extra_call_ratio": 0.1,
+    "extra_call_burst": 10,
+    "max_retries": 2,
+    "backoff_base": 0.5,
+    "backoff_max": 8.0,
+}
+
+# Streaming of the answer. Content of a model turn is held back until the
+# turn ends or exceeds holdback_characters without calling tools, so preambles
+# of tool-calling turns do not reach the client. A turn calling tools after a
+# longer preamble leaks that preamble; None holds back whole turns (no
+# incremental streaming, nothing leaks).
+answer_stream_config = {
+    "holdback_characters": 200,
+}
+
+# Conversation checkpointing for requests with an X-Session-Id header. The
+# state of each session is stored in Postgres, so follow-up turns send only the
+# new messages. The checkpointer's connections per worker are set by
+# CHECKPOINT_POOL_SIZE and counted in the database connection budget.
+checkpoint_config = {
+    "enabled": True,
+}
+
+# History compaction before each agent model call.
+# Once the conversation exceeds max_tokens, the turns older than the most recent
+# keep_tokens are replaced with a rolling summary. Summaries are kept in the
+# agent state and in a per-worker cache, so each older turn is summarized once.
+history_compaction_config = {
+    "enabled": True,
+    "max_tokens": 6000,
+    "keep_tokens": 2000,  # the latest user turn is always kept verbatim
+    "summary_max_words": 300,
+    "cache_size": 256,  # summaries cached per worker
+}
+
+# Compaction of tool results the agent has already read.
+# Tool results older than the keep_recent most recent ones are replaced in the
+# state with a digest (document titles and the first digest_characters).
+tool_output_compaction_config = {
+    "enabled": True,
+    "keep_recent": 2,
+    "digest_characters": 500,
+}
+
+# Tool calls of one agent turn run concurrently; max_concurrency caps the
+# concurrent keywords_search calls per request.
+parallel_tool_config = {
+    "max_concurrency": 3,
+}
+
+# Summarizer pass-through configuration.
+# Small, confident result sets are formatted directly into the tool message
+# instead of paying for an extra summarizer call.
+passthrough_config = {
+    "enabled": True,
+    "max_documents": 3,
+    "max_characters": 2000,
+    "max_distance": 0.35,
+}
+
+# Bulk ingestion configuration
+ingestion_config = {
+    "chunk_size": 1000,
+    "chunk_overlap": 150,
+    "window_size": 512,  # sources chunked/embedded/written per pipeline step
+    "embedding_batch_size": 256,  # texts per embedding request
+    "max_concurrency": 8,  # in-flight embedding requests (rate: UPSTREAM_EMBEDDING_*)
+}
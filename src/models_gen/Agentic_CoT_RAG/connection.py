@@ -1,18 +1,49 @@
 """Connection setup for Agentic CoT RAG model components."""
 from langchain_postgres import PGVector
-from langchain.embeddings.openai import OpenAIEmbeddings, ChatOpenAI
-from database import db_manager
-from .config import vectorstore_config, chatmodel_config, embedding_model_config
+from langchain_openai import OpenAIEmbeddings, ChatOpenAI
+from ...database import db_manager
+from ...http_client import get_http_client, get_async_http_client
+from ..hedging import HedgedChatModel
+from .config import vectorstore_config, chatmodel_config, embedding_model_config, hedging_config
+from .index import install_search_settings
 
 
-# Initialize the chat completion connection
-chat_model = ChatOpenAI(**chatmodel_config)
+# Initialize the chat completion connection on the worker's shared HTTP clients
+base_chat_model = ChatOpenAI(
+    **chatmodel_config,
+    http_client=get_http_client(),
+    http_async_client=get_async_http_client(),
+    # Retries are left to the hedging wrapper, which budgets them
+    **({"max_retries": 0} if hedging_config["enabled"] else {}),
+)
+
+# Wrap it with hedged requests and retries to cut tail latency
+if hedging_config["enabled"]:
+    options = {key: value for key, value in hedging_config.items() if key != "enabled"}
+    chat_model = HedgedChatModel(model=base_chat_model, metrics_name="llm.chat", **options)
+else:
+    chat_model = base_chat_model
+
+# Initialize the embedding model connection on the same clients (same upstream host)
+embeddings = OpenAIEmbeddings(
+    **embedding_model_config,
+    http_client=get_http_client(),
+    http_async_client=get_async_http_client(),
+)
 
-# Initialize the embedding model connection
-embeddings = OpenAIEmbeddings(**embedding_model_config)
+# Initialize the database engines and apply ANN search settings to their connections
+if not db_manager._initialized:
+    db_manager.initialize()
+install_search_settings(db_manager._engine)
+install_search_settings(db_manager._async_engine.sync_engine)
+for replica_engine in db_manager.replica_engines:
+    install_search_settings(replica_engine.sync_engine)
 
-# Initialize the vector store connection
+# Initialize the vector store connection on the async engine (asyncpg), so
+# vector queries are awaited on the event loop instead of holding a thread
 vectorstore = PGVector(
     **vectorstore_config,
-    connection=db_manager._engine,
+    embeddings=embeddings,
+    connection=db_manager._async_engine,
+    async_mode=True,
 )
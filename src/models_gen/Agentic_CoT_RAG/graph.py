@@ -5,7 +5,7 @@ from .state import AgenticCoTRAGState
 
 
 workflow = StateGraph(AgenticCoTRAGState)
-workflow.add_agent(react_agent, "react_agent")
+workflow.add_node("react_agent", react_agent)
 workflow.set_entry_point("react_agent")
 workflow.add_edge("react_agent", END)
 graph = workflow.compile()
\ No newline at end of file
@@ -0,0 +1,574 @@
+"""ANN index lifecycle management for the Agentic CoT RAG vector collection.
+
+Run as a management command::
+
+    python -m src.models_gen.Agentic_CoT_RAG.index validate
+    python -m src.models_gen.Agentic_CoT_RAG.index create --method hnsw
+    python -m src.models_gen.Agentic_CoT_RAG.index drop
+    python -m src.models_gen.Agentic_CoT_RAG.index metadata
+    python -m src.models_gen.Agentic_CoT_RAG.index lexical
+    python -m src.models_gen.Agentic_CoT_RAG.index titles
+    python -m src.models_gen.Agentic_CoT_RAG.index partitions
+    python -m src.models_gen.Agentic_CoT_RAG.index calibrate
+"""
+import argparse
+import json
+import logging
+from contextlib import contextmanager
+from typing import List, Optional
+from sqlalchemy import event, text
+from sqlalchemy.engine import Connection, Engine
+from ...database import db_manager, db_settings
+from .config import vectorstore_config, vector_index_config, retrieval_config
+
+logger = logging.getLogger(__name__)
+
+# Tables created by langchain_postgres.PGVector
+EMBEDDING_TABLE = "langchain_pg_embedding"
+COLLECTION_TABLE = "langchain_pg_collection"
+
+# pgvector capabilities of the database, detected on the first connection per worker
+_pgvector = {"iterative_scan": None}
+_PGVECTOR_VERSION_QUERY = "SELECT extversion FROM pg_extension WHERE extname = 'vector'"
+
+# Operator class suffixes and distance operators per distance strategy
+OPERATOR_CLASSES = {
+    "cosine": "cosine_ops",
+    "euclidean": "l2_ops",
+    "inner_product": "ip_ops",
+}
+DISTANCE_OPERATORS = {
+    "cosine": "<=>",
+    "euclidean": "<->",
+    "inner_product": "<#>",
+}
+
+# Supported embedding storage formats for the ANN index
+STORAGE_FORMATS = ("vector", "halfvec", "binary")
+
+# Advisory lock key so only one worker builds the index at startup
+_INDEX_LOCK_KEY = 0x5EC7_0001
+
+
+def index_name(method: Optional[str] = None, storage: Optional[str] = None) -> str:
+    """
+    Get the name of the ANN index for an index method and storage format.
+
+    Parameters
+    ----------
+    method : str | None, optional
+        ``"hnsw"`` or ``"ivfflat"``. Defaults to the configured method.
+    storage : str | None, optional
+        ``"vector"``, ``"halfvec"`` or ``"binary"``. Defaults to the configured storage.
+
+    Returns
+    -------
+    str
+        The index name.
+    """
+    method = method or vector_index_config["method"]
+    storage = storage or vector_index_config["storage"]
+    suffix = "" if storage == "vector" else f"_{storage}"
+    return f"ix_{EMBEDDING_TABLE}_embedding_{method}{suffix}"
+
+
+def storage_expressions(storage: Optional[str] = None, param: str = ":embedding") -> dict:
+    """
+    Get the SQL expressions that index and query embeddings in a storage format.
+
+    ``halfvec`` indexes half-precision casts of the embeddings and ``binary``
+    indexes their binary quantization. Both are expression indexes over the
+    full-precision column, which stays available for re-ranking.
+
+    Parameters
+    ----------
+    storage : str | None, optional
+        ``"vector"``, ``"halfvec"`` or ``"binary"``. Defaults to the configured storage.
+    param : str, optional
+        The bind parameter holding the query embedding (pgvector text form). It
+        is cast through ``text`` so asyncpg sends it as a string.
+
+    Returns
+    -------
+    dict
+        ``column`` (indexed expression), ``opclass``, ``operator`` and ``query``
+        (query embedding expression).
+    """
+    storage = storage or vector_index_config["storage"]
+    distance = vector_index_config["distance"]
+    dimensions = int(vectorstore_config["embedding_length"])
+    if storage == "vector":
+        return {
+            "column": "embedding",
+            "opclass": f"vector_{OPERATOR_CLASSES[distance]}",
+            "operator": DISTANCE_OPERATORS[distance],
+            "query": f"CAST(CAST({param} AS text) AS vector({dimensions}))",
+        }
+    if storage == "halfvec":
+        return {
+            "column": f"(embedding::halfvec({dimensions}))",
+            "opclass": f"halfvec_{OPERATOR_CLASSES[distance]}",
+            "operator": DISTANCE_OPERATORS[distance],
+            "query": f"CAST(CAST({param} AS text) AS halfvec({dimensions}))",
+        }
+    if storage == "binary":
+        return {
+            "column": f"(binary_quantize(embedding)::bit({dimensions}))",
+            "opclass": "bit_hamming_ops",
+            "operator": "<~>",
+            "query": f"binary_quantize(CAST(CAST({param} AS text) AS vector({dimensions})))",
+        }
+    raise ValueError(f"Unsupported storage '{storage}'. Expected one of {STORAGE_FORMATS}.")
+
+
+def _index_options(method: str) -> str:
+    """Build the ``WITH (...)`` storage options for an index method."""
+    if method == "hnsw":
+        return f"m = {int(vector_index_config['hnsw_m'])}, ef_construction = {int(vector_index_config['hnsw_ef_construction'])}"
+    if method == "ivfflat":
+        return f"lists = {int(vector_index_config['ivfflat_lists'])}"
+    raise ValueError(f"Unsupported index method '{method}'. Expected 'hnsw' or 'ivfflat'.")
+
+
+def search_settings(**overrides) -> dict:
+    """
+    Get the per-query search settings for the ANN index.
+
+    Parameters
+    ----------
+    **overrides
+        Values overriding the configured ``hnsw_ef_search`` and ``ivfflat_probes``.
+
+    Returns
+    -------
+    dict
+        Mapping of Postgres setting name to value.
+    """
+    return {
+        "hnsw.ef_search": int(overrides.get("hnsw_ef_search", vector_index_config["hnsw_ef_search"])),
+        "ivfflat.probes": int(overrides.get("ivfflat_probes", vector_index_config["ivfflat_probes"])),
+    }
+
+
+def _supports_iterative_scan(version: Optional[str]) -> bool:
+    """Whether a pgvector version (``extversion``) has iterative index scans (0.8.0+)."""
+    try:
+        return tuple(int(part) for part in (version or "").split(".")[:2]) >= (0, 8)
+    except ValueError:
+        return False
+
+
+def iterative_scan_enabled() -> Optional[bool]:
+    """
+    Whether filtered ANN searches scan the index iteratively.
+
+    Returns
+    -------
+    bool | None
+        None until the pgvector version was detected on a first connection.
+    """
+    if not vector_index_config["iterative_scan"]:
+        return False
+    return _pgvector["iterative_scan"]
+
+
+def _connection_settings(version_of) -> dict:
+    """Get the search settings to apply, detecting pgvector's version through ``version_of()`` once."""
+    if _pgvector["iterative_scan"] is None:
+        _pgvector["iterative_scan"] = _supports_iterative_scan(version_of())
+    settings = search_settings()
+    if iterative_scan_enabled():
+        # Keep scanning the index until enough rows pass the filter
+        settings["hnsw.iterative_scan"] = vector_index_config["iterative_scan"]
+        settings["ivfflat.iterative_scan"] = "relaxed_order"  # the only mode of IVFFlat
+    return settings
+
+
+def install_search_settings(engine: Engine) -> None:
+    """
+    Apply the configured search settings to every new connection of an engine.
+
+    Settings are applied once per pooled connection, so queries pay no extra
+    round-trip. Use :func:`search_settings_scope` to override them for a single
+    transaction. With pgvector 0.8+ iterative index scans are enabled too, so
+    filters applied after the ANN scan still return ``k`` rows; the version
+    is detected on the first connection.
+
+    Behind PgBouncer in transaction pooling mode a session-level ``SET`` would
+    stick to whichever server connection ran it, so the settings are instead
+    applied transaction-locally at the start of every transaction, in one
+    ``set_config`` statement.
+
+    Parameters
+    ----------
+    engine : Engine
+        A sync engine, or the ``sync_engine`` of an async engine.
+    """
+    if db_settings.pgbouncer_mode:
+        @event.listens_for(engine, "begin")
+        def apply_local_search_settings(conn):
+            """Set the ANN search settings for the new transaction."""
+            settings = _connection_settings(lambda: conn.exec_driver_sql(_PGVECTOR_VERSION_QUERY).scalar())
+            conn.exec_driver_sql(
+                "SELECT " + ", ".join(f"set_config('{name}', '{value}', true)" for name, value in settings.items())
+            )
+
+        return
+
+    @event.listens_for(engine, "connect")
+    def apply_search_settings(dbapi_conn, connection_record):
+        """Set the ANN search settings on a new connection."""
+        cursor = dbapi_conn.cursor()
+        try:
+            def version_of():
+                cursor.execute(_PGVECTOR_VERSION_QUERY)
+                row = cursor.fetchone()
+                return row[0] if row else None
+
+            for name, value in _connection_settings(version_of).items():
+                cursor.execute(f"SET {name} = {value}")
+        finally:
+            cursor.close()
+
+
+@contextmanager
+def search_settings_scope(conn: Connection, **overrides):
+    """
+    Override the ANN search settings for the current transaction.
+
+    Parameters
+    ----------
+    conn : Connection
+        A connection with an open transaction.
+    **overrides
+        ``hnsw_ef_search`` and/or ``ivfflat_probes`` values.
+    """
+    for name, value in search_settings(**overrides).items():
+        conn.execute(text(f"SET LOCAL {name} = {int(value)}"))
+    yield conn
+
+
+def _embedding_column_type(conn: Connection) -> Optional[str]:
+    """Get the SQL type of the embedding column, or None if the table does not exist."""
+    return conn.execute(
+        text(
+            "SELECT format_type(a.atttypid, a.atttypmod) FROM pg_attribute a "
+            "WHERE a.attrelid = to_regclass(:table) AND a.attname = 'embedding'"
+        ),
+        {"table": EMBEDDING_TABLE},
+    ).scalar()
+
+
+def validate_vector_index(
+    conn: Optional[Connection] = None,
+    method: Optional[str] = None,
+    storage: Optional[str] = None,
+) -> dict:
+    """
+    Inspect the embedding table and report on its ANN index.
+
+    Parameters
+    ----------
+    conn : Connection | None, optional
+        Connection to use. A new connection is opened if not provided.
+    method : str | None, optional
+        ``"hnsw"`` or ``"ivfflat"``. Defaults to the configured method.
+    storage : str | None, optional
+        ``"vector"``, ``"halfvec"`` or ``"binary"``. Defaults to the configured storage.
+
+    Returns
+    -------
+    dict
+        Validation report with ``status`` ("ok", "missing", "invalid" or "error")
+        and details on the embedding column and index.
+    """
+    if conn is None:
+        if not db_manager._initialized:
+            db_manager.initialize()
+        with db_manager._engine.connect() as new_conn:
+            return validate_vector_index(new_conn, method, storage)
+
+    method = method or vector_index_config["method"]
+    storage = storage or vector_index_config["storage"]
+    report = {"index": index_name(method, storage), "method": method, "storage": storage}
+    column_type = _embedding_column_type(conn)
+    report["column_type"] = column_type
+    if column_type is None:
+        report["status"] = "error"
+        report["detail"] = f"Table '{EMBEDDING_TABLE}' does not exist"
+        return report
+
+    row = conn.execute(
+        text(
+            "SELECT am.amname, i.indisvalid, pg_relation_size(c.oid) "
+            "FROM pg_class c "
+            "JOIN pg_index i ON i.indexrelid = c.oid "
+            "JOIN pg_am am ON am.oid = c.relam "
+            "WHERE c.relname = :name"
+        ),
+        {"name": report["index"]},
+    ).first()
+    if row is None:
+        report["status"] = "missing"
+    elif row[0] != report["method"] or not row[1]:
+        report["status"] = "invalid"
+        report["detail"] = f"Index uses '{row[0]}' (valid={row[1]})"
+    else:
+        report["status"] = "ok"
+        report["size_bytes"] = row[2]
+
+    if column_type == "vector":
+        report["detail"] = "Embedding column has no fixed dimension; ANN indexes require vector(n)"
+    return report
+
+
+def create_vector_index(
+    method: Optional[str] = None,
+    concurrently: bool = True,
+    storage: Optional[str] = None,
+) -> dict:
+    """
+    Create the ANN index on the embedding table.
+
+    The embedding column is first pinned to ``vector(embedding_length)`` if it
+    was created without a dimension. Any existing invalid index is rebuilt.
+
+    Parameters
+    ----------
+    method : str | None, optional
+        ``"hnsw"`` or ``"ivfflat"``. Defaults to the configured method.
+    concurrently : bool, optional
+        Build without blocking writes (``CREATE INDEX CONCURRENTLY``).
+    storage : str | None, optional
+        ``"vector"``, ``"halfvec"`` or ``"binary"``. Defaults to the configured storage.
+
+    Returns
+    -------
+    dict
+        The validation report after the index was built.
+    """
+    method = method or vector_index_config["method"]
+    storage = storage or vector_index_config["storage"]
+    name = index_name(method, storage)
+    expressions = storage_expressions(storage)
+    dimensions = int(vectorstore_config["embedding_length"])
+
+    if not db_manager._initialized:
+        db_manager.initialize()
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with db_manager._engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        column_type = _embedding_column_type(conn)
+        if column_type == "vector":
+            logger.info(f"Pinning {EMBEDDING_TABLE}.embedding to vector({dimensions})")
+            conn.execute(text(f"ALTER TABLE {EMBEDDING_TABLE} ALTER COLUMN embedding TYPE vector({dimensions})"))
+
+        report = validate_vector_index(conn, method, storage)
+        if report["status"] == "invalid":
+            logger.warning(f"Dropping invalid index {name}: {report.get('detail')}")
+            conn.execute(text(f"DROP INDEX {'CONCURRENTLY ' if concurrently else ''}IF EXISTS {name}"))
+
+        logger.info(f"Creating {method} index {name}")
+        conn.execute(
+            text(
+                f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {name} "
+                f"ON {EMBEDDING_TABLE} USING {method} ({expressions['column']} {expressions['opclass']}) "
+                f"WITH ({_index_options(method)})"
+            )
+        )
+        conn.execute(text(f"ANALYZE {EMBEDDING_TABLE}"))
+        return validate_vector_index(conn, method, storage)
+
+
+def drop_vector_index(method: Optional[str] = None, storage: Optional[str] = None) -> None:
+    """
+    Drop the ANN index on the embedding table.
+
+    Parameters
+    ----------
+    method : str | None, optional
+        ``"hnsw"`` or ``"ivfflat"``. Defaults to the configured method.
+    storage : str | None, optional
+        ``"vector"``, ``"halfvec"`` or ``"binary"``. Defaults to the configured storage.
+    """
+    if not db_manager._initialized:
+        db_manager.initialize()
+
+    with db_manager._engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name(method, storage)}"))
+
+
+def create_metadata_indexes(concurrently: bool = True) -> List[str]:
+    """
+    Create indexes for metadata filters on the embedding table.
+
+    Each key in ``metadata_keys`` gets a B-tree expression index on
+    ``cmetadata->>'<key>'`` (used by ``$in`` filters), and ``cmetadata`` gets a
+    GIN ``jsonb_path_ops`` index for containment queries.
+
+    Parameters
+    ----------
+    concurrently : bool, optional
+        Build without blocking writes (``CREATE INDEX CONCURRENTLY``).
+
+    Returns
+    -------
+    list of str
+        Names of the metadata indexes.
+    """
+    if not db_manager._initialized:
+        db_manager.initialize()
+
+    mode = "CONCURRENTLY " if concurrently else ""
+    statements = {
+        f"ix_{EMBEDDING_TABLE}_cmetadata_gin": "USING gin (cmetadata jsonb_path_ops)",
+    }
+    for key in vector_index_config["metadata_keys"]:
+        if not key.isidentifier():
+            raise ValueError(f"Invalid metadata key: {key}. Expected a valid identifier.")
+        statements[f"ix_{EMBEDDING_TABLE}_meta_{key}"] = f"((cmetadata->>'{key}'))"
+
+    with db_manager._engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for name, definition in statements.items():
+            logger.info(f"Creating metadata index {name}")
+            conn.execute(text(f"CREATE INDEX {mode}IF NOT EXISTS {name} ON {EMBEDDING_TABLE} {definition}"))
+        conn.execute(text(f"ANALYZE {EMBEDDING_TABLE}"))
+    return list(statements)
+
+
+def create_lexical_indexes(concurrently: bool = True) -> List[str]:
+    """
+    Create the full-text and trigram indexes used by hybrid search.
+
+    The ``tsvector`` expression must match the one in the hybrid query exactly
+    for the planner to use the index.
+
+    Parameters
+    ----------
+    concurrently : bool, optional
+        Build without blocking writes (``CREATE INDEX CONCURRENTLY``).
+
+    Returns
+    -------
+    list of str
+        Names of the lexical indexes.
+    """
+    if not db_manager._initialized:
+        db_manager.initialize()
+
+    mode = "CONCURRENTLY " if concurrently else ""
+    ts_config = retrieval_config["text_search_config"]
+    statements = {
+        f"ix_{EMBEDDING_TABLE}_document_fts": f"USING gin (to_tsvector('{ts_config}', document))",
+        f"ix_{EMBEDDING_TABLE}_document_trgm": "USING gin (document gin_trgm_ops)",
+    }
+
+    with db_manager._engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        for name, definition in statements.items():
+            logger.info(f"Creating lexical index {name}")
+            conn.execute(text(f"CREATE INDEX {mode}IF NOT EXISTS {name} ON {EMBEDDING_TABLE} {definition}"))
+        conn.execute(text(f"ANALYZE {EMBEDDING_TABLE}"))
+    return list(statements)
+
+
+def ensure_vector_index() -> dict:
+    """
+    Startup check for the ANN index.
+
+    Validates the index and, if ``create_on_startup`` is enabled, builds it when
+    missing. An advisory lock ensures only one worker builds the index.
+
+    Returns
+    -------
+    dict
+        The validation report.
+    """
+    try:
+        report = validate_vector_index()
+        if report["status"] == "ok":
+            logger.info(f"Vector index {report['index']} is valid ({report['size_bytes']} bytes)")
+            return report
+
+        if not vector_index_config["create_on_startup"]:
+            logger.warning(
+                f"Vector index {report['index']} is {report['status']}: {report.get('detail', '')}. "
+                "Similarity searches will fall back to sequential scans. "
+                "Run `python -m src.models_gen.Agentic_CoT_RAG.index create`."
+            )
+            return report
+
+        with db_manager._engine.connect() as conn:
+            if not conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": _INDEX_LOCK_KEY}).scalar():
+                logger.info("Another worker is building the vector index")
+                return report
+            try:
+                return create_vector_index()
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _INDEX_LOCK_KEY})
+    except Exception as e:
+        logger.error(f"Vector index startup check failed: {e}")
+        return {"status": "error", "detail": str(e)}
+
+
+def main(argv=None) -> None:
+    """Command line entry point for index management."""
+    parser = argparse.ArgumentParser(description="Manage the ANN index of the RAG vector collection.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("validate", help="Report on the ANN index")
+
+    create_parser = subparsers.add_parser("create", help="Create (or rebuild an invalid) ANN index")
+    create_parser.add_argument("--method", choices=["hnsw", "ivfflat"], default=None)
+    create_parser.add_argument("--storage", choices=STORAGE_FORMATS, default=None)
+    create_parser.add_argument("--blocking", action="store_true", help="Build without CONCURRENTLY")
+
+    drop_parser = subparsers.add_parser("drop", help="Drop the ANN index")
+    drop_parser.add_argument("--method", choices=["hnsw", "ivfflat"], default=None)
+    drop_parser.add_argument("--storage", choices=STORAGE_FORMATS, default=None)
+
+    subparsers.add_parser("metadata", help="Create indexes for metadata filters")
+    subparsers.add_parser("lexical", help="Create full-text and trigram indexes for hybrid search")
+    subparsers.add_parser("titles", help="Refresh the fuzzy title lookup table")
+
+    partitions_parser = subparsers.add_parser("partitions", help="Build partial ANN indexes per department")
+    partitions_parser.add_argument("--min-rows", type=int, default=None, help="Minimum chunks per partition")
+
+    calibrate_parser = subparsers.add_parser("calibrate", help="Calibrate the adaptive top-k thresholds")
+    calibrate_parser.add_argument("--queries", type=int, default=None, help="Queries to calibrate on")
+    calibrate_parser.add_argument("--queries-file", default=None,
+                                  help="Real search queries, one per line (default: built from sampled chunks)")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == "validate":
+        report = validate_vector_index()
+    elif args.command == "create":
+        report = create_vector_index(method=args.method, concurrently=not args.blocking, storage=args.storage)
+    elif args.command == "metadata":
+        report = {"status": "ok", "indexes": create_metadata_indexes()}
+    elif args.command == "lexical":
+        report = {"status": "ok", "indexes": create_lexical_indexes()}
+    elif args.command == "titles":
+        from .titles import refresh_titles
+        report = {"status": "ok", "titles": refresh_titles()}
+    elif args.command == "partitions":
+        from .partitions import create_partitions
+        report = {"status": "ok", "partitions": create_partitions(args.min_rows)}
+    elif args.command == "calibrate":
+        from .thresholds import calibrate_thresholds
+        queries = None
+        if args.queries_file:
+            with open(args.queries_file, encoding="utf-8") as f:
+                queries = [line.strip() for line in f if line.strip()]
+        report = {"status": "ok", "thresholds": calibrate_thresholds(args.queries, queries)}
+    else:
+        drop_vector_index(method=args.method, storage=args.storage)
+        report = {"status": "dropped", "index": index_name(args.method, args.storage)}
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,602 @@
+"""Bulk document ingestion for the Agentic CoT RAG vector collection.
+
+Streams source files, chunks them in a process pool, embeds chunks in large
+concurrent batches under the shared upstream quotas, and writes rows with ``COPY``
+through ``db_manager``. Completed sources are checkpointed (by content
+fingerprint, so edited sources are not skipped) so an interrupted load
+resumes where it stopped; the checkpoint is removed once a run completes.
+
+Runs are incremental: each chunk stores a ``content_hash``, so unchanged
+chunks are skipped, moved chunks reuse their stored embedding, only new or
+edited text is embedded, and chunks that disappeared from a source are
+deleted. ``--prune`` also deletes sources that no longer exist.
+
+Supported sources:
+    - ``.txt`` / ``.md``: one document per file (title = file name)
+    - ``.jsonl``: one document per line, ``{"id": ..., "page_content": ..., "metadata": {...}}``;
+      give records an ``id`` so inserting a line does not re-key the lines after it
+
+Each chunk stores the key of its source in ``metadata.ingest_key`` (the file,
+``<file>#<id>`` or ``<file>:<line>``), which source metadata cannot override;
+change detection and pruning look sources up by it.
+
+Usage:
+    python -m src.models_gen.Agentic_CoT_RAG.ingest docs/ --checkpoint ingest.ckpt
+    python -m src.models_gen.Agentic_CoT_RAG.ingest docs/ --prune
+"""
+import argparse
+import asyncio
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from sqlalchemy import text
+from ...database import db_manager
+from .config import vectorstore_config, ingestion_config, partition_config
+from .index import EMBEDDING_TABLE, COLLECTION_TABLE
+
+logger = logging.getLogger(__name__)
+
+# Namespace for deterministic chunk ids (re-running a source yields the same ids)
+CHUNK_NAMESPACE = uuid.UUID("6f1c1f7e-3c1a-4b5e-9a57-2f0b7f3f9d10")
+
+TEXT_SUFFIXES = {".txt", ".md", ".markdown"}
+# Metadata field holding the source key of a chunk (set last, so records cannot override it)
+INGEST_KEY = "ingest_key"
+# Stored source key: the ingest key, or the source of chunks ingested before it existed
+_STORED_KEY = f"COALESCE(cmetadata->>'{INGEST_KEY}', cmetadata->>'source')"
+# The same match on a list of keys, in a form the metadata indexes serve
+_MATCHES_KEYS = (
+    f"(cmetadata->>'{INGEST_KEY}' = ANY(:sources) "
+    f"OR (cmetadata->>'{INGEST_KEY}' IS NULL AND cmetadata->>'source' = ANY(:sources)))"
+)
+_HEADING = re.compile(r"^#{1,6}\s+(.+?)\s*$", re.MULTILINE)
+
+
+def checkpoint_key(document: dict) -> str:
+    """
+    Get the checkpoint key of a source document.
+
+    The key includes a fingerprint of the content and metadata, so a source
+    edited after it was checkpointed is ingested again.
+
+    Parameters
+    ----------
+    document : dict
+        A document from :func:`iter_sources`.
+
+    Returns
+    -------
+    str
+        ``<source>@<fingerprint>``
+    """
+    fingerprint = hashlib.sha256(json.dumps(
+        {"page_content": document["page_content"], "metadata": document["metadata"]},
+        sort_keys=True, ensure_ascii=False,
+    ).encode("utf-8")).hexdigest()[:32]
+    return f"{document['source']}@{fingerprint}"
+
+
+def iter_sources(paths: Iterable[str], skip: Set[str] = frozenset()) -> Iterator[dict]:
+    """
+    Stream source documents from files and directories.
+
+    Parameters
+    ----------
+    paths : iterable of str
+        Files or directories (searched recursively).
+    skip : set of str, optional
+        Checkpoint keys (see :func:`checkpoint_key`) of sources already ingested.
+
+    Yields
+    ------
+    dict
+        ``{"source": key, "page_content": str, "metadata": dict}``
+    """
+    for path in paths:
+        root = Path(path)
+        files = sorted(p for p in root.rglob("*") if p.is_file()) if root.is_dir() else [root]
+        for file in files:
+            suffix = file.suffix.lower()
+            if suffix in TEXT_SUFFIXES:
+                source = str(file)
+                document = {
+                    "source": source,
+                    "page_content": file.read_text(encoding="utf-8", errors="replace"),
+                    "metadata": {"title": file.stem, "source": source, INGEST_KEY: source},
+                }
+                if checkpoint_key(document) not in skip:
+                    yield document
+            elif suffix == ".jsonl":
+                with file.open(encoding="utf-8") as fh:
+                    for line_number, line in enumerate(fh, 1):
+                        if not line.strip():
+                            continue
+                        record = json.loads(line)
+                        # A record id survives lines inserted above it; a line number does not
+                        source = f"{file}#{record['id']}" if record.get("id") is not None else f"{file}:{line_number}"
+                        metadata = {"source": source, **record.get("metadata", {}), INGEST_KEY: source}
+                        document = {
+                            "source": source,
+                            "page_content": record.get("page_content") or record.get("text", ""),
+                            "metadata": metadata,
+                        }
+                        if checkpoint_key(document) not in skip:
+                            yield document
+
+
+def chunk_document(document: dict) -> List[Tuple[str, str, dict]]:
+    """
+    Split a source document into chunks (runs in a worker process).
+
+    Markdown headings are tracked so each chunk carries the ``section_title``
+    it falls under, unless the source metadata already sets one.
+
+    Parameters
+    ----------
+    document : dict
+        A document from :func:`iter_sources`.
+
+    Returns
+    -------
+    list of tuple of (str, str, dict)
+        ``(chunk_id, page_content, metadata)`` per chunk.
+    """
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=ingestion_config["chunk_size"],
+        chunk_overlap=ingestion_config["chunk_overlap"],
+        add_start_index=True,
+    )
+    content = document["page_content"].replace("\x00", "")
+    headings = [(match.start(), match.group(1)) for match in _HEADING.finditer(content)]
+
+    chunks = []
+    for index, chunk in enumerate(splitter.create_documents([content])):
+        start = chunk.metadata["start_index"]
+        content_hash = hashlib.sha256(chunk.page_content.encode("utf-8")).hexdigest()
+        metadata = {**document["metadata"], "chunk_index": index, "content_hash": content_hash}
+        if "section_title" not in metadata:
+            sections = [title for position, title in headings if position <= start]
+            if sections:
+                metadata["section_title"] = sections[-1]
+        chunk_id = str(uuid.uuid5(CHUNK_NAMESPACE, f"{document['source']}#{index}"))
+        chunks.append((chunk_id, chunk.page_content, metadata))
+    return chunks
+
+
+class Checkpoint:
+    """Set of completed checkpoint keys (see :func:`checkpoint_key`) persisted to a JSON file."""
+
+    def __init__(self, path: Optional[str]):
+        """
+        Load the checkpoint.
+
+        Parameters
+        ----------
+        path : str | None
+            Checkpoint file path. Checkpointing is disabled if None.
+        """
+        self.path = path
+        self.done: Set[str] = set()
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as fh:
+                self.done = set(json.load(fh)["done"])
+
+    def save(self, sources: Iterable[str]) -> None:
+        """
+        Mark sources as completed and atomically rewrite the checkpoint file.
+
+        Parameters
+        ----------
+        sources : iterable of str
+            Checkpoint keys of sources whose chunks have all been written.
+        """
+        self.done.update(sources)
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump({"done": sorted(self.done)}, fh)
+        os.replace(tmp_path, self.path)
+
+    def clear(self) -> None:
+        """Forget all completed sources and delete the checkpoint file (after a complete run)."""
+        self.done = set()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+    @property
+    def sources(self) -> Set[str]:
+        """Source keys of the completed sources."""
+        return {key.rsplit("@", 1)[0] for key in self.done}
+
+
+async def embed_chunks(chunks: List[tuple], embeddings, semaphore: asyncio.Semaphore) -> List[List[float]]:
+    """
+    Embed chunk texts in concurrent batches.
+
+    Requests are spaced to the embedding quotas shared by all workers
+    (``UPSTREAM_EMBEDDING_RPM`` / ``UPSTREAM_EMBEDDING_TPM``) by the HTTP
+    client the embedding model is built on.
+
+    Parameters
+    ----------
+    chunks : list of tuple
+        ``(chunk_id, page_content, metadata)`` tuples.
+    embeddings : Embeddings
+        The embedding model.
+    semaphore : asyncio.Semaphore
+        Bounds the number of in-flight embedding requests.
+
+    Returns
+    -------
+    list of list of float
+        One vector per chunk, in order.
+    """
+    batch_size = ingestion_config["embedding_batch_size"]
+
+    async def embed_batch(batch: List[str]) -> List[List[float]]:
+        async with semaphore:
+            return await embeddings.aembed_documents(batch)
+
+    texts = [chunk[1] for chunk in chunks]
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
+    return [vector for batch in results for vector in batch]
+
+
+def plan_changes(chunks: List[tuple], existing: Dict[str, dict]) -> dict:
+    """
+    Compare freshly chunked sources with their stored chunks.
+
+    Parameters
+    ----------
+    chunks : list of tuple
+        ``(chunk_id, page_content, metadata)`` tuples of the current sources.
+    existing : dict of str to dict
+        Stored chunk id to metadata for the same sources.
+
+    Returns
+    -------
+    dict
+        ``embed``: chunks with new text, ``reuse``: ``(chunk, stored_id)`` pairs
+        whose text is already embedded under ``stored_id``, ``delete``: stored ids
+        no longer produced, ``unchanged``: number of chunks left as they are.
+    """
+    stored_by_hash = {}
+    for chunk_id, metadata in existing.items():
+        stored_by_hash.setdefault(metadata.get("content_hash"), chunk_id)
+
+    plan = {"embed": [], "reuse": [], "delete": [], "unchanged": 0}
+    for chunk in chunks:
+        chunk_id, _, metadata = chunk
+        stored = existing.get(chunk_id)
+        if stored == metadata:
+            plan["unchanged"] += 1
+        elif stored is not None and stored.get("content_hash") == metadata["content_hash"]:
+            # Same text, new metadata: keep the embedding
+            plan["reuse"].append((chunk, chunk_id))
+        elif metadata["content_hash"] in stored_by_hash:
+            # Text moved to another position: copy the embedding of the old chunk
+            plan["reuse"].append((chunk, stored_by_hash[metadata["content_hash"]]))
+        else:
+            plan["embed"].append(chunk)
+
+    current_ids = {chunk[0] for chunk in chunks}
+    plan["delete"] = [chunk_id for chunk_id in existing if chunk_id not in current_ids]
+    return plan
+
+
+def fetch_existing(collection_id: str, sources: List[str]) -> Dict[str, dict]:
+    """
+    Get the stored chunks of sources.
+
+    Parameters
+    ----------
+    collection_id : str
+        The collection UUID.
+    sources : list of str
+        Source keys (``metadata.ingest_key``).
+
+    Returns
+    -------
+    dict of str to dict
+        Chunk id to metadata.
+    """
+    with db_manager.get_session() as session:
+        rows = session.execute(
+            text(
+                f"SELECT id, cmetadata FROM {EMBEDDING_TABLE} "
+                f"WHERE collection_id = CAST(:collection_id AS uuid) AND {_MATCHES_KEYS}"
+            ),
+            {"collection_id": collection_id, "sources": sources},
+        ).all()
+    return {row.id: row.cmetadata for row in rows}
+
+
+def fetch_vectors(chunk_ids: List[str]) -> Dict[str, str]:
+    """
+    Get stored embeddings (in pgvector text form) by chunk id.
+
+    Parameters
+    ----------
+    chunk_ids : list of str
+        Chunk ids.
+
+    Returns
+    -------
+    dict of str to str
+        Chunk id to embedding.
+    """
+    if not chunk_ids:
+        return {}
+    with db_manager.get_session() as session:
+        rows = session.execute(
+            text(f"SELECT id, embedding::text AS embedding FROM {EMBEDDING_TABLE} WHERE id = ANY(:ids)"),
+            {"ids": list(set(chunk_ids))},
+        ).all()
+    return {row.id: row.embedding for row in rows}
+
+
+def prune_sources(collection_id: str, paths: List[str], seen: Set[str]) -> int:
+    """
+    Delete chunks of sources under ``paths`` that were not seen in this run.
+
+    Parameters
+    ----------
+    collection_id : str
+        The collection UUID.
+    paths : list of str
+        The ingested files and directories.
+    seen : set of str
+        Source keys that still exist.
+
+    Returns
+    -------
+    int
+        Number of deleted chunks.
+    """
+    roots = [str(Path(path)) for path in paths]
+    with db_manager.get_session() as session:
+        stored = session.execute(
+            text(
+                f"SELECT DISTINCT {_STORED_KEY} FROM {EMBEDDING_TABLE} "
+                "WHERE collection_id = CAST(:collection_id AS uuid)"
+            ),
+            {"collection_id": collection_id},
+        ).scalars().all()
+        vanished = [
+            source for source in stored
+            if source and source not in seen and any(source.startswith(root) for root in roots)
+        ]
+        if not vanished:
+            return 0
+        result = session.execute(
+            text(
+                f"DELETE FROM {EMBEDDING_TABLE} "
+                f"WHERE collection_id = CAST(:collection_id AS uuid) AND {_MATCHES_KEYS}"
+            ),
+            {"collection_id": collection_id, "sources": vanished},
+        )
+    logger.info(f"Pruned {len(vanished)} vanished sources")
+    return result.rowcount
+
+
+def copy_rows(collection_id: str, chunks: List[tuple], vectors: list, delete_ids: List[str] = ()) -> None:
+    """
+    Write chunks to the embedding table with ``COPY``.
+
+    Rows are copied into a temporary staging table and then upserted, so
+    changed chunks are updated in place and a source re-processed after a
+    crash does not violate the primary key.
+
+    Parameters
+    ----------
+    collection_id : str
+        The collection UUID.
+    chunks : list of tuple
+        ``(chunk_id, page_content, metadata)`` tuples.
+    vectors : list
+        The chunk embeddings, as lists of floats or pgvector text.
+    delete_ids : list of str, optional
+        Chunk ids to delete in the same transaction.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for (chunk_id, content, metadata), vector in zip(chunks, vectors):
+        writer.writerow([
+            chunk_id,
+            collection_id,
+            vector if isinstance(vector, str) else "[" + ",".join(map(repr, vector)) + "]",
+            content,
+            json.dumps(metadata, ensure_ascii=False),
+        ])
+    buffer.seek(0)
+
+    copy_sql = "COPY ingest_staging (id, collection_id, embedding, document, cmetadata) FROM STDIN WITH (FORMAT csv)"
+    raw_conn = db_manager._engine.raw_connection()
+    try:
+        cursor = raw_conn.cursor()
+        cursor.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS ingest_staging (LIKE {EMBEDDING_TABLE} INCLUDING DEFAULTS) "
+            "ON COMMIT DELETE ROWS"
+        )
+        if hasattr(cursor, "copy_expert"):
+            # psycopg2
+            cursor.copy_expert(copy_sql, buffer)
+        else:
+            # psycopg 3
+            with cursor.copy(copy_sql) as copy:
+                copy.write(buffer.getvalue())
+        cursor.execute(
+            f"INSERT INTO {EMBEDDING_TABLE} (id, collection_id, embedding, document, cmetadata) "
+            "SELECT id, collection_id, embedding, document, cmetadata FROM ingest_staging "
+            "ON CONFLICT (id) DO UPDATE SET "
+            "embedding = EXCLUDED.embedding, document = EXCLUDED.document, cmetadata = EXCLUDED.cmetadata"
+        )
+        if delete_ids:
+            cursor.execute(f"DELETE FROM {EMBEDDING_TABLE} WHERE id = ANY(%s)", (list(delete_ids),))
+        raw_conn.commit()
+    except Exception:
+        raw_conn.rollback()
+        raise
+    finally:
+        raw_conn.close()
+
+
+async def get_collection_id(collection_name: str) -> str:
+    """Get the UUID of a collection, creating the collection through PGVector if needed."""
+    from .connection import vectorstore
+
+    if collection_name != vectorstore.collection_name:
+        raise ValueError(f"Collection '{collection_name}' is not the configured vector store collection")
+    await vectorstore.acreate_collection()
+    async with db_manager.get_async_session() as session:
+        return str((await session.execute(
+            text(f"SELECT uuid FROM {COLLECTION_TABLE} WHERE name = :name"), {"name": collection_name}
+        )).scalar_one())
+
+
+async def ingest(
+    paths: List[str],
+    checkpoint_path: Optional[str] = None,
+    processes: Optional[int] = None,
+    prune: bool = False,
+) -> dict:
+    """
+    Ingest source files into the vector collection, embedding only new or changed chunks.
+
+    Chunking of the next window of sources overlaps with embedding of the
+    current one, and ``COPY`` of a window overlaps with embedding of the next.
+
+    Parameters
+    ----------
+    paths : list of str
+        Files or directories to ingest.
+    checkpoint_path : str | None, optional
+        Checkpoint file for resumable loads.
+    processes : int | None, optional
+        Number of chunking processes (defaults to the CPU count).
+    prune : bool, optional
+        Delete stored sources under ``paths`` that no longer exist.
+
+    Returns
+    -------
+    dict
+        Ingestion statistics.
+    """
+    from .connection import embeddings
+
+    loop = asyncio.get_running_loop()
+    checkpoint = Checkpoint(checkpoint_path)
+    collection_id = await get_collection_id(vectorstore_config["collection_name"])
+    semaphore = asyncio.Semaphore(ingestion_config["max_concurrency"])
+    stats = {
+        "sources": 0,
+        "chunks": 0,
+        "embedded": 0,
+        "reused": 0,
+        "unchanged": 0,
+        "deleted": 0,
+        "skipped_sources": len(checkpoint.done),
+    }
+    seen = checkpoint.sources
+    started = time.perf_counter()
+
+    sources = iter_sources(paths, skip=checkpoint.done)
+    window_size = ingestion_config["window_size"]
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        def schedule_window():
+            window = list(islice(sources, window_size))
+            if not window:
+                return None, None
+            futures = [loop.run_in_executor(pool, chunk_document, document) for document in window]
+            return window, asyncio.gather(*futures)
+
+        window, chunking = schedule_window()
+        pending_write = None
+        while chunking is not None:
+            chunked = await chunking
+            next_window, next_chunking = schedule_window()
+            keys = [document["source"] for document in window]
+
+            chunks = [chunk for document_chunks in chunked for chunk in document_chunks]
+            existing = await loop.run_in_executor(None, fetch_existing, collection_id, keys)
+            plan = plan_changes(chunks, existing)
+            stored_vectors = await loop.run_in_executor(
+                None, fetch_vectors, [stored_id for _, stored_id in plan["reuse"]]
+            )
+            vectors = await embed_chunks(plan["embed"], embeddings, semaphore)
+
+            # Only write chunks that are new or changed
+            rows = plan["embed"] + [chunk for chunk, _ in plan["reuse"]]
+            rows_vectors = vectors + [stored_vectors[stored_id] for _, stored_id in plan["reuse"]]
+
+            if pending_write is not None:
+                await pending_write[0]
+                checkpoint.save(pending_write[1])
+            pending_write = (
+                loop.run_in_executor(None, copy_rows, collection_id, rows, rows_vectors, plan["delete"]),
+                [checkpoint_key(document) for document in window],
+            )
+
+            seen.update(keys)
+            stats["sources"] += len(keys)
+            stats["chunks"] += len(chunks)
+            stats["embedded"] += len(plan["embed"])
+            stats["reused"] += len(plan["reuse"])
+            stats["unchanged"] += plan["unchanged"]
+            stats["deleted"] += len(plan["delete"])
+            elapsed = time.perf_counter() - started
+            logger.info(f"Ingested {stats['sources']} sources / {stats['chunks']} chunks "
+                        f"({stats['chunks'] / elapsed:.1f} chunks/s)")
+            window, chunking = next_window, next_chunking
+
+        if pending_write is not None:
+            await pending_write[0]
+            checkpoint.save(pending_write[1])
+
+    if prune:
+        stats["deleted"] += await loop.run_in_executor(None, prune_sources, collection_id, paths, seen)
+
+    # The run is complete: the next run starts from scratch (unchanged chunks are skipped by hash)
+    checkpoint.clear()
+
+    stats["seconds"] = round(time.perf_counter() - started, 2)
+    return stats
+
+
+def main(argv=None) -> None:
+    """Command line entry point for bulk ingestion."""
+    parser = argparse.ArgumentParser(description="Bulk-load documents into the RAG vector collection.")
+    parser.add_argument("paths", nargs="+", help="Files or directories to ingest")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint file for resumable loads")
+    parser.add_argument("--processes", type=int, default=None, help="Chunking processes (default: CPU count)")
+    parser.add_argument("--prune", action="store_true", help="Delete stored sources that no longer exist")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    stats = asyncio.run(ingest(args.paths, args.checkpoint, args.processes, args.prune))
+
+    # Keep the fuzzy title lookup in sync with the new documents
+    from .titles import refresh_titles
+    stats["titles"] = refresh_titles()
+    if partition_config["enabled"]:
+        from .partitions import create_partitions
+        stats["partitions"] = len(create_partitions())
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
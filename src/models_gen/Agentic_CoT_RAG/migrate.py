@@ -0,0 +1,205 @@
+"""Storage migrations for the Agentic CoT RAG vector collection.
+
+Switch the ANN index to a quantized storage format (online)::
+
+    python -m src.models_gen.Agentic_CoT_RAG.migrate storage --to halfvec
+    # set vector_index_config["storage"] = "halfvec" and deploy, then:
+    python -m src.models_gen.Agentic_CoT_RAG.index drop --storage vector
+
+Re-embed the collection at a reduced dimension (offline: searches fail
+while stored dimensions are mixed)::
+
+    python -m src.models_gen.Agentic_CoT_RAG.migrate dimensions --to 512
+    # then set embedding_model_config["dimensions"] and
+    # vectorstore_config["embedding_length"] to 512 and deploy
+"""
+import argparse
+import asyncio
+import json
+import logging
+from typing import List
+from langchain_openai import OpenAIEmbeddings
+from sqlalchemy import text
+from ...database import db_manager
+from ...http_client import get_http_client, get_async_http_client
+from .config import embedding_model_config, ingestion_config, vectorstore_config, vector_index_config
+from .index import EMBEDDING_TABLE, STORAGE_FORMATS, create_vector_index
+from .ingest import copy_rows, get_collection_id, embed_chunks
+from .partitions import create_partitions
+
+logger = logging.getLogger(__name__)
+
+
+def migrate_storage(storage: str, method: str = None) -> dict:
+    """
+    Build the ANN index for another storage format next to the current one.
+
+    The current index keeps serving queries until the configuration is
+    switched, after which the old index can be dropped.
+
+    Parameters
+    ----------
+    storage : str
+        ``"vector"``, ``"halfvec"`` or ``"binary"``.
+    method : str | None, optional
+        ``"hnsw"`` or ``"ivfflat"``. Defaults to the configured method.
+
+    Returns
+    -------
+    dict
+        The validation report of the new index.
+    """
+    report = create_vector_index(method=method, storage=storage)
+    if storage != vector_index_config["storage"]:
+        report["next_steps"] = [
+            f"Set vector_index_config['storage'] = '{storage}' and deploy",
+            f"python -m src.models_gen.Agentic_CoT_RAG.index drop --storage {vector_index_config['storage']}",
+        ]
+    return report
+
+
+def drop_embedding_indexes() -> List[str]:
+    """
+    Drop every index on the embedding column.
+
+    pgvector cannot keep an ANN index on an undimensioned ``vector`` column,
+    so this covers the indexes of every method and storage format (including
+    ones no longer configured) and the per-department partition indexes.
+
+    Returns
+    -------
+    list of str
+        Names of the dropped indexes.
+    """
+    if not db_manager._initialized:
+        db_manager.initialize()
+    with db_manager._engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        names = conn.execute(
+            text(
+                "SELECT indexname FROM pg_indexes "
+                r"WHERE schemaname = current_schema() AND tablename = :table AND indexdef ~ '\membedding\M'"
+            ),
+            {"table": EMBEDDING_TABLE},
+        ).scalars().all()
+        for name in names:
+            logger.info(f"Dropping index {name}")
+            conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"'))
+    return list(names)
+
+
+def rebuild_embedding_indexes() -> dict:
+    """
+    Rebuild the configured ANN index, and the partition indexes if the collection has partitions.
+
+    Returns
+    -------
+    dict
+        The validation report of the index and the rebuilt partitions.
+    """
+    with db_manager._engine.connect() as conn:
+        partitioned = conn.execute(
+            text(
+                "SELECT to_regclass('rag_collection_partitions') IS NOT NULL AND EXISTS ("
+                "  SELECT 1 FROM rag_collection_partitions WHERE collection_name = :collection"
+                ")"
+            ),
+            {"collection": vectorstore_config["collection_name"]},
+        ).scalar()
+    return {"index": create_vector_index(), "partitions": create_partitions() if partitioned else []}
+
+
+async def migrate_dimensions(dimensions: int, batch_size: int = 1000) -> dict:
+    """
+    Re-embed every chunk of the collection at a new dimension.
+
+    All indexes on the embedding column are dropped and the column is unpinned
+    while rows are rewritten, then the column is pinned to ``vector(dimensions)``
+    and the configured index and the department partitions are rebuilt. The embedding table must not hold other
+    collections with a different dimension.
+
+    Parameters
+    ----------
+    dimensions : int
+        The new embedding dimension.
+    batch_size : int, optional
+        Chunks read and rewritten per batch.
+
+    Returns
+    -------
+    dict
+        Migration statistics, the dropped indexes and the rebuilt ones.
+    """
+    model = OpenAIEmbeddings(
+        **{**embedding_model_config, "dimensions": dimensions},
+        http_client=get_http_client(),
+        http_async_client=get_async_http_client(),
+    )
+    collection_id = await get_collection_id(vectorstore_config["collection_name"])
+    semaphore = asyncio.Semaphore(ingestion_config["max_concurrency"])
+    loop = asyncio.get_running_loop()
+
+    dropped = drop_embedding_indexes()
+    with db_manager._engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(f"ALTER TABLE {EMBEDDING_TABLE} ALTER COLUMN embedding TYPE vector"))
+
+    migrated, after = 0, ""
+    while True:
+        with db_manager.get_session() as session:
+            rows = session.execute(
+                text(
+                    f"SELECT id, document, cmetadata FROM {EMBEDDING_TABLE} "
+                    "WHERE collection_id = CAST(:collection_id AS uuid) AND id > :after "
+                    "ORDER BY id LIMIT :limit"
+                ),
+                {"collection_id": collection_id, "after": after, "limit": batch_size},
+            ).all()
+        if not rows:
+            break
+        chunks = [(row.id, row.document, row.cmetadata or {}) for row in rows]
+        vectors = await embed_chunks(chunks, model, semaphore)
+        await loop.run_in_executor(None, copy_rows, collection_id, chunks, vectors)
+        migrated += len(chunks)
+        after = rows[-1].id
+        logger.info(f"Re-embedded {migrated} chunks at {dimensions} dimensions")
+
+    with db_manager._engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(f"ALTER TABLE {EMBEDDING_TABLE} ALTER COLUMN embedding TYPE vector({dimensions})"))
+
+    # Index expressions are sized from the configuration, which still holds the old dimension
+    vectorstore_config["embedding_length"] = dimensions
+    return {
+        "chunks": migrated,
+        "dimensions": dimensions,
+        "dropped_indexes": dropped,
+        **rebuild_embedding_indexes(),
+        "next_steps": [
+            f"Set embedding_model_config['dimensions'] and vectorstore_config['embedding_length'] to {dimensions} and deploy",
+        ],
+    }
+
+
+def main(argv=None) -> None:
+    """Command line entry point for storage migrations."""
+    parser = argparse.ArgumentParser(description="Migrate the storage of the RAG vector collection.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    storage_parser = subparsers.add_parser("storage", help="Build the ANN index for a storage format")
+    storage_parser.add_argument("--to", choices=STORAGE_FORMATS, required=True)
+    storage_parser.add_argument("--method", choices=["hnsw", "ivfflat"], default=None)
+
+    dimensions_parser = subparsers.add_parser("dimensions", help="Re-embed the collection at a new dimension")
+    dimensions_parser.add_argument("--to", type=int, required=True)
+    dimensions_parser.add_argument("--batch-size", type=int, default=1000)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == "storage":
+        report = migrate_storage(args.to, args.method)
+    else:
+        report = asyncio.run(migrate_dimensions(args.to, args.batch_size))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,51 @@
 """Node definition for the Agentic CoT RAG model."""
+import logging
+from typing import Optional, Sequence
+from langchain_core.messages import BaseMessage
 from langgraph.prebuilt import create_react_agent
+from .compaction import compact_history, message_text
+from .config import history_compaction_config
 from .state import AgenticCoTRAGState
 from .connection import chat_model
 from .tool import keywords_search
-from .template import systemprompt_template
+from .template import history_summary_template, systemprompt_template
+
+logger = logging.getLogger(__name__)
+
+
+async def summarize_history(previous_summary: Optional[str], messages: Sequence[BaseMessage]) -> str:
+    """
+    Extend the rolling summary of the conversation with older turns.
+
+    Parameters
+    ----------
+    previous_summary : str, optional
+        The summary of the turns before ``messages``.
+    messages : sequence of BaseMessage
+        The turns to add to the summary.
+
+    Returns
+    -------
+    str
+        The updated summary.
+    """
+    conversation = "\n\n".join(f"[{message.type}] {message_text(message)}" for message in messages)
+    prompt = history_summary_template.format(
+        previous_summary=previous_summary or "(none)",
+        conversation=conversation,
+        max_words=history_compaction_config["summary_max_words"],
+    )
+    return (await chat_model.ainvoke(prompt)).content
 
 
 # Create hook for the ReAct agent.
-def react_agent_hook(state: AgenticCoTRAGState) -> AgenticCoTRAGState:
+async def react_agent_hook(state: AgenticCoTRAGState) -> dict:
     """
-    Hook function to modify the agent state before each action.
+    Hook function run before each call of the agent model.
+
+    Compacts the conversation to its token budget: older turns are replaced
+    with the rolling summary, which is stored in the state so later calls
+    reuse it.
 
     Parameters
     ----------
@@ -18,15 +54,16 @@ def react_agent_hook(state: AgenticCoTRAGState) -> AgenticCoTRAGState:
 
     Returns
     -------
-    AgentState
-        The modified state of the agent.
+    dict
+        The state update; ``llm_input_messages`` are sent to the model
+        without being written back to the state.
     """
-    # Example: Log the current state (this is just a placeholder for actual logic)
-    print("Current Agent State:", state)
-
-    # Return the (possibly modified) state
-    return state
-
+    messages, summary = await compact_history(state["messages"], state.get("history_summary"), summarize_history)
+    logger.debug(f"Agent state before model call: {len(state['messages'])} messages, {len(messages)} sent")
+    update = {"llm_input_messages": messages}
+    if summary is not None:
+        update["history_summary"] = summary
+    return update
 
 
 # Format system prompt
@@ -38,5 +75,5 @@ react_agent = create_react_agent(
     tools=[keywords_search],  # Tools would be added here
     prompt=system_prompt,  # Custom prompt can be added here
     state_schema=AgenticCoTRAGState,
-    agent_hook=react_agent_hook,
+    pre_model_hook=react_agent_hook,
 )
@@ -0,0 +1,233 @@
+"""Per-department partitions of the Agentic CoT RAG vector collection.
+
+Chunks of every department stay in the one PGVector table, but each
+department with at least ``min_rows`` chunks gets its own partial ANN index::
+
+    ... USING hnsw (embedding vector_cosine_ops)
+    WHERE collection_id = '<uuid>' AND cmetadata->>'department' = '<department>'
+
+A search whose filter repeats that predicate verbatim lets the planner use
+the partial index, so it traverses only that department's graph instead of
+the index of the whole collection. Run as a management command::
+
+    python -m src.models_gen.Agentic_CoT_RAG.index partitions
+"""
+import hashlib
+import logging
+import time
+import uuid
+from typing import Dict, List, Optional
+from sqlalchemy import Column, Integer, String, text
+from sqlalchemy.engine import Connection
+from ...database import Base, db_manager
+from .config import vectorstore_config, vector_index_config, partition_config
+from .index import EMBEDDING_TABLE, COLLECTION_TABLE, _index_options, index_name, storage_expressions
+
+logger = logging.getLogger(__name__)
+
+# Registry cache per worker: {"loaded": monotonic time, "predicates": {department: predicate}}
+_cache = {"loaded": None, "predicates": {}}
+
+
+class CollectionPartition(Base):
+    """Departments of a vector collection that have their own partial ANN index."""
+
+    __tablename__ = "rag_collection_partitions"
+
+    collection_name = Column(String, primary_key=True)
+    department = Column(String, primary_key=True)
+    collection_id = Column(String, nullable=False)
+    index_name = Column(String, nullable=False)
+    rows = Column(Integer, nullable=False)
+
+
+def partition_predicate(collection_id: str, department: str) -> str:
+    """
+    Build the SQL predicate selecting one partition.
+
+    Values are inlined as literals: the planner only uses a partial index when
+    the query predicate matches the index predicate, which bind parameters do
+    not guarantee. Colons are escaped for use in ``text()`` statements.
+
+    Parameters
+    ----------
+    collection_id : str
+        The UUID of the collection.
+    department : str
+        The department of the partition.
+
+    Returns
+    -------
+    str
+        The predicate, shared by the index definition and the queries.
+    """
+    literal = department.replace("'", "''").replace(":", "\\:")
+    return f"collection_id = '{uuid.UUID(str(collection_id))}' AND cmetadata->>'department' = '{literal}'"
+
+
+def partition_index_name(collection_id: str, department: str) -> str:
+    """
+    Get the name of the partial ANN index of a partition.
+
+    Parameters
+    ----------
+    collection_id : str
+        The UUID of the collection.
+    department : str
+        The department of the partition.
+
+    Returns
+    -------
+    str
+        The index name (the configured index name with a short hash suffix).
+    """
+    digest = hashlib.md5(f"{collection_id}:{department}".encode("utf-8")).hexdigest()[:8]
+    return f"{index_name()}_p{digest}"
+
+
+def _index_is_valid(conn: Connection, name: str) -> Optional[bool]:
+    """Check whether an index is valid; None if it does not exist."""
+    return conn.execute(
+        text("SELECT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid WHERE c.relname = :name"),
+        {"name": name},
+    ).scalar()
+
+
+def create_partitions(min_rows: Optional[int] = None, concurrently: bool = True) -> List[dict]:
+    """
+    Build partial ANN indexes for the departments of the collection.
+
+    Departments with at least ``min_rows`` chunks get an index for the
+    configured method and storage; indexes of departments that shrank below
+    the threshold, disappeared, or were built for another method or storage
+    are dropped.
+
+    Parameters
+    ----------
+    min_rows : int | None, optional
+        Minimum chunks per partition. Defaults to the configured ``min_rows``.
+    concurrently : bool, optional
+        Build without blocking writes (``CREATE INDEX CONCURRENTLY``).
+
+    Returns
+    -------
+    list of dict
+        The partitions (``department``, ``index`` and ``rows``).
+    """
+    min_rows = partition_config["min_rows"] if min_rows is None else min_rows
+    collection_name = vectorstore_config["collection_name"]
+    method = vector_index_config["method"]
+    expressions = storage_expressions()
+    mode = "CONCURRENTLY " if concurrently else ""
+
+    if not db_manager._initialized:
+        db_manager.initialize()
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with db_manager._engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        CollectionPartition.__table__.create(conn, checkfirst=True)
+        collection_id = conn.execute(
+            text(f"SELECT uuid FROM {COLLECTION_TABLE} WHERE name = :collection"), {"collection": collection_name}
+        ).scalar()
+        if collection_id is None:
+            raise ValueError(f"Collection '{collection_name}' does not exist")
+        collection_id = str(collection_id)
+
+        counts = conn.execute(
+            text(
+                f"SELECT cmetadata->>'department' AS department, count(*) AS rows FROM {EMBEDDING_TABLE} "
+                "WHERE collection_id = CAST(:collection_id AS uuid) AND cmetadata->>'department' IS NOT NULL "
+                "GROUP BY 1 HAVING count(*) >= :min_rows"
+            ),
+            {"collection_id": collection_id, "min_rows": min_rows},
+        ).all()
+        wanted = {row.department: (partition_index_name(collection_id, row.department), row.rows) for row in counts}
+
+        # Drop partitions that are no longer wanted or were built for another index configuration
+        existing = conn.execute(
+            text("SELECT department, index_name FROM rag_collection_partitions WHERE collection_name = :collection"),
+            {"collection": collection_name},
+        ).all()
+        for row in existing:
+            if wanted.get(row.department, (None,))[0] != row.index_name:
+                logger.info(f"Dropping partition index {row.index_name} ({row.department})")
+                conn.execute(text(f"DROP INDEX {mode}IF EXISTS {row.index_name}"))
+                conn.execute(
+                    text("DELETE FROM rag_collection_partitions WHERE collection_name = :collection AND department = :department"),
+                    {"collection": collection_name, "department": row.department},
+                )
+
+        partitions = []
+        for department, (name, rows) in wanted.items():
+            if _index_is_valid(conn, name) is False:
+                logger.warning(f"Dropping invalid partition index {name}")
+                conn.execute(text(f"DROP INDEX {mode}IF EXISTS {name}"))
+            logger.info(f"Creating partition index {name} ({department}, {rows} rows)")
+            conn.execute(
+                text(
+                    f"CREATE INDEX {mode}IF NOT EXISTS {name} "
+                    f"ON {EMBEDDING_TABLE} USING {method} ({expressions['column']} {expressions['opclass']}) "
+                    f"WITH ({_index_options(method)}) "
+                    f"WHERE {partition_predicate(collection_id, department)}"
+                )
+            )
+            conn.execute(
+                text(
+                    "INSERT INTO rag_collection_partitions (collection_name, department, collection_id, index_name, rows) "
+                    "VALUES (:collection, :department, :collection_id, :index_name, :rows) "
+                    "ON CONFLICT (collection_name, department) DO UPDATE "
+                    "SET collection_id = EXCLUDED.collection_id, index_name = EXCLUDED.index_name, rows = EXCLUDED.rows"
+                ),
+                {
+                    "collection": collection_name,
+                    "department": department,
+                    "collection_id": collection_id,
+                    "index_name": name,
+                    "rows": rows,
+                },
+            )
+            partitions.append({"department": department, "index": name, "rows": rows})
+        conn.execute(text(f"ANALYZE {EMBEDDING_TABLE}"))
+
+    _cache["loaded"] = None
+    return partitions
+
+
+async def _load_predicates() -> Dict[str, str]:
+    """Load the partition predicates of the collection, cached for ``cache_seconds``."""
+    loaded = _cache["loaded"]
+    if loaded is not None and time.monotonic() - loaded < partition_config["cache_seconds"]:
+        return _cache["predicates"]
+
+    async with db_manager.get_read_session() as session:
+        # The registry only exists once partitions were built
+        rows = []
+        if (await session.execute(text("SELECT to_regclass('rag_collection_partitions') IS NOT NULL"))).scalar():
+            rows = (await session.execute(
+                text(
+                    "SELECT department, collection_id FROM rag_collection_partitions "
+                    "WHERE collection_name = :collection"
+                ),
+                {"collection": vectorstore_config["collection_name"]},
+            )).all()
+
+    _cache["predicates"] = {row.department: partition_predicate(row.collection_id, row.department) for row in rows}
+    _cache["loaded"] = time.monotonic()
+    return _cache["predicates"]
+
+
+async def get_partition(department: str) -> Optional[str]:
+    """
+    Get the predicate of the partition holding a department.
+
+    Parameters
+    ----------
+    department : str
+        The exact department name.
+
+    Returns
+    -------
+    str | None
+        The partition predicate, or None if the department has no partition.
+    """
+    return (await _load_predicates()).get(department)
@@ -0,0 +1,46 @@
+"""Readiness probes for the Agentic CoT RAG model.
+
+Run periodically by the server's background readiness refresher, never on
+the request path.
+"""
+from sqlalchemy import text
+from ...database import db_manager
+from .config import vectorstore_config
+from .connection import base_chat_model
+from .index import EMBEDDING_TABLE, COLLECTION_TABLE
+
+
+async def check_collection() -> dict:
+    """
+    Check that the vector collection exists and holds documents.
+
+    Returns
+    -------
+    dict
+        ``ready`` (the collection exists) and ``documents`` (it is non-empty).
+    """
+    async with db_manager.get_read_session() as session:
+        row = (await session.execute(
+            text(
+                f"SELECT EXISTS (SELECT 1 FROM {EMBEDDING_TABLE} e WHERE e.collection_id = c.uuid) AS documents "
+                f"FROM {COLLECTION_TABLE} c WHERE c.name = :collection"
+            ),
+            {"collection": vectorstore_config["collection_name"]},
+        )).first()
+
+    if row is None:
+        return {"ready": False, "error": f"collection '{vectorstore_config['collection_name']}' does not exist"}
+    return {"ready": True, "documents": row.documents}
+
+
+async def check_upstream() -> dict:
+    """
+    Check that the upstream model API is reachable and serves the chat model.
+
+    Returns
+    -------
+    dict
+        ``ready`` and the checked ``model``.
+    """
+    await base_chat_model.root_async_client.models.retrieve(base_chat_model.model_name)
+    return {"ready": True, "model": base_chat_model.model_name}
@@ -0,0 +1,60 @@
+"""Maximal marginal relevance (MMR) reranking for the Agentic CoT RAG model.
+
+The top hits of a search are often near-identical chunks of the same
+document. MMR picks hits one at a time, trading relevance against the
+similarity to the hits already picked, so the summarizer sees a diverse set.
+
+Each step costs one matrix-vector product over the candidate embeddings
+(the similarity of every candidate to the newly picked one), so the full
+``n x n`` similarity matrix is never built.
+"""
+from typing import List, Sequence
+import numpy as np
+
+
+def mmr(
+    relevance: Sequence[float],
+    embeddings: Sequence[Sequence[float]],
+    k: int,
+    lambda_mult: float = 0.5,
+) -> List[int]:
+    """
+    Select a relevant and diverse subset of candidates.
+
+    Parameters
+    ----------
+    relevance : sequence of float
+        The relevance of each candidate (higher is better).
+    embeddings : sequence of sequence of float
+        The embedding of each candidate.
+    k : int
+        The number of candidates to select.
+    lambda_mult : float, optional
+        Weight of relevance against diversity, from 0.0 (diversity only) to
+        1.0 (relevance only).
+
+    Returns
+    -------
+    list of int
+        Indices of the selected candidates, in selection order.
+    """
+    relevance = np.asarray(relevance, dtype=np.float32)
+    n = len(relevance)
+    if n == 0 or k <= 0:
+        return []
+
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    vectors = vectors / np.sqrt(np.maximum(np.einsum("ij,ij->i", vectors, vectors), 1e-24))[:, None]
+
+    weighted_relevance = lambda_mult * relevance
+    # Highest cosine similarity of each candidate to any selected candidate
+    max_similarity = np.zeros(n, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    selected = []
+    for _ in range(min(k, n)):
+        scores = np.where(available, weighted_relevance - (1.0 - lambda_mult) * max_similarity, -np.inf)
+        index = int(np.argmax(scores))
+        selected.append(index)
+        available[index] = False
+        np.maximum(max_similarity, vectors @ vectors[index], out=max_similarity)
+    return selected
@@ -0,0 +1,346 @@
+"""Vector and hybrid retrieval for the Agentic CoT RAG model.
+
+Vector search uses the ANN index of the configured storage format. With
+``halfvec`` or ``binary`` storage, ``rerank_factor`` times more candidates
+are fetched from the quantized index and re-ranked by full-precision
+distance before the top results are returned. Searches filtered to a
+department with its own partition (see ``partitions``) use that partition's
+partial ANN index.
+
+Vector hits are cut adaptively at a distance threshold or at the first large
+distance gap (see ``thresholds``), so weak matches never leave the database
+and fewer than ``k`` results are returned when only a few are relevant.
+
+Title and department filters are applied while scanning the ANN index. With
+pgvector 0.8+ the scan is iterative and continues until enough rows pass the
+filter; on older versions filtered searches are exact (the metadata indexes
+select the rows, which are then sorted by distance) so they still return
+``k`` hits.
+
+Hybrid search runs that nearest-neighbour query and an indexed
+full-text/trigram query in a single SQL round-trip and fuses both rankings
+with weighted reciprocal rank fusion (RRF). The lexical side catches exact
+part numbers, names and CJK terms that embeddings tend to blur; lexical
+hits are kept even where the vector side was cut.
+"""
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from sqlalchemy import text
+from ...database import db_manager
+from .config import vectorstore_config, vector_index_config, retrieval_config
+from .index import EMBEDDING_TABLE, COLLECTION_TABLE, DISTANCE_OPERATORS, iterative_scan_enabled, storage_expressions
+from .partitions import get_partition
+from .thresholds import get_thresholds
+
+
+def _where(with_titles: bool, department: Optional[str] = None, partition: Optional[str] = None) -> str:
+    """Build the collection (and optional department and title) filter."""
+    # A partitioned department is selected with the literal predicate of its partial index
+    where = partition
+    if where is None:
+        where = f"collection_id = (SELECT uuid FROM {COLLECTION_TABLE} WHERE name = :collection)"
+        if department:
+            where += " AND cmetadata->>'department' = :department"
+    return where + (" AND cmetadata->>'title' = ANY(:titles)" if with_titles else "")
+
+
+# Similarity (higher is more relevant) for MMR per distance strategy; <#> is the negative inner product
+_RELEVANCE = {
+    "cosine": "1 - {distance}",
+    "euclidean": "1 / (1 + {distance})",
+    "inner_product": "-{distance}",
+}
+
+
+def _relevance(distance: str) -> str:
+    """Build the relevance expression of a distance for the configured distance strategy."""
+    return _RELEVANCE[vector_index_config["distance"]].format(distance=distance)
+
+
+def _exact_distance(column: str = "embedding") -> str:
+    """Build the full-precision distance expression to the query embedding."""
+    # The text cast lets asyncpg send the embedding parameter as text
+    return f"{column} {DISTANCE_OPERATORS[vector_index_config['distance']]} CAST(CAST(:embedding AS text) AS vector)"
+
+
+def vector_candidates_sql(where: str, limit: str, storage: Optional[str] = None, exact: bool = False) -> str:
+    """
+    Build a subquery selecting the nearest chunks as ``(id, distance)``.
+
+    Parameters
+    ----------
+    where : str
+        The filter condition.
+    limit : str
+        SQL expression for the number of candidates.
+    storage : str | None, optional
+        ``"vector"``, ``"halfvec"`` or ``"binary"``. Defaults to the configured storage.
+    exact : bool, optional
+        Whether to bypass the ANN index and sort the filtered rows by distance.
+
+    Returns
+    -------
+    str
+        The SQL subquery, ordered by full-precision distance.
+    """
+    if exact:
+        # An ORDER BY expression that no index matches rules out the ANN scan
+        return (
+            f"SELECT id, {_exact_distance()} AS distance FROM {EMBEDDING_TABLE} "
+            f"WHERE {where} ORDER BY {_exact_distance()} + 0 LIMIT {limit}"
+        )
+
+    storage = storage or vector_index_config["storage"]
+    if storage == "vector":
+        return (
+            f"SELECT id, {_exact_distance()} AS distance FROM {EMBEDDING_TABLE} "
+            f"WHERE {where} ORDER BY distance LIMIT {limit}"
+        )
+
+    # Scan the quantized index, then re-rank the candidates at full precision
+    expressions = storage_expressions(storage)
+    return (
+        f"SELECT id, {_exact_distance()} AS distance FROM ("
+        f"  SELECT id, embedding FROM {EMBEDDING_TABLE} WHERE {where}"
+        f"  ORDER BY {expressions['column']} {expressions['operator']} {expressions['query']}"
+        f"  LIMIT {limit} * CAST(:rerank_factor AS int)"
+        f") candidates ORDER BY distance LIMIT {limit}"
+    )
+
+
+def _vector_ranked_sql(where: str, limit: str, exact: bool = False) -> str:
+    """
+    Build CTEs ranking the nearest chunks and cutting the ranking adaptively.
+
+    ``vector_ranked`` holds the candidates with their rank and the distance gap
+    to the previous candidate. ``vector_cut`` keeps the candidates within
+    ``:max_distance`` that come before the first gap of at least ``:elbow_gap``
+    after ``:min_k`` hits. A NULL threshold disables its cut.
+
+    Parameters
+    ----------
+    where : str
+        The filter condition.
+    limit : str
+        SQL expression for the number of candidates.
+    exact : bool, optional
+        Whether to search exactly instead of with the ANN index.
+
+    Returns
+    -------
+    str
+        The ``vector_ranked`` and ``vector_cut`` CTE definitions.
+    """
+    return (
+        "vector_ranked AS ("
+        "  SELECT id, distance, row_number() OVER w AS rank, distance - lag(distance) OVER w AS gap FROM ("
+        f"    {vector_candidates_sql(where, limit, exact=exact)}"
+        "  ) v WINDOW w AS (ORDER BY distance)"
+        "), vector_cut AS ("
+        "  SELECT id, distance, rank FROM vector_ranked"
+        "  WHERE distance <= COALESCE(CAST(:max_distance AS float8), 'Infinity')"
+        "  AND rank < COALESCE(("
+        "    SELECT min(rank) FROM vector_ranked"
+        "    WHERE rank > CAST(:min_k AS int) AND gap >= CAST(:elbow_gap AS float8)"
+        "  ), 2147483647)"
+        ")"
+    )
+
+
+def _columns(with_embeddings: bool) -> str:
+    """Build the list of result columns of the embedding table ``e``."""
+    # pgvector's binary send format: int16 dimensions, int16 unused, big-endian float4 values
+    return "e.id, e.document, e.cmetadata" + (", vector_send(e.embedding) AS embedding" if with_embeddings else "")
+
+
+def _vector_query(where: str, with_embeddings: bool = False, exact: bool = False) -> text:
+    """
+    Build the vector search query.
+
+    Parameters
+    ----------
+    where : str
+        The filter condition.
+    with_embeddings : bool, optional
+        Whether to also select the stored embeddings.
+    exact : bool, optional
+        Whether to search exactly instead of with the ANN index.
+
+    Returns
+    -------
+    TextClause
+        The SQL statement.
+    """
+    return text(
+        f"WITH {_vector_ranked_sql(where, 'CAST(:k AS int)', exact)} "
+        f"SELECT {_columns(with_embeddings)}, v.distance, {_relevance('v.distance')} AS relevance "
+        f"FROM vector_cut v JOIN {EMBEDDING_TABLE} e ON e.id = v.id "
+        "ORDER BY v.distance"
+    )
+
+
+def _hybrid_query(where: str, with_embeddings: bool = False, exact: bool = False) -> text:
+    """
+    Build the hybrid search query.
+
+    Parameters
+    ----------
+    where : str
+        The filter condition.
+    with_embeddings : bool, optional
+        Whether to also select the stored embeddings.
+    exact : bool, optional
+        Whether to search the vector side exactly instead of with the ANN index.
+
+    Returns
+    -------
+    TextClause
+        The SQL statement.
+    """
+    ts_config = retrieval_config["text_search_config"]
+    tsvector = f"to_tsvector('{ts_config}', document)"
+    tsquery = f"websearch_to_tsquery('{ts_config}', :query)"
+    return text(
+        f"WITH {_vector_ranked_sql(where, 'CAST(:candidates AS int)', exact)}, vector_hits AS ("
+        "  SELECT id, CAST(:vector_weight AS float8) / (CAST(:rrf_k AS int) + rank) AS score FROM vector_cut"
+        "), lexical_hits AS ("
+        "  SELECT id, CAST(:lexical_weight AS float8) / (CAST(:rrf_k AS int) + row_number() OVER (ORDER BY rank DESC)) AS score FROM ("
+        f"    SELECT id, GREATEST(ts_rank_cd({tsvector}, {tsquery}), word_similarity(:query, document)) AS rank"
+        f"    FROM {EMBEDDING_TABLE}"
+        f"    WHERE {where} AND ({tsvector} @@ {tsquery} OR :query <% document)"
+        "    ORDER BY rank DESC LIMIT :candidates"
+        "  ) l"
+        "), fused AS ("
+        "  SELECT id, SUM(score) AS score FROM ("
+        "    SELECT * FROM vector_hits UNION ALL SELECT * FROM lexical_hits"
+        "  ) h GROUP BY id"
+        ") "
+        f"SELECT {_columns(with_embeddings)}, {_exact_distance('e.embedding')} AS distance, "
+        # Fused score scaled to 1.0 for a first-ranked hit on both sides
+        "f.score * (CAST(:rrf_k AS int) + 1) / (CAST(:vector_weight AS float8) + CAST(:lexical_weight AS float8)) AS relevance "
+        f"FROM fused f JOIN {EMBEDDING_TABLE} e ON e.id = f.id "
+        "ORDER BY f.score DESC LIMIT :k"
+    )
+
+
+async def _search(
+    build_query: Callable[[str, bool, bool], text],
+    params: dict,
+    titles: Optional[List[str]],
+    department: Optional[str],
+    with_embeddings: bool,
+) -> list:
+    """Build and run a search statement and build documents from the rows."""
+    partition = await get_partition(department) if department else None
+    # Filters the ANN scan cannot see (a partition has its own index) may leave
+    # fewer than k rows unless the scan is iterative
+    filtered = bool(titles) or (bool(department) and partition is None)
+    exact = filtered and not iterative_scan_enabled()
+    statement = build_query(_where(bool(titles), department, partition), with_embeddings, exact)
+    params = {
+        **params,
+        **await get_thresholds(),
+        "collection": vectorstore_config["collection_name"],
+        "rerank_factor": vector_index_config["rerank_factor"],
+    }
+    if titles:
+        params["titles"] = list(titles)
+    if department:
+        params["department"] = department
+
+    # Searches are read-only, so they can run on a read replica
+    async with db_manager.get_read_session() as session:
+        rows = (await session.execute(statement, params)).all()
+
+    results = []
+    for row in rows:
+        document = Document(id=row.id, page_content=row.document, metadata=row.cmetadata or {})
+        if with_embeddings:
+            embedding = np.frombuffer(row.embedding, dtype=">f4", offset=4).astype(np.float32)
+            results.append((document, row.distance, embedding, row.relevance))
+        else:
+            results.append((document, row.distance))
+    return results
+
+
+async def vector_search(
+    embedding: List[float],
+    k: int,
+    titles: Optional[List[str]] = None,
+    department: Optional[str] = None,
+    with_embeddings: bool = False,
+) -> List[Tuple[Document, float]]:
+    """
+    Search the collection by vector similarity.
+
+    Parameters
+    ----------
+    embedding : list of float
+        The embedding of the query.
+    k : int
+        The number of results to return.
+    titles : list of str | None, optional
+        Exact document titles to restrict the search to.
+    department : str | None, optional
+        Exact department to restrict the search to, using its partition if it has one.
+    with_embeddings : bool, optional
+        Whether to append the stored embedding (float32 array) and the relevance
+        used by MMR to each result.
+
+    Returns
+    -------
+    list of tuple of (Document, float)
+        The documents ordered by distance, each with its vector distance. The
+        relevance appended with ``with_embeddings`` is the similarity of the
+        distance strategy (``1 - d`` for cosine, ``1 / (1 + d)`` for
+        euclidean, the inner product for inner_product).
+    """
+    params = {"embedding": str(list(embedding)), "k": k}
+    return await _search(_vector_query, params, titles, department, with_embeddings)
+
+
+async def hybrid_search(
+    query: str,
+    embedding: List[float],
+    k: int,
+    titles: Optional[List[str]] = None,
+    department: Optional[str] = None,
+    with_embeddings: bool = False,
+) -> List[Tuple[Document, float]]:
+    """
+    Search the collection with fused lexical and vector rankings.
+
+    Parameters
+    ----------
+    query : str
+        The keyword query, used for full-text and trigram matching.
+    embedding : list of float
+        The embedding of the query.
+    k : int
+        The number of results to return.
+    titles : list of str | None, optional
+        Exact document titles to restrict the search to.
+    department : str | None, optional
+        Exact department to restrict the search to, using its partition if it has one.
+    with_embeddings : bool, optional
+        Whether to append the stored embedding (float32 array) and the relevance
+        used by MMR to each result.
+
+    Returns
+    -------
+    list of tuple of (Document, float)
+        The documents in fused rank order, each with its vector distance. The
+        relevance appended with ``with_embeddings`` is the fused RRF score,
+        scaled to 1.0 for a hit ranked first by both searches.
+    """
+    params = {
+        "query": query,
+        "embedding": str(list(embedding)),
+        "candidates": retrieval_config["candidates"],
+        "rrf_k": retrieval_config["rrf_k"],
+        "vector_weight": retrieval_config["vector_weight"],
+        "lexical_weight": retrieval_config["lexical_weight"],
+        "k": k,
+    }
+    return await _search(_hybrid_query, params, titles, department, with_embeddings)
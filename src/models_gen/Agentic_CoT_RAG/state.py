@@ -1,9 +1,21 @@
 """Custom agent state for the Agentic CoT RAG model."""
+from typing import Annotated, Sequence
+from typing_extensions import NotRequired
+from langchain_core.messages import BaseMessage
 from langgraph.prebuilt.chat_agent_executor import AgentState
+from .compaction import add_compacted_messages
 
 
 class AgenticCoTRAGState(AgentState):
     """
     Custom agent state for the Agentic CoT RAG model.
+
+    ``messages`` compacts tool results the model has already read (see
+    ``compaction.add_compacted_messages``).
+
+    ``history_summary`` is the rolling summary of compacted older turns:
+    ``{"digest", "count", "text"}``, where ``digest`` identifies the first
+    ``count`` messages it summarizes.
     """
-    pass
\ No newline at end of file
+    messages: Annotated[Sequence[BaseMessage], add_compacted_messages]
+    history_summary: NotRequired[dict]
\ No newline at end of file
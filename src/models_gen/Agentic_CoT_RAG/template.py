@@ -47,6 +47,26 @@ summarize_template = PromptTemplate(
 )
 
 
+# Create prompt template for the rolling summary of compacted conversation history
+history_summary_template = PromptTemplate(
+    input_variables=["previous_summary", "conversation", "max_words"],
+    template=(
+        "You maintain a running summary of a conversation between a user and an AI assistant "
+        "that answers from a knowledge base.\n\n"
+        "Summary so far:\n"
+        "{previous_summary}\n\n"
+        "New conversation turns:\n"
+        "{conversation}\n\n"
+        "Instructions:\n"
+        "1. Update the summary with the new turns; keep everything from the summary so far that is still relevant.\n"
+        "2. Keep the user's questions and constraints, the facts found (with their document titles) and any open follow-ups.\n"
+        "3. Drop greetings, search strategy and repeated content.\n"
+        "4. Write in the conversation's language, in at most {max_words} words.\n\n"
+        "Updated summary:"
+    )
+)
+
+
 # Create system prompt for the ReAct agent.
 systemprompt_template = PromptTemplate(
     input_variables=[],
@@ -0,0 +1,213 @@
+"""Calibrated adaptive top-k thresholds for the Agentic CoT RAG vector collection.
+
+Distances depend on the embedding model and on how homogeneous a corpus is,
+so the cutoffs used by adaptive retrieval are calibrated per collection.
+They are applied to query-to-chunk distances, which run larger than
+chunk-to-chunk distances (a few keywords do not embed like a passage), so
+they are calibrated on query embeddings: real queries when given, otherwise
+the first few words of sampled chunks as stand-ins.
+
+- ``max_distance``: a low percentile of the distances between the queries
+  and random chunks. Hits farther away than that are about as related to
+  the query as random chunks.
+- ``elbow_gap``: a high percentile of the distance gaps between consecutive
+  nearest neighbours of the queries. A larger gap in a result list marks
+  where the relevant hits end.
+
+Run as a management command::
+
+    python -m src.models_gen.Agentic_CoT_RAG.index calibrate
+    python -m src.models_gen.Agentic_CoT_RAG.index calibrate --queries-file queries.txt
+"""
+import logging
+import time
+from typing import List, Optional
+from sqlalchemy import Column, DateTime, Float, Integer, String, func, text
+from ...database import Base, db_manager
+from .config import vectorstore_config, vector_index_config, retrieval_config, adaptive_retrieval_config
+from .index import EMBEDDING_TABLE, COLLECTION_TABLE, DISTANCE_OPERATORS
+
+logger = logging.getLogger(__name__)
+
+# Calibration cache per worker: {"loaded": monotonic time, "thresholds": {...}}
+_cache = {"loaded": None, "thresholds": {}}
+
+
+class RetrievalThreshold(Base):
+    """Calibrated adaptive retrieval thresholds per vector collection."""
+
+    __tablename__ = "rag_retrieval_thresholds"
+
+    collection_name = Column(String, primary_key=True)
+    max_distance = Column(Float, nullable=True)
+    elbow_gap = Column(Float, nullable=True)
+    queries = Column(Integer, nullable=False)
+    calibrated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+def pseudo_query(document: str, words: Optional[int] = None) -> str:
+    """
+    Build a keyword-length stand-in query from the start of a chunk.
+
+    Parameters
+    ----------
+    document : str
+        The chunk text.
+    words : int | None, optional
+        Words kept. Defaults to ``calibration_query_words``.
+
+    Returns
+    -------
+    str
+        The first ``words`` words of the chunk.
+    """
+    words = words or adaptive_retrieval_config["calibration_query_words"]
+    return " ".join(document.split()[:words])
+
+
+def calibrate_thresholds(num_queries: Optional[int] = None, queries: Optional[List[str]] = None) -> dict:
+    """
+    Calibrate the adaptive retrieval thresholds of the collection on query embeddings.
+
+    Parameters
+    ----------
+    num_queries : int | None, optional
+        Queries used. Defaults to ``calibration_queries``.
+    queries : list of str | None, optional
+        Real search queries (e.g. from logs). Without them, stand-in queries
+        are built from sampled chunks, and each is not matched to its own chunk.
+
+    Returns
+    -------
+    dict
+        The calibrated ``max_distance`` and ``elbow_gap``.
+    """
+    # Embeddings open the model connection, which calibration from the CLI only needs here
+    from .connection import embeddings
+
+    num_queries = num_queries or adaptive_retrieval_config["calibration_queries"]
+    collection_name = vectorstore_config["collection_name"]
+    operator = DISTANCE_OPERATORS[vector_index_config["distance"]]
+    collection = f"(SELECT uuid FROM {COLLECTION_TABLE} WHERE name = :collection)"
+
+    with db_manager.get_session() as session:
+        conn = session.connection()
+        RetrievalThreshold.__table__.create(conn, checkfirst=True)
+
+        # Random chunks: the first half yields stand-in queries, the second half
+        # the unrelated chunks each query is compared with
+        sample = conn.execute(
+            text(
+                f"SELECT id, document FROM {EMBEDDING_TABLE} WHERE collection_id = {collection} "
+                "ORDER BY random() LIMIT 2 * CAST(:n AS int)"
+            ),
+            {"collection": collection_name, "n": num_queries},
+        ).all()
+        if queries:
+            queries, sources = list(queries)[:num_queries], [None] * min(len(queries), num_queries)
+        else:
+            # Never compare a stand-in query with its own chunk
+            sources = [row.id for row in sample[:len(sample) // 2]]
+            queries = [pseudo_query(row.document) for row in sample[:len(sample) // 2]]
+        partners = [row.id for row in sample[len(sample) - len(queries):]]
+        if not queries or len(partners) < len(queries):
+            raise ValueError(f"Collection '{collection_name}' has too few chunks to calibrate on")
+
+        params = {
+            "collection": collection_name,
+            "embeddings": [str(vector) for vector in embeddings.embed_documents(queries)],
+            "sources": sources,
+            "partners": partners,
+        }
+        query_table = (
+            "unnest(CAST(:embeddings AS text[]), CAST(:sources AS text[])) "
+            "WITH ORDINALITY AS q(embedding, source, rn)"
+        )
+
+        # Distances between each query and a random chunk
+        max_distance = conn.execute(
+            text(
+                f"SELECT percentile_cont(CAST(:p AS float8)) WITHIN GROUP ("
+                f"  ORDER BY e.embedding {operator} CAST(q.embedding AS vector)"
+                f") FROM {query_table} "
+                "JOIN unnest(CAST(:partners AS text[])) WITH ORDINALITY AS p(id, rn) ON p.rn = q.rn "
+                f"JOIN {EMBEDDING_TABLE} e ON e.id = p.id"
+            ),
+            {**params, "p": adaptive_retrieval_config["distance_percentile"]},
+        ).scalar()
+
+        # Gaps between consecutive nearest neighbours of each query
+        elbow_gap = conn.execute(
+            text(
+                "SELECT percentile_cont(CAST(:p AS float8)) WITHIN GROUP (ORDER BY gap) FROM ("
+                "  SELECT n.distance - lag(n.distance) OVER (PARTITION BY q.rn ORDER BY n.distance) AS gap "
+                f"  FROM {query_table} CROSS JOIN LATERAL ("
+                f"    SELECT e.embedding {operator} CAST(q.embedding AS vector) AS distance FROM {EMBEDDING_TABLE} e "
+                f"    WHERE e.collection_id = {collection} AND e.id IS DISTINCT FROM q.source "
+                "    ORDER BY distance LIMIT :k"
+                "  ) n"
+                ") g WHERE gap IS NOT NULL"
+            ),
+            {**params, "p": adaptive_retrieval_config["gap_percentile"], "k": retrieval_config["k"]},
+        ).scalar()
+
+        conn.execute(
+            text(
+                "INSERT INTO rag_retrieval_thresholds (collection_name, max_distance, elbow_gap, queries) "
+                "VALUES (:collection, :max_distance, :elbow_gap, :n) "
+                "ON CONFLICT (collection_name) DO UPDATE SET max_distance = EXCLUDED.max_distance, "
+                "elbow_gap = EXCLUDED.elbow_gap, queries = EXCLUDED.queries, calibrated_at = now()"
+            ),
+            {"collection": collection_name, "max_distance": max_distance, "elbow_gap": elbow_gap, "n": len(queries)},
+        )
+
+    logger.info(f"Calibrated '{collection_name}': max_distance={max_distance}, elbow_gap={elbow_gap}")
+    _cache["loaded"] = None
+    return {"max_distance": max_distance, "elbow_gap": elbow_gap, "queries": len(queries)}
+
+
+async def _load_calibrated() -> dict:
+    """Load the calibrated thresholds of the collection, cached for ``cache_seconds``."""
+    loaded = _cache["loaded"]
+    if loaded is not None and time.monotonic() - loaded < adaptive_retrieval_config["cache_seconds"]:
+        return _cache["thresholds"]
+
+    async with db_manager.get_read_session() as session:
+        # The table only exists once the collection was calibrated
+        row = None
+        if (await session.execute(text("SELECT to_regclass('rag_retrieval_thresholds') IS NOT NULL"))).scalar():
+            row = (await session.execute(
+                text(
+                    "SELECT max_distance, elbow_gap FROM rag_retrieval_thresholds "
+                    "WHERE collection_name = :collection"
+                ),
+                {"collection": vectorstore_config["collection_name"]},
+            )).first()
+
+    _cache["thresholds"] = {"max_distance": row.max_distance, "elbow_gap": row.elbow_gap} if row else {}
+    _cache["loaded"] = time.monotonic()
+    return _cache["thresholds"]
+
+
+async def get_thresholds() -> dict:
+    """
+    Get the adaptive retrieval thresholds for the collection.
+
+    Configured values take precedence over calibrated ones; a threshold of
+    None disables that cut.
+
+    Returns
+    -------
+    dict
+        ``min_k``, ``max_distance`` and ``elbow_gap``.
+    """
+    config = adaptive_retrieval_config
+    if not config["enabled"]:
+        return {"min_k": config["min_k"], "max_distance": None, "elbow_gap": None}
+
+    calibrated = await _load_calibrated()
+    return {
+        "min_k": config["min_k"],
+        "max_distance": config["max_distance"] if config["max_distance"] is not None else calibrated.get("max_distance"),
+        "elbow_gap": config["elbow_gap"] if config["elbow_gap"] is not None else calibrated.get("elbow_gap"),
+    }
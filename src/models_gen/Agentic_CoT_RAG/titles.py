@@ -0,0 +1,251 @@
+"""Trigram-indexed document title lookup for the Agentic CoT RAG model.
+
+The agent often passes approximate or misspelled document titles to
+``keywords_search``. Titles are resolved against this lookup table before
+the vector query so the metadata filter always uses exact titles. The table
+also records the department of each title, which routes title-filtered
+searches to the department's partition.
+"""
+import logging
+from typing import Dict, List, Optional
+from sqlalchemy import Column, Index, String, text
+from sqlalchemy.engine import Connection
+from ...database import Base, db_manager
+from .config import vectorstore_config, title_resolution_config
+from .index import EMBEDDING_TABLE, COLLECTION_TABLE
+
+logger = logging.getLogger(__name__)
+
+# Advisory lock key so only one worker creates the lookup table at startup
+_TITLES_LOCK_KEY = 0x5EC7_0002
+
+
+class DocumentTitle(Base):
+    """Distinct document titles per vector collection."""
+
+    __tablename__ = "rag_document_titles"
+
+    collection_name = Column(String, primary_key=True)
+    title = Column(String, primary_key=True)
+    department = Column(String, nullable=True)
+
+    __table_args__ = (
+        Index(
+            "ix_rag_document_titles_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ),
+    )
+
+
+def create_title_table(conn: Connection) -> None:
+    """
+    Create the title lookup table and its trigram index if they do not exist.
+
+    Parameters
+    ----------
+    conn : Connection
+        Connection to use.
+    """
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    DocumentTitle.__table__.create(conn, checkfirst=True)
+    # Tables created before departments were tracked
+    conn.execute(text("ALTER TABLE rag_document_titles ADD COLUMN IF NOT EXISTS department VARCHAR"))
+
+
+def refresh_titles(collection_name: str = None) -> int:
+    """
+    Synchronize the title lookup table with the titles (and their departments) in a vector collection.
+
+    Parameters
+    ----------
+    collection_name : str | None, optional
+        The collection to refresh. Defaults to the configured collection.
+
+    Returns
+    -------
+    int
+        The number of distinct titles in the collection.
+    """
+    collection_name = collection_name or vectorstore_config["collection_name"]
+    params = {"collection": collection_name}
+    with db_manager.get_session() as session:
+        conn = session.connection()
+        create_title_table(conn)
+        conn.execute(
+            text(
+                "CREATE TEMP TABLE current_titles ON COMMIT DROP AS "
+                "SELECT e.cmetadata->>'title' AS title, "
+                # Only titles within a single department can be routed to its partition
+                "CASE WHEN count(DISTINCT e.cmetadata->>'department') = 1 "
+                "THEN min(e.cmetadata->>'department') END AS department "
+                f"FROM {EMBEDDING_TABLE} e JOIN {COLLECTION_TABLE} c ON c.uuid = e.collection_id "
+                "WHERE c.name = :collection AND e.cmetadata->>'title' IS NOT NULL GROUP BY 1"
+            ),
+            params,
+        )
+        conn.execute(
+            text(
+                "DELETE FROM rag_document_titles WHERE collection_name = :collection "
+                "AND title NOT IN (SELECT title FROM current_titles)"
+            ),
+            params,
+        )
+        conn.execute(
+            text(
+                "INSERT INTO rag_document_titles (collection_name, title, department) "
+                "SELECT :collection, title, department FROM current_titles "
+                "ON CONFLICT (collection_name, title) DO UPDATE SET department = EXCLUDED.department"
+            ),
+            params,
+        )
+        count = conn.execute(text("SELECT count(*) FROM current_titles")).scalar()
+    logger.info(f"Refreshed {count} titles for collection '{collection_name}'")
+    return count
+
+
+def ensure_title_table() -> None:
+    """
+    Startup check: create the title lookup table and populate it if it is empty.
+    """
+    collection_name = vectorstore_config["collection_name"]
+    try:
+        with db_manager.get_session() as session:
+            conn = session.connection()
+            conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _TITLES_LOCK_KEY})
+            create_title_table(conn)
+            populated = conn.execute(
+                text("SELECT EXISTS (SELECT 1 FROM rag_document_titles WHERE collection_name = :collection)"),
+                {"collection": collection_name},
+            ).scalar()
+        if not populated:
+            refresh_titles(collection_name)
+    except Exception as e:
+        logger.error(f"Title lookup startup check failed: {e}")
+
+
+async def resolve_title(title: str, collection_name: str = None) -> List[str]:
+    """
+    Resolve an approximate document title to exact titles in the collection.
+
+    An exact match wins outright. Otherwise the most similar titles (trigram
+    similarity, including partial-title matches) above ``min_similarity`` are
+    returned, best first.
+
+    Parameters
+    ----------
+    title : str
+        The title as given by the agent.
+    collection_name : str | None, optional
+        The collection to search. Defaults to the configured collection.
+
+    Returns
+    -------
+    list of str
+        Exact titles to filter on; empty if nothing similar was found.
+    """
+    collection_name = collection_name or vectorstore_config["collection_name"]
+    async with db_manager.get_read_session() as session:
+        rows = (await session.execute(
+            text(
+                "SELECT title, title = :title AS exact, "
+                "GREATEST(similarity(title, :title), word_similarity(:title, title)) AS score "
+                "FROM rag_document_titles "
+                "WHERE collection_name = :collection "
+                "AND (title = :title OR title % :title OR :title <% title) "
+                "ORDER BY exact DESC, score DESC LIMIT :limit"
+            ),
+            {
+                "title": title,
+                "collection": collection_name,
+                "limit": title_resolution_config["max_candidates"],
+            },
+        )).all()
+
+    if rows and rows[0].exact:
+        return [rows[0].title]
+    return [row.title for row in rows if row.score >= title_resolution_config["min_similarity"]]
+
+
+async def resolve_department(department: str, collection_name: str = None) -> Optional[str]:
+    """
+    Resolve a department name to its exact spelling in the collection.
+
+    Parameters
+    ----------
+    department : str
+        The department as given by the agent (case-insensitive).
+    collection_name : str | None, optional
+        The collection to search. Defaults to the configured collection.
+
+    Returns
+    -------
+    str | None
+        The exact department name, or None if no document belongs to it.
+    """
+    collection_name = collection_name or vectorstore_config["collection_name"]
+    async with db_manager.get_read_session() as session:
+        return (await session.execute(
+            text(
+                "SELECT department FROM rag_document_titles "
+                "WHERE collection_name = :collection AND lower(department) = lower(:department) "
+                "ORDER BY department = :department DESC LIMIT 1"
+            ),
+            {"department": department, "collection": collection_name},
+        )).scalar()
+
+
+def common_department(titles: List[str], departments: Dict[str, Optional[str]]) -> Optional[str]:
+    """
+    Get the department shared by all titles, if there is one.
+
+    Parameters
+    ----------
+    titles : list of str
+        Exact document titles.
+    departments : dict of str to str or None
+        The department of each known title; None for titles spanning
+        several departments.
+
+    Returns
+    -------
+    str | None
+        The department, or None if a title is unknown, spans several
+        departments, or the titles belong to different departments.
+    """
+    found = {departments.get(title) for title in titles}
+    if len(found) == 1:
+        return found.pop()
+    return None
+
+
+async def title_department(titles: List[str], collection_name: str = None) -> Optional[str]:
+    """
+    Get the department of documents, if they all belong to the same one.
+
+    A search restricted to these titles can then use that department's
+    partition without losing chunks.
+
+    Parameters
+    ----------
+    titles : list of str
+        Exact document titles.
+    collection_name : str | None, optional
+        The collection to search. Defaults to the configured collection.
+
+    Returns
+    -------
+    str | None
+        The common department, or None (see ``common_department``).
+    """
+    collection_name = collection_name or vectorstore_config["collection_name"]
+    async with db_manager.get_read_session() as session:
+        rows = (await session.execute(
+            text(
+                "SELECT title, department FROM rag_document_titles "
+                "WHERE collection_name = :collection AND title = ANY(:titles)"
+            ),
+            {"titles": list(titles), "collection": collection_name},
+        )).all()
+    return common_department(titles, {row.title: row.department for row in rows})
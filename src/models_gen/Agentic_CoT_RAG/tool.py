@@ -1,12 +1,131 @@
 """Define tools for the Agentic CoT RAG model."""
+import asyncio
 import json
-from typing import Annotated
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Annotated, AsyncIterator, List, Optional
 from pydantic import BaseModel, Field
 from langchain_core.tools import tool, InjectedToolCallId
 from langchain_core.messages import ToolMessage
 from langgraph.types import Command
-from .connection import vectorstore, chat_model
+from ...metrics import metrics
+from .config import mmr_config, passthrough_config, retrieval_config, title_resolution_config
+from .connection import chat_model, embeddings
+from .rerank import mmr
+from .retrieval import hybrid_search, vector_search
 from .template import summarize_template
+from .titles import resolve_department, resolve_title, title_department
+
+
+# Slots for concurrent keywords_search calls of the current request
+_search_slots: ContextVar[Optional[asyncio.Semaphore]] = ContextVar("search_slots", default=None)
+
+
+def limit_parallel_searches(limit: int) -> None:
+    """
+    Cap the concurrent keywords_search calls of the current request.
+
+    The agent runs the tool calls of one model turn concurrently; graph tasks
+    inherit the caller's context, so call this before running the graph.
+
+    Parameters
+    ----------
+    limit : int
+        Maximum concurrent calls.
+    """
+    _search_slots.set(asyncio.Semaphore(limit))
+
+
+@asynccontextmanager
+async def _search_slot() -> AsyncIterator[None]:
+    """Hold one of the request's search slots, if the request is capped."""
+    slots = _search_slots.get()
+    if slots is None:
+        yield
+        return
+    started = time.perf_counter()
+    async with slots:
+        metrics.observe("keywords_search.slot_wait_seconds", time.perf_counter() - started)
+        yield
+
+
+def _interleave(ranked_lists: List[list]) -> list:
+    """
+    Merge ranked result lists round-robin, keeping the first occurrence of each document.
+
+    Parameters
+    ----------
+    ranked_lists : list of list of tuple of (Document, float)
+        One ranked result list per keyword.
+
+    Returns
+    -------
+    list of tuple of (Document, float)
+        The merged results.
+    """
+    merged, seen = [], set()
+    for rank in range(max((len(results) for results in ranked_lists), default=0)):
+        for results in ranked_lists:
+            if rank < len(results):
+                doc = results[rank]
+                key = doc[0].id or doc[0].page_content
+                if key not in seen:
+                    seen.add(key)
+                    merged.append(doc)
+    return merged
+
+
+def _should_pass_through(docs: List[dict], distances: List[float]) -> bool:
+    """
+    Decide whether the retrieved documents are small enough to skip the summarizer.
+
+    Parameters
+    ----------
+    docs : list of dict
+        The retrieved documents (``metadata`` and ``page_content``).
+    distances : list of float
+        The vector distances of the retrieved documents (lower is better).
+
+    Returns
+    -------
+    bool
+        True if the documents should be formatted directly into the tool message.
+    """
+    if not passthrough_config["enabled"]:
+        return False
+    if len(docs) > passthrough_config["max_documents"]:
+        return False
+    if sum(len(doc["page_content"]) for doc in docs) > passthrough_config["max_characters"]:
+        return False
+    return max(distances) <= passthrough_config["max_distance"]
+
+
+def _format_documents(docs: List[dict]) -> str:
+    """
+    Format documents as Markdown, mirroring the layout produced by the summarizer.
+
+    Parameters
+    ----------
+    docs : list of dict
+        The documents to format (``metadata`` and ``page_content``).
+
+    Returns
+    -------
+    str
+        The Markdown-formatted document blocks.
+    """
+    blocks = []
+    for doc in docs:
+        metadata = doc["metadata"]
+        blocks.append(
+            f"# Document: {metadata.get('title', '')}\n"
+            f"{doc['page_content']}\n"
+            f"## Author: {metadata.get('author', '')}\n"
+            f"## Department: {metadata.get('department', '')}\n"
+            f"## Section: {metadata.get('section_title', '')}\n"
+        )
+    return "\n---\n".join(blocks)
 
 
 # Tool schema
@@ -26,6 +145,13 @@ class KeywordsSearchSchema(BaseModel):
             "If not provided, the search is performed across the entire corpus for broad search."
         )
     )
+    department: str = Field(
+        default=None,
+        description=(
+            "The department whose documents should be searched. "
+            "If not provided, the search is performed across all departments."
+        )
+    )
     tool_call_id: Annotated[str, InjectedToolCallId]
 
 
@@ -39,9 +165,10 @@ class KeywordsSearchSchema(BaseModel):
         "complete metadata for each hit. No external data or speculation is included."
     ),
 )
-def keywords_search(
+async def keywords_search(
     keywords: str,
     title: str = None,
+    department: str = None,
     tool_call_id: Annotated[str, InjectedToolCallId] = None,
 ) -> Command:
     """
@@ -55,31 +182,93 @@ def keywords_search(
     title : str | None, optional
         The title of the document in which the search should be performed.
         If not provided, the search is performed across the entire corpus for broad search.
+    department : str | None, optional
+        The department whose documents should be searched.
+        If not provided, the search is performed across all departments.
 
     Returns
     -------
     str
         A markdown-formatted string summarizing the relevant documents found.
     """
-    # Build the filter dictionary from the individual parameters
-    filter_dict = None
-    if title:
-        filter_dict = {k: v for k, v in {"title": title}.items() if v.strip()} or None
+    async with _search_slot():
+        return await _run_search(keywords, title, department, tool_call_id)
+
+
+async def _run_search(keywords: str, title: Optional[str], department: Optional[str], tool_call_id: str) -> Command:
+    """Run one keywords_search call (see ``keywords_search``)."""
+    # Resolve the title filter to exact titles (an indexed cmetadata->>'title' predicate)
+    titles = None
+    notice = ""
+    if title and title.strip():
+        titles = await resolve_title(title.strip()) if title_resolution_config["enabled"] else [title.strip()]
+        if not titles:
+            # Unknown title: search the whole corpus instead of failing the turn
+            notice = f"No document titled '{title}' exists; searched the entire corpus instead.\n\n"
+            metrics.incr("keywords_search.title_unresolved")
+
+    # Route to a department partition: given explicitly, or implied by the titles
+    department_filter = None
+    if department and department.strip():
+        department_filter = await resolve_department(department.strip())
+        if department_filter is None:
+            notice += f"No department named '{department}' exists; searched all departments instead.\n\n"
+            metrics.incr("keywords_search.department_unresolved")
+    elif titles:
+        # Only when every title lies within one department; otherwise search unpartitioned
+        department_filter = await title_department(titles)
 
     # Query
-    documents = []
-    for keyword in keywords.split(","):
-        documents += vectorstore.similarity_search_with_score(keyword, k=10, filter=filter_dict)
+    k = retrieval_config["k"]
+    # MMR selects k hits from a larger candidate pool, which needs the stored embeddings
+    diversify = mmr_config["enabled"]
+    fetch_k = max(k, mmr_config["fetch_k"]) if diversify else k
+    queries = [keyword.strip() for keyword in keywords.split(",") if keyword.strip()]
+    # Embed all keywords in one request
+    vectors = await embeddings.aembed_documents(queries) if queries else []
+    filters = {"titles": titles, "department": department_filter, "with_embeddings": diversify}
+    # Search all keywords concurrently, each on its own pooled connection
+    if retrieval_config["mode"] == "hybrid":
+        # Fuse lexical and vector hits per keyword
+        documents = _interleave(await asyncio.gather(
+            *(hybrid_search(query, vector, k=fetch_k, **filters) for query, vector in zip(queries, vectors))
+        ))
+    else:
+        results = await asyncio.gather(*(vector_search(vector, k=fetch_k, **filters) for vector in vectors))
+        # Sort the results and drop hits found by several keywords
+        documents = _interleave([sorted((doc for hits in results for doc in hits), key=lambda t: t[1])])
+
+    if diversify and documents:
+        # Replace near-duplicate chunks with the next most relevant distinct ones
+        started = time.perf_counter()
+        # Relevance from the search itself (similarity, or the fused score in hybrid mode)
+        relevance = [doc[3] for doc in documents]
+        selected = mmr(relevance, [doc[2] for doc in documents], k, mmr_config["lambda_mult"])
+        documents = [documents[index][:2] for index in selected]
+        metrics.observe("keywords_search.mmr_seconds", time.perf_counter() - started)
 
+    metrics.observe("keywords_search.hits", min(len(documents), k))
     if documents:
-        # Sort the results
-        documents.sort(key=lambda t: t[1])
         # Return updates
-        docs = [{"metadata": doc[0].metadata, "page_content": doc[0].page_content} for doc in documents[:10]]
-        sdocs = json.dumps(docs, indent=2, sort_keys=True, ensure_ascii=False)
-        # Summarize documents
-        formatted_prompt = summarize_template.format(user_query=keywords, documents=sdocs)
-        result = chat_model.invoke(formatted_prompt).content
+        docs = [{"metadata": doc[0].metadata, "page_content": doc[0].page_content} for doc in documents[:k]]
+        distances = [doc[1] for doc in documents[:k]]
+        if _should_pass_through(docs, distances):
+            # Small result set: skip the summarizer call entirely
+            result = _format_documents(docs)
+            metrics.incr("keywords_search.passthrough")
+            # An estimate: the mean time of the summarizer calls that did run
+            metrics.incr(
+                "keywords_search.passthrough_estimated_saved_seconds",
+                metrics.mean("keywords_search.summarize_seconds"),
+            )
+        else:
+            sdocs = json.dumps(docs, indent=2, sort_keys=True, ensure_ascii=False)
+            # Summarize documents
+            formatted_prompt = summarize_template.format(user_query=keywords, documents=sdocs)
+            started = time.perf_counter()
+            result = (await chat_model.ainvoke(formatted_prompt)).content
+            metrics.observe("keywords_search.summarize_seconds", time.perf_counter() - started)
+            metrics.incr("keywords_search.summarized")
     else:
         result = "I should leave the title field empty."
 
@@ -90,7 +279,7 @@ def keywords_search(
                 ToolMessage(
                     "<think>\n"
                     "```markdown\n"
-                    f"{result}\n"
+                    f"{notice}{result}\n"
                     "```\n"
                     "</think>",
                     tool_call_id=tool_call_id or "keywords_search",
@@ -1,6 +1,6 @@
 """Base model generator interface."""
 
-from typing import Generator, List
+from typing import AsyncGenerator, List, Optional
 from abc import ABC, abstractmethod
 from ..models import Message
 
@@ -9,12 +9,14 @@ class BaseModelGenerator(ABC):
     """Base class for model generators."""
     
     @abstractmethod
-    def generate(self, messages: List[Message]) -> Generator[str, None, None]:
+    def generate(self, messages: List[Message], session_id: Optional[str] = None) -> AsyncGenerator[str, None]:
         """
-        Generate response tokens.
+        Generate response tokens (an async generator).
         
         Args:
             messages: List of conversation messages
+            session_id: Conversation session id; models keeping conversation
+                state receive only the new messages of the session
             
         Yields:
             Generated tokens/chunks
@@ -25,3 +27,30 @@ class BaseModelGenerator(ABC):
     def get_model_name(self) -> str:
         """Return the model name."""
         pass
+    
+    def startup(self) -> None:
+        """
+        Run startup checks for the model (called once per worker at app startup).
+        
+        Override to validate or prepare external resources. The default does nothing.
+        """
+        pass
+    
+    async def readiness(self) -> dict:
+        """
+        Check that the model can serve requests (run by the background readiness refresher).
+        
+        Override to probe external resources. The default is always ready.
+        
+        Returns:
+            dict: Must contain "ready" (bool); other keys are reported as details
+        """
+        return {"ready": True}
+    
+    async def shutdown(self) -> None:
+        """
+        Release resources of the model (called once per worker at app shutdown).
+        
+        The default does nothing.
+        """
+        pass
@@ -0,0 +1,273 @@
+"""Hedged requests and retries for upstream chat model calls.
+
+``HedgedChatModel`` wraps a chat model and cuts its tail latency:
+
+- Hedging: when a call has not answered (for streams: produced its first
+  chunk) within the ``hedge_percentile`` of recent latencies, a duplicate
+  call is fired and the first response wins; the other is cancelled.
+- Retries: transient upstream errors (connection errors, timeouts, rate
+  limits, 5xx) are retried with full-jitter exponential backoff. Streams
+  are only retried before their first chunk. Sync calls are retried too,
+  but not hedged (the server only uses the async API).
+
+Hedges and retries draw on one budget of extra calls: every request adds
+``extra_call_ratio`` to it, capped at ``extra_call_burst``, and every extra
+call spends 1. An upstream outage therefore cannot multiply the load.
+
+Metrics (``<metrics_name>.*``): ``requests``, ``hedges``, ``hedges_won``,
+``retries``, ``budget_exhausted`` and ``latency_seconds`` /
+``first_chunk_seconds``.
+"""
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, List, Optional
+
+import openai
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+from ..metrics import metrics
+
+# Upstream errors worth retrying
+TRANSIENT_ERRORS = (
+    openai.APIConnectionError,  # includes APITimeoutError
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+class HedgedChatModel(BaseChatModel):
+    """Chat model wrapper adding hedged requests and jittered retries."""
+
+    model: BaseChatModel
+    """The wrapped chat model (configure it without retries of its own)."""
+    hedge_percentile: Optional[float] = 0.95
+    """Latency percentile after which a call is hedged (None disables hedging)."""
+    hedge_min_samples: int = 20
+    """Latencies observed before the percentile is trusted."""
+    hedge_initial_delay: Optional[float] = None
+    """Hedge delay until ``hedge_min_samples`` are observed (None: no hedging)."""
+    latency_window: int = 200
+    """Recent latencies kept per call type."""
+    extra_call_ratio: float = 0.1
+    """Budget of hedges and retries added per request."""
+    extra_call_burst: float = 10.0
+    """Maximum budget of hedges and retries."""
+    max_retries: int = 2
+    backoff_base: float = 0.5
+    backoff_max: float = 8.0
+    metrics_name: str = "llm"
+
+    _latencies: dict = PrivateAttr(default_factory=dict)
+    _budget: Optional[float] = PrivateAttr(default=None)
+
+    @property
+    def _llm_type(self) -> str:
+        return f"hedged-{self.model._llm_type}"
+
+    def bind_tools(self, tools, **kwargs):
+        """Bind tools the way the wrapped model formats them, keeping the hedging wrapper."""
+        bound = self.model.bind_tools(tools, **kwargs)
+        return self.bind(**bound.kwargs)
+
+    def _start_request(self) -> None:
+        """Count a request and add its share to the extra call budget."""
+        if self._budget is None:
+            self._budget = self.extra_call_burst
+        self._budget = min(self.extra_call_burst, self._budget + self.extra_call_ratio)
+        metrics.incr(f"{self.metrics_name}.requests")
+
+    def _spend_extra_call(self) -> bool:
+        """Take one extra call (hedge or retry) from the budget, if any is left."""
+        if self._budget >= 1.0:
+            self._budget -= 1.0
+            return True
+        metrics.incr(f"{self.metrics_name}.budget_exhausted")
+        return False
+
+    def _hedge_delay(self, kind: str) -> Optional[float]:
+        """Get the delay after which a call of this kind is hedged."""
+        if self.hedge_percentile is None:
+            return None
+        latencies = self._latencies.get(kind)
+        if latencies is None or len(latencies) < self.hedge_min_samples:
+            return self.hedge_initial_delay
+        ordered = sorted(latencies)
+        return ordered[min(len(ordered) - 1, int(self.hedge_percentile * len(ordered)))]
+
+    def _observe(self, kind: str, seconds: float) -> None:
+        """Record a latency of a call of this kind."""
+        latencies = self._latencies.get(kind)
+        if latencies is None:
+            latencies = self._latencies[kind] = deque(maxlen=self.latency_window)
+        latencies.append(seconds)
+        metrics.observe(f"{self.metrics_name}.{kind}_seconds", seconds)
+
+    async def _hedged(
+        self,
+        call: Callable[[], Awaitable[Any]],
+        kind: str,
+        discard: Callable[[Any], Awaitable[None]] = None,
+    ) -> Any:
+        """
+        Run a call, hedging it with a duplicate if it is slower than usual.
+
+        Args:
+            call: Starts one attempt and returns its result
+            kind: Latency distribution the call belongs to
+            discard: Releases the result of an attempt that lost the race
+
+        Returns:
+            The result of the first attempt to succeed
+        """
+        started = time.perf_counter()
+        primary = asyncio.ensure_future(call())
+        tasks = [primary]
+        try:
+            delay = self._hedge_delay(kind)
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and self._spend_extra_call():
+                    metrics.incr(f"{self.metrics_name}.hedges")
+                    tasks.append(asyncio.ensure_future(call()))
+
+            pending = set(tasks)
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                succeeded = [task for task in done if task.exception() is None]
+                if succeeded:
+                    break
+                if not pending:
+                    # Every attempt failed: raise the primary's error if it has one
+                    failed = primary if primary.done() else next(iter(done))
+                    raise failed.exception()
+
+            winner = primary if primary in succeeded else succeeded[0]
+            if winner is not primary:
+                metrics.incr(f"{self.metrics_name}.hedges_won")
+            if discard is not None:
+                for task in succeeded:
+                    if task is not winner:
+                        await discard(task.result())
+            self._observe(kind, time.perf_counter() - started)
+            return winner.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _with_retries(self, attempt: Callable[[], Awaitable[Any]]) -> Any:
+        """Run an attempt, retrying transient errors with full-jitter backoff."""
+        for retry in range(self.max_retries + 1):
+            try:
+                return await attempt()
+            except TRANSIENT_ERRORS:
+                if retry == self.max_retries or not self._spend_extra_call():
+                    raise
+                metrics.incr(f"{self.metrics_name}.retries")
+                await asyncio.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** retry)))
+
+    def _with_retries_sync(self, attempt: Callable[[], Any]) -> Any:
+        """Run a blocking attempt, retrying transient errors with full-jitter backoff."""
+        for retry in range(self.max_retries + 1):
+            try:
+                return attempt()
+            except TRANSIENT_ERRORS:
+                if retry == self.max_retries or not self._spend_extra_call():
+                    raise
+                metrics.incr(f"{self.metrics_name}.retries")
+                time.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** retry)))
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        # The wrapped model does not retry, so sync calls get the retries (without hedging)
+        self._start_request()
+        return self._with_retries_sync(lambda: self.model._generate(messages, stop=stop, **kwargs))
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        self._start_request()
+        return await self._with_retries(
+            lambda: self._hedged(lambda: self.model._agenerate(messages, stop=stop, **kwargs), "latency")
+        )
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        self._start_request()
+
+        def open_stream():
+            """Start a stream and wait for its first chunk."""
+            stream = self.model._stream(messages, stop=stop, **kwargs)
+            try:
+                return next(stream, None), stream
+            except BaseException:
+                stream.close()
+                raise
+
+        # Retry until the first chunk; once chunks are yielded the stream is committed
+        first, stream = self._with_retries_sync(open_stream)
+        try:
+            chunk = first
+            while chunk is not None:
+                if run_manager:
+                    run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+                chunk = next(stream, None)
+        finally:
+            stream.close()
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        self._start_request()
+
+        async def open_stream():
+            """Start a stream and wait for its first chunk."""
+            stream = self.model._astream(messages, stop=stop, **kwargs)
+            try:
+                return await anext(stream, None), stream
+            except BaseException:
+                await stream.aclose()
+                raise
+
+        async def close_stream(result) -> None:
+            await result[1].aclose()
+
+        # Hedge and retry on the time to the first chunk; once chunks are
+        # yielded the stream is committed
+        first, stream = await self._with_retries(
+            lambda: self._hedged(open_stream, "first_chunk", discard=close_stream)
+        )
+        try:
+            chunk = first
+            while chunk is not None:
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+                chunk = await anext(stream, None)
+        finally:
+            await stream.aclose()
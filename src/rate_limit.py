@@ -0,0 +1,279 @@
+"""Cross-worker rate limiting of upstream model API calls.
+
+Every worker process sends chat and embedding requests to the same provider
+account, so requests-per-minute (RPM) and tokens-per-minute (TPM) quotas are
+enforced with token buckets shared through Postgres. A single upsert per
+request refills each bucket for the elapsed time and debits the request's
+cost; a negative level is a reservation, and the request waits until it is
+paid off (level / refill rate). Requests are thereby spaced to the quota
+instead of bursting into 429 responses and retry storms.
+
+Token costs are estimated before the call (prompt plus the requested
+completion budget, as providers count it). A request whose reservation is due
+later than ``max_wait_seconds`` is refunded and rejected with
+``RateLimitExceeded`` instead of being sent over quota; raised from the HTTP
+client hooks, it reaches callers as a connection error, which the model
+clients retry with backoff. If the database is unavailable the limiter fails
+open.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import List, Optional, Tuple
+
+from pydantic_settings import BaseSettings
+from sqlalchemy import Column, DateTime, Float, String, func, text
+
+from .core.tokenizer import estimate_tokens
+from .database import Base, db_manager
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Advisory lock key serializing bucket table creation across workers
+_TABLE_LOCK_KEY = 0x52415445  # "RATE"
+
+
+class RateLimitSettings(BaseSettings):
+    """Upstream quotas (UPSTREAM_* environment variables); None disables a limit."""
+
+    chat_rpm: Optional[float] = None
+    chat_tpm: Optional[float] = None
+    embedding_rpm: Optional[float] = None
+    embedding_tpm: Optional[float] = None
+    # Bucket capacity in seconds of quota (how much may be sent in a burst)
+    burst_seconds: float = 1.0
+    # Longest a request waits for its reservation; later ones are rejected
+    max_wait_seconds: float = 60.0
+
+    class Config:
+        env_file = ".env"
+        env_prefix = "UPSTREAM_"
+        case_sensitive = False
+        extra = "ignore"
+
+
+class RateLimitExceeded(Exception):
+    """A request would wait longer than ``max_wait_seconds`` for its quota."""
+
+    def __init__(self, kind: str, wait: float):
+        """
+        Initialize the error.
+
+        Args:
+            kind: "chat" or "embedding"
+            wait: Seconds until the reservation would have been due
+        """
+        super().__init__(f"Upstream {kind} quota exhausted for the next {wait:.1f}s")
+        self.kind = kind
+        self.wait = wait
+
+
+class RateBucket(Base):
+    """Shared token bucket of an upstream quota."""
+
+    __tablename__ = "upstream_rate_buckets"
+
+    name = Column(String, primary_key=True)
+    level = Column(Float, nullable=False)
+    capacity = Column(Float, nullable=False)
+    rate = Column(Float, nullable=False)  # refill per second
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+def estimate_request_tokens(kind: str, body: dict) -> int:
+    """
+    Estimate the tokens an upstream request counts against the TPM quota.
+
+    Args:
+        kind: "chat" or "embedding"
+        body: JSON request body
+
+    Returns:
+        int: Estimated tokens
+    """
+    if kind == "embedding":
+        inputs = body.get("input", [])
+        # A single input may be a string or a list of token ids
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        return sum(len(item) if isinstance(item, list) else estimate_tokens(item) for item in inputs)
+
+    tokens = 0
+    for message in body.get("messages", []):
+        content = message.get("content") or ""
+        if isinstance(content, list):
+            content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+        tokens += estimate_tokens(content)
+        if message.get("tool_calls"):
+            tokens += estimate_tokens(json.dumps(message["tool_calls"]))
+    if body.get("tools"):
+        tokens += estimate_tokens(json.dumps(body["tools"]))
+    return tokens + (body.get("max_completion_tokens") or body.get("max_tokens") or 0)
+
+
+class UpstreamRateLimiter:
+    """Postgres-backed RPM/TPM token buckets shared by all workers."""
+
+    def __init__(self, settings: RateLimitSettings):
+        """
+        Initialize the limiter.
+
+        Args:
+            settings: Upstream quotas
+        """
+        self.settings = settings
+        self._table_ready = False
+
+    def _buckets(self, kind: str, tokens: int) -> List[Tuple[str, float, float]]:
+        """Get the (name, per-minute rate, cost) of each limited bucket of a request."""
+        limits = {
+            "chat": (self.settings.chat_rpm, self.settings.chat_tpm),
+            "embedding": (self.settings.embedding_rpm, self.settings.embedding_tpm),
+        }
+        rpm, tpm = limits.get(kind, (None, None))
+        buckets = [(f"{kind}.requests", rpm, 1), (f"{kind}.tokens", tpm, tokens)]
+        return [bucket for bucket in buckets if bucket[1]]
+
+    def _statement(self, buckets: List[Tuple[str, float, float]]) -> Tuple[text, dict]:
+        """Build the upsert refilling and debiting the buckets."""
+        values, params = [], {}
+        for index, (name, per_minute, cost) in enumerate(buckets):
+            rate = per_minute / 60.0
+            params.update({
+                f"name{index}": name,
+                f"capacity{index}": max(rate * self.settings.burst_seconds, 1.0),
+                f"rate{index}": rate,
+                f"cost{index}": float(cost),
+            })
+            values.append(
+                f"(:name{index}, CAST(:capacity{index} AS float8) - CAST(:cost{index} AS float8), "
+                f"CAST(:capacity{index} AS float8), CAST(:rate{index} AS float8), clock_timestamp())"
+            )
+        statement = text(
+            "INSERT INTO upstream_rate_buckets AS b (name, level, capacity, rate, updated_at) "
+            f"VALUES {', '.join(values)} "
+            "ON CONFLICT (name) DO UPDATE SET "
+            "level = LEAST(EXCLUDED.capacity, b.level + EXCLUDED.rate * "
+            "CAST(EXTRACT(EPOCH FROM clock_timestamp() - b.updated_at) AS float8)) "
+            "- (EXCLUDED.capacity - EXCLUDED.level), "
+            "capacity = EXCLUDED.capacity, rate = EXCLUDED.rate, updated_at = clock_timestamp() "
+            "RETURNING level, rate"
+        )
+        return statement, params
+
+    def _refund_statement(self, buckets: List[Tuple[str, float, float]]) -> Tuple[text, dict]:
+        """Build the update crediting a rejected request's cost back to the buckets."""
+        values, params = [], {}
+        for index, (name, _, cost) in enumerate(buckets):
+            params.update({f"name{index}": name, f"cost{index}": float(cost)})
+            values.append(f"(:name{index}, CAST(:cost{index} AS float8))")
+        statement = text(
+            "UPDATE upstream_rate_buckets AS b SET level = LEAST(b.capacity, b.level + r.cost) "
+            f"FROM (VALUES {', '.join(values)}) AS r(name, cost) WHERE b.name = r.name"
+        )
+        return statement, params
+
+    def _wait(self, kind: str, rows) -> float:
+        """Get the wait for a reservation from the bucket levels."""
+        return max((-row.level / row.rate for row in rows if row.level < 0), default=0.0)
+
+    def _admit(self, kind: str, wait: float) -> float:
+        """Record the wait of a reservation, rejecting it if it exceeds the cap."""
+        if wait > self.settings.max_wait_seconds:
+            metrics.incr(f"rate_limit.{kind}.rejected")
+            raise RateLimitExceeded(kind, wait)
+        if wait > 0:
+            metrics.observe(f"rate_limit.{kind}.wait_seconds", wait)
+        return wait
+
+    def _create_table(self, conn) -> None:
+        """Create the bucket table once (serialized across workers)."""
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _TABLE_LOCK_KEY})
+        RateBucket.__table__.create(conn, checkfirst=True)
+
+    async def acquire(self, kind: str, tokens: int) -> float:
+        """
+        Reserve quota for a request, waiting until the reservation is due.
+
+        Args:
+            kind: "chat" or "embedding"
+            tokens: Estimated tokens of the request
+
+        Returns:
+            float: Seconds waited
+
+        Raises:
+            RateLimitExceeded: If the reservation is due after ``max_wait_seconds``
+                (the reservation is refunded)
+        """
+        buckets = self._buckets(kind, tokens)
+        if not buckets:
+            return 0.0
+
+        statement, params = self._statement(buckets)
+        try:
+            async with db_manager.get_async_session() as session:
+                if not self._table_ready:
+                    conn = await session.connection()
+                    await conn.run_sync(self._create_table)
+                    await session.commit()
+                    self._table_ready = True
+                wait = self._wait(kind, (await session.execute(statement, params)).all())
+                if wait > self.settings.max_wait_seconds:
+                    # Give the quota back to requests that will be sent
+                    await session.execute(*self._refund_statement(buckets))
+        except Exception as e:
+            logger.warning(f"Upstream rate limiter unavailable, not limiting: {e}")
+            metrics.incr("rate_limit.errors")
+            return 0.0
+
+        if self._admit(kind, wait) > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def acquire_sync(self, kind: str, tokens: int) -> float:
+        """
+        Reserve quota for a request from synchronous code.
+
+        Args:
+            kind: "chat" or "embedding"
+            tokens: Estimated tokens of the request
+
+        Returns:
+            float: Seconds waited
+
+        Raises:
+            RateLimitExceeded: If the reservation is due after ``max_wait_seconds``
+                (the reservation is refunded)
+        """
+        buckets = self._buckets(kind, tokens)
+        if not buckets:
+            return 0.0
+
+        statement, params = self._statement(buckets)
+        try:
+            with db_manager.get_session() as session:
+                if not self._table_ready:
+                    self._create_table(session.connection())
+                    session.commit()
+                    self._table_ready = True
+                wait = self._wait(kind, session.execute(statement, params).all())
+                if wait > self.settings.max_wait_seconds:
+                    # Give the quota back to requests that will be sent
+                    session.execute(*self._refund_statement(buckets))
+        except Exception as e:
+            logger.warning(f"Upstream rate limiter unavailable, not limiting: {e}")
+            metrics.incr("rate_limit.errors")
+            return 0.0
+
+        if self._admit(kind, wait) > 0:
+            time.sleep(wait)
+        return wait
+
+
+# Global settings and limiter instances
+rate_limit_settings = RateLimitSettings()
+rate_limiter = UpstreamRateLimiter(rate_limit_settings)
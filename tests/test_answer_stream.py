@@ -0,0 +1,115 @@
+"""Tests for streaming only the final answer of the Agentic CoT RAG agent."""
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel, agenerate_from_stream
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langgraph.graph import END, StateGraph
+from langgraph.prebuilt import create_react_agent
+from langgraph.types import Command
+
+import src.models_gen.Agentic_CoT_RAG as agentic
+from src.models import Message
+from src.models_gen.Agentic_CoT_RAG import tool
+from src.models_gen.Agentic_CoT_RAG.state import AgenticCoTRAGState
+
+
+class AgentModel(BaseChatModel):
+    """Agent model streaming a preamble and a search call, then the answer in chunks."""
+
+    turns: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "agent"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        raise NotImplementedError
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.turns += 1
+        if self.turns == 1:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="Let me search. "))
+            tool_call = {"name": "keywords_search", "args": '{"keywords": "revenue"}', "id": "call0", "index": 0}
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[tool_call]))
+            return
+        for token in ("Revenue ", "grew ", "by ", "ten ", "percent."):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", response_metadata={"finish_reason": "stop"}))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        return await agenerate_from_stream(self._astream(messages, stop=stop, **kwargs))
+
+
+class HelperModel(BaseChatModel):
+    """Model standing in for the summarizers called by the tool and the compaction hook."""
+
+    @property
+    def _llm_type(self) -> str:
+        return "helper"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        raise NotImplementedError
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=AIMessage("HELPER OUTPUT"))])
+
+
+@pytest.fixture
+def agent_graph(monkeypatch):
+    """Run generate on an agent whose tool and pre-model hook call a helper model."""
+    helper = HelperModel()
+
+    async def run_search(keywords, title, department, tool_call_id):
+        summary = (await helper.ainvoke(f"summarize {keywords}")).content
+        return Command(update={"messages": [ToolMessage(summary, tool_call_id=tool_call_id)]})
+
+    async def hook(state):
+        await helper.ainvoke("compact the history")
+        return {"llm_input_messages": state["messages"]}
+
+    monkeypatch.setattr(tool, "_run_search", run_search)
+    workflow = StateGraph(AgenticCoTRAGState)
+    workflow.add_node("react_agent", create_react_agent(
+        model=AgentModel(), tools=[tool.keywords_search], state_schema=AgenticCoTRAGState, pre_model_hook=hook,
+    ))
+    workflow.set_entry_point("react_agent")
+    workflow.add_edge("react_agent", END)
+    monkeypatch.setattr(agentic, "graph", workflow.compile())
+
+
+async def stream_answer() -> list:
+    """Collect the chunks generate streams for one question."""
+    generator = agentic.AgenticCoTRAGModelGenerator()
+    return [chunk async for chunk in generator.generate([Message(role="user", content="How did revenue do?")])]
+
+
+class TestAnswerStream:
+    """Test suite for the answer filter of AgenticCoTRAGModelGenerator.generate."""
+
+    @pytest.mark.asyncio
+    async def test_only_the_final_answer_is_streamed(self, agent_graph):
+        """Tool-call turn preambles, tool summarizer output and hook output are not streamed."""
+        chunks = await stream_answer()
+
+        assert "".join(chunks) == "Revenue grew by ten percent."
+
+    @pytest.mark.asyncio
+    async def test_answer_streams_once_past_the_holdback(self, agent_graph, monkeypatch):
+        """After the held back start, the answer streams token by token."""
+        # Longer than the tool-calling turn's preamble, shorter than the answer
+        monkeypatch.setitem(agentic.answer_stream_config, "holdback_characters", 16)
+
+        chunks = await stream_answer()
+
+        assert chunks == ["Revenue grew by ten ", "percent."]
+
+    @pytest.mark.asyncio
+    async def test_without_holdback_whole_turns_are_held(self, agent_graph, monkeypatch):
+        """With holdback disabled the answer is sent once its turn ends."""
+        monkeypatch.setitem(agentic.answer_stream_config, "holdback_characters", None)
+
+        assert await stream_answer() == ["Revenue grew by ten percent."]
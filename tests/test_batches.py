@@ -0,0 +1,109 @@
+"""Tests for batch input parsing and bounded batch execution."""
+
+import asyncio
+import json
+
+import pytest
+
+from src.core.batches import parse_batch_lines, run_file, run_requests
+
+
+def _lines(*items) -> bytes:
+    return "\n".join(json.dumps(item) for item in items).encode("utf-8")
+
+
+class TestParseBatchLines:
+    """Validation of batch input files."""
+
+    def test_parses_requests_and_bare_bodies(self):
+        """Full request lines and bare bodies are parsed; blank lines are skipped."""
+        body = {"model": "agentic-cot-rag", "messages": [{"role": "user", "content": "Hi"}]}
+        content = _lines({"custom_id": "a", "method": "POST", "url": "/v1/chat/completions", "body": body}, body)
+        requests, errors = parse_batch_lines(content + b"\n\n")
+        assert errors == []
+        assert requests == [("a", body), ("2", body)]
+
+    def test_reports_invalid_lines(self):
+        """Invalid JSON, unsupported URLs and duplicate custom ids are reported by line."""
+        body = {"messages": []}
+        content = b"\n".join([
+            b"not json",
+            _lines({"custom_id": "a", "url": "/v1/embeddings", "body": body}),
+            _lines({"custom_id": "b", "body": body}),
+            _lines({"custom_id": "b", "body": body}),
+        ])
+        requests, errors = parse_batch_lines(content)
+        assert [error["code"] for error in errors] == ["invalid_json", "invalid_url", "duplicate_custom_id"]
+        assert [error["line"] for error in errors] == ["1", "2", "4"]
+        assert requests == [("b", body)]
+
+
+class TestRunRequests:
+    """Bounded concurrency of batch execution."""
+
+    @pytest.mark.asyncio
+    async def test_runs_every_request_within_the_concurrency(self):
+        """Every request runs once, with at most the concurrency in flight."""
+        in_flight, peak, results = 0, 0, {}
+
+        async def handler(custom_id, body):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return {"custom_id": custom_id, "error": None}
+
+        async def on_result(line, output):
+            results[line] = output["custom_id"]
+
+        requests = [(line, str(line), {}) for line in range(20)]
+        await run_requests(requests, 3, on_result, handler=handler)
+        assert peak == 3
+        assert results == {line: str(line) for line in range(20)}
+
+    @pytest.mark.asyncio
+    async def test_failure_cancels_other_requests(self):
+        """An unexpected error cancels the requests still in flight."""
+        cancelled = []
+
+        async def handler(custom_id, body):
+            if custom_id == "0":
+                raise RuntimeError("boom")
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(custom_id)
+                raise
+            return {"custom_id": custom_id, "error": None}
+
+        async def on_result(line, output):
+            pass
+
+        requests = [(line, str(line), {}) for line in range(5)]
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(run_requests(requests, 3, on_result, handler=handler), timeout=1)
+        assert sorted(cancelled) == ["1", "2"]
+
+    @pytest.mark.asyncio
+    async def test_run_file_resumes_after_finished_requests(self, tmp_path, monkeypatch):
+        """Requests already in the output file are skipped; failures go to the errors file."""
+        import src.core.batches as batches
+
+        calls = []
+
+        async def fake_request(custom_id, body):
+            calls.append(custom_id)
+            error = {"code": "invalid_request", "message": "bad"} if custom_id == "c" else None
+            return {"id": "batch_req_x", "custom_id": custom_id, "response": None, "error": error}
+
+        monkeypatch.setattr(batches, "run_request", fake_request)
+        input_path = tmp_path / "requests.jsonl"
+        input_path.write_bytes(_lines(*({"custom_id": custom_id, "body": {}} for custom_id in "abc")))
+        output_path, errors_path = tmp_path / "out.jsonl", tmp_path / "out.errors.jsonl"
+        output_path.write_text(json.dumps({"custom_id": "a"}) + "\n")
+
+        stats = await run_file(input_path, output_path, errors_path, 2)
+        assert sorted(calls) == ["b", "c"]
+        assert stats == {"total": 3, "skipped": 1, "completed": 1, "failed": 1}
+        assert [json.loads(line)["custom_id"] for line in errors_path.read_text().splitlines()] == ["c"]
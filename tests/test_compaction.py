@@ -0,0 +1,159 @@
+"""Tests for compaction of tool results and conversation history."""
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from src.models_gen.Agentic_CoT_RAG import compaction
+from src.models_gen.Agentic_CoT_RAG.compaction import add_compacted_messages, compact_history
+
+
+def _search_round(index: int) -> list:
+    """A model turn calling the search tool, and the tool's result."""
+    result = (
+        "<think>\n```markdown\n"
+        f"# Document: Report {index}\n" + "Finding. " * 200 + "\n## Author: A\n"
+        "```\n</think>"
+    )
+    return [
+        AIMessage("", tool_calls=[{"name": "keywords_search", "args": {"keywords": "x"}, "id": f"call{index}"}]),
+        ToolMessage(result, tool_call_id=f"call{index}"),
+    ]
+
+
+class TestToolResultCompaction:
+    """State reducer compacting tool results the model has read."""
+
+    def test_compacts_read_results_beyond_the_most_recent(self, monkeypatch):
+        monkeypatch.setitem(compaction.tool_output_compaction_config, "keep_recent", 1)
+        messages = add_compacted_messages([], [HumanMessage("question")])
+        for index in range(3):
+            for message in _search_round(index):
+                messages = add_compacted_messages(messages, [message])
+
+        tool_messages = [message for message in messages if isinstance(message, ToolMessage)]
+        assert [message.additional_kwargs.get("compacted", False) for message in tool_messages] == [True, True, False]
+        compacted = tool_messages[0]
+        assert compacted.tool_call_id == "call0"
+        assert compacted.id == messages[2].id
+        assert "Documents: Report 0." in compacted.content
+        assert len(compacted.content) < 700
+        # The latest result stays intact for the final answer
+        assert tool_messages[-1].content == _search_round(2)[1].content
+
+    def test_keeps_unread_results(self, monkeypatch):
+        monkeypatch.setitem(compaction.tool_output_compaction_config, "keep_recent", 0)
+        messages = [HumanMessage("question"), *_search_round(0)]
+        messages = add_compacted_messages([], messages)
+        assert not messages[-1].additional_kwargs.get("compacted")
+
+
+class TestHistoryCompaction:
+    """Rolling summary of older turns."""
+
+    @pytest.mark.asyncio
+    async def test_summarizes_only_newly_compacted_turns(self, monkeypatch):
+        monkeypatch.setitem(compaction.history_compaction_config, "max_tokens", 300)
+        monkeypatch.setitem(compaction.history_compaction_config, "keep_tokens", 100)
+        monkeypatch.setattr(compaction, "_summaries", compaction.OrderedDict())
+        calls = []
+
+        async def summarize(previous, messages):
+            calls.append((previous, len(messages)))
+            return f"summary {len(calls)}"
+
+        messages, summary = [SystemMessage("instructions")], None
+        for turn in range(5):
+            messages.append(HumanMessage(f"question {turn} " + "word " * 40))
+            sent, update = await compact_history(messages, summary, summarize)
+            # Every model step of a turn reuses the summary
+            again, _ = await compact_history(messages, update or summary, summarize)
+            assert again == sent
+            summary = update or summary
+            messages.append(AIMessage(f"answer {turn} " + "word " * 40))
+
+        assert calls[0][0] is None
+        assert all(previous == f"summary {index}" for index, (previous, _) in enumerate(calls[1:], start=1))
+        assert all(count == 2 for _, count in calls[1:])
+        assert isinstance(sent[0], SystemMessage) and sent[1].content.startswith("Summary of the earlier conversation")
+        assert sent[-1].content.startswith("question 4")
+
+    @pytest.fixture
+    def history(self, monkeypatch):
+        """Four answered turns and a new question, with an empty summary cache."""
+        monkeypatch.setattr(compaction, "_summaries", compaction.OrderedDict())
+        messages = [SystemMessage("instructions")]
+        for turn in range(4):
+            messages += [HumanMessage(f"question {turn} " + "word " * 40), AIMessage(f"answer {turn} " + "word " * 40)]
+        return messages + [HumanMessage("question 4 " + "word " * 40)]
+
+    @staticmethod
+    def _recording_summarizer(calls: list):
+        async def summarize(previous, messages):
+            calls.append((previous, [message.content for message in messages]))
+            return f"summary {len(calls)}"
+        return summarize
+
+    @pytest.mark.asyncio
+    async def test_history_within_budget_is_untouched(self, monkeypatch, history):
+        total = sum(compaction.estimate_tokens(compaction.message_text(message)) for message in history)
+        monkeypatch.setitem(compaction.history_compaction_config, "max_tokens", total)
+        calls = []
+
+        sent, update = await compact_history(history, None, self._recording_summarizer(calls))
+
+        assert sent == history and update is None and calls == []
+
+    @pytest.mark.asyncio
+    async def test_history_over_budget_is_summarized(self, monkeypatch, history):
+        total = sum(compaction.estimate_tokens(compaction.message_text(message)) for message in history)
+        monkeypatch.setitem(compaction.history_compaction_config, "max_tokens", total - 1)
+        monkeypatch.setitem(compaction.history_compaction_config, "keep_tokens", 100)
+        calls = []
+
+        sent, update = await compact_history(history, None, self._recording_summarizer(calls))
+
+        assert len(calls) == 1 and calls[0][0] is None
+        assert sent[0].content == "instructions" and sent[1].content.endswith("summary 1")
+        assert sent[2:] == history[-len(sent) + 2:]
+        assert update["count"] == len(history) - len(sent) + 2 and update["text"] == "summary 1"
+
+    @pytest.mark.asyncio
+    async def test_state_summary_is_reused_by_prefix_digest(self, monkeypatch, history):
+        monkeypatch.setitem(compaction.history_compaction_config, "max_tokens", 300)
+        monkeypatch.setitem(compaction.history_compaction_config, "keep_tokens", 100)
+        calls = []
+        _, summary = await compact_history(history, None, self._recording_summarizer(calls))
+        # Another worker has an empty cache, but the checkpointed state carries the summary
+        monkeypatch.setattr(compaction, "_summaries", compaction.OrderedDict())
+
+        sent, update = await compact_history(history, summary, self._recording_summarizer(calls))
+
+        assert len(calls) == 1
+        assert update is None and sent[1].content.endswith("summary 1")
+
+    @pytest.mark.asyncio
+    async def test_cached_summary_is_reused_without_state(self, monkeypatch, history):
+        monkeypatch.setitem(compaction.history_compaction_config, "max_tokens", 300)
+        monkeypatch.setitem(compaction.history_compaction_config, "keep_tokens", 100)
+        calls = []
+        await compact_history(history, None, self._recording_summarizer(calls))
+
+        # A stateless client resends the same history
+        sent, update = await compact_history(list(history), None, self._recording_summarizer(calls))
+
+        assert len(calls) == 1
+        assert update["text"] == "summary 1" and sent[1].content.endswith("summary 1")
+
+    @pytest.mark.asyncio
+    async def test_edited_history_is_summarized_again(self, monkeypatch, history):
+        monkeypatch.setitem(compaction.history_compaction_config, "max_tokens", 300)
+        monkeypatch.setitem(compaction.history_compaction_config, "keep_tokens", 100)
+        calls = []
+        _, summary = await compact_history(history, None, self._recording_summarizer(calls))
+
+        edited = [history[0], HumanMessage("a different first question " + "word " * 40), *history[2:]]
+        await compact_history(edited, summary, self._recording_summarizer(calls))
+
+        # No prefix digest matches, so the compacted turns are summarized from scratch
+        assert len(calls) == 2 and calls[1][0] is None
+        assert calls[1][1][0].startswith("a different first question")
@@ -0,0 +1,77 @@
+"""Tests for the database connection budget and replica settings."""
+
+import logging
+
+from src.database.config import DatabaseSettings
+
+
+class TestPoolLimits:
+    """Test suite for DatabaseSettings.get_pool_limits."""
+
+    def test_without_budget(self):
+        """The configured pool sizes are used when no budget is set."""
+        settings = DatabaseSettings(pool_size=5, max_overflow=10, connection_budget=None)
+
+        assert settings.get_pool_limits() == {"pool_size": 5, "max_overflow": 10}
+
+    def test_budget_split_across_workers_and_engines(self):
+        """All engines of all workers together stay within the budget."""
+        settings = DatabaseSettings(
+            pool_size=5, max_overflow=10, connection_budget=48, web_concurrency=4, checkpoint_pool_size=2
+        )
+
+        limits = settings.get_pool_limits()
+
+        assert limits == {"pool_size": 5, "max_overflow": 0}
+        assert 4 * (2 * (limits["pool_size"] + limits["max_overflow"]) + 2) <= 48
+
+    def test_budget_caps_pool_size(self):
+        """A small share caps pool_size and leaves no overflow."""
+        settings = DatabaseSettings(
+            pool_size=5, max_overflow=10, connection_budget=24, web_concurrency=4, checkpoint_pool_size=0
+        )
+
+        assert settings.get_pool_limits() == {"pool_size": 3, "max_overflow": 0}
+
+    def test_budget_leaves_overflow(self):
+        """A large share beyond pool_size becomes overflow."""
+        settings = DatabaseSettings(
+            pool_size=5, max_overflow=10, connection_budget=104, web_concurrency=2, checkpoint_pool_size=2
+        )
+
+        assert settings.get_pool_limits() == {"pool_size": 5, "max_overflow": 20}
+
+    def test_budget_smaller_than_engines(self, caplog):
+        """Every engine keeps at least one connection, and the overrun is logged."""
+        settings = DatabaseSettings(connection_budget=4, web_concurrency=8, checkpoint_pool_size=0)
+
+        with caplog.at_level(logging.WARNING):
+            assert settings.get_pool_limits() == {"pool_size": 1, "max_overflow": 0}
+
+        assert "too small" in caplog.text
+
+    def test_budget_within_limits_does_not_warn(self, caplog):
+        """No warning is logged when the budget covers every engine."""
+        settings = DatabaseSettings(connection_budget=48, web_concurrency=4, checkpoint_pool_size=2)
+
+        with caplog.at_level(logging.WARNING):
+            settings.get_pool_limits()
+
+        assert caplog.text == ""
+
+
+class TestReplicaUrls:
+    """Test suite for DatabaseSettings.get_replica_urls."""
+
+    def test_no_replicas(self):
+        """No replica URLs are configured by default."""
+        assert DatabaseSettings(replica_urls=None).get_replica_urls() == []
+
+    def test_urls_converted_to_asyncpg(self):
+        """Comma-separated replica URLs are trimmed and use the asyncpg driver."""
+        settings = DatabaseSettings(replica_urls="postgresql://u:p@replica1/db, postgres://u:p@replica2/db,")
+
+        assert settings.get_replica_urls() == [
+            "postgresql+asyncpg://u:p@replica1/db",
+            "postgresql+asyncpg://u:p@replica2/db",
+        ]
@@ -0,0 +1,61 @@
+"""Tests for the instrumented database connection pools."""
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from src.database.pool import InstrumentedQueuePool, instrument_engine, pool_metrics
+from src.metrics import metrics
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """Single-connection SQLite engine with pool instrumentation."""
+    metrics.reset()
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    instrument_engine(engine, "test")
+    yield engine
+    engine.dispose()
+    metrics.reset()
+
+
+class TestInstrumentedPool:
+    """Test suite for pool instrumentation."""
+
+    def test_checkout_wait_and_hold(self, engine):
+        """Every checkout records its wait and hold time."""
+        for _ in range(3):
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+
+        recorded = pool_metrics("test")
+        assert recorded["connects"] == 1
+        assert recorded["checkout_wait_seconds"]["count"] == 3
+        assert recorded["checkout_hold_seconds"]["count"] == 3
+
+    def test_pool_timeout(self, engine):
+        """Checkouts timing out on an exhausted pool are counted."""
+        with engine.connect():
+            with pytest.raises(exc.TimeoutError):
+                engine.connect()
+
+        assert pool_metrics("test")["pool_timeouts"] == 1
+
+    def test_churn_across_dispose(self, engine):
+        """Closed connections are counted, and the recreated pool keeps its metrics prefix."""
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        engine.dispose()
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+        recorded = pool_metrics("test")
+        assert recorded["connects"] == 2
+        assert recorded["closes"] == 1
+        assert recorded["connection_lifetime_seconds"]["count"] == 1
+        assert recorded["checkout_wait_seconds"]["count"] == 2
@@ -0,0 +1,127 @@
+"""Tests for hedged requests and retries of upstream chat model calls."""
+
+import asyncio
+from typing import List
+
+import httpx
+import openai
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from src.models_gen.hedging import HedgedChatModel
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model answering each call after a scripted delay, optionally failing the first calls."""
+
+    delays: List[float]
+    failures: int = 0
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _fail_scripted(self) -> int:
+        """Count a call, raising a transient error for the first ``failures`` calls."""
+        call = self.calls
+        self.calls += 1
+        if call < self.failures:
+            raise openai.APIConnectionError(request=httpx.Request("POST", "http://upstream"))
+        return call
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        call = self._fail_scripted()
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(f"call {call}"))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        call = self._fail_scripted()
+        for token in ("a", "b"):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=f"{token}{call}"))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        call = self._fail_scripted()
+        await asyncio.sleep(self.delays[call % len(self.delays)])
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(f"call {call}"))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        call = self.calls
+        self.calls += 1
+        await asyncio.sleep(self.delays[call % len(self.delays)])
+        for token in ("a", "b"):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=f"{token}{call}"))
+
+
+class TestHedgedChatModel:
+    """Test suite for HedgedChatModel."""
+
+    @pytest.mark.asyncio
+    async def test_hedge_wins_over_slow_call(self):
+        """A call slower than the hedge delay is duplicated and the faster duplicate answers."""
+        model = HedgedChatModel(model=ScriptedChatModel(delays=[5.0, 0.01]), hedge_initial_delay=0.05)
+
+        result = await asyncio.wait_for(model.ainvoke("hello"), timeout=1.0)
+
+        assert result.content == "call 1"
+
+    @pytest.mark.asyncio
+    async def test_no_hedge_for_fast_call(self):
+        """A call answering before the hedge delay is not duplicated."""
+        inner = ScriptedChatModel(delays=[0.01])
+        model = HedgedChatModel(model=inner, hedge_initial_delay=0.5)
+
+        await model.ainvoke("hello")
+
+        assert inner.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_retries_transient_errors(self):
+        """Transient upstream errors are retried."""
+        model = HedgedChatModel(model=ScriptedChatModel(delays=[0.01], failures=2), backoff_base=0.01)
+
+        result = await model.ainvoke("hello")
+
+        assert result.content == "call 2"
+
+    @pytest.mark.asyncio
+    async def test_budget_limits_extra_calls(self):
+        """Once the extra call budget is spent, slow calls are no longer hedged."""
+        inner = ScriptedChatModel(delays=[0.1])
+        model = HedgedChatModel(
+            model=inner, hedge_initial_delay=0.01, extra_call_burst=1.0, extra_call_ratio=0.0
+        )
+
+        for _ in range(3):
+            await model.ainvoke("hello")
+
+        assert inner.calls == 4
+
+    @pytest.mark.asyncio
+    async def test_stream_hedged_on_first_chunk(self):
+        """A stream slow to produce its first chunk is hedged, and only the winner's chunks are yielded."""
+        model = HedgedChatModel(model=ScriptedChatModel(delays=[5.0, 0.01]), hedge_initial_delay=0.05)
+
+        chunks = [chunk.content async for chunk in model.astream("hello")]
+
+        assert "".join(chunks) == "a1b1"
+
+    def test_sync_call_retries_transient_errors(self):
+        """Sync calls keep their retries although the wrapped model has none."""
+        model = HedgedChatModel(model=ScriptedChatModel(delays=[0.0], failures=2), backoff_base=0.01)
+
+        assert model.invoke("hello").content == "call 2"
+
+    def test_sync_stream_retries_before_first_chunk(self):
+        """A sync stream failing before its first chunk is retried."""
+        model = HedgedChatModel(model=ScriptedChatModel(delays=[0.0], failures=1), backoff_base=0.01)
+
+        assert "".join(chunk.content for chunk in model.stream("hello")) == "a1b1"
+
+    def test_sync_retries_stop_at_max_retries(self):
+        """Sync calls give up after max_retries."""
+        model = HedgedChatModel(model=ScriptedChatModel(delays=[0.0], failures=5), backoff_base=0.01, max_retries=1)
+
+        with pytest.raises(openai.APIConnectionError):
+            model.invoke("hello")
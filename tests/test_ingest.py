@@ -0,0 +1,148 @@
+"""Tests for incremental ingestion of the Agentic CoT RAG vector collection."""
+
+import json
+
+from src.models_gen.Agentic_CoT_RAG.ingest import (
+    INGEST_KEY, Checkpoint, checkpoint_key, chunk_document, iter_sources, plan_changes,
+)
+
+
+def make_document(content: str) -> dict:
+    """Build a source document as produced by iter_sources."""
+    return {
+        "source": "docs/report.md",
+        "page_content": content,
+        "metadata": {"title": "report", "source": "docs/report.md"},
+    }
+
+
+def stored(chunks) -> dict:
+    """Stored chunk id to metadata, as returned by fetch_existing."""
+    return {chunk_id: dict(metadata) for chunk_id, _, metadata in chunks}
+
+
+class TestChunkDocument:
+    """Test suite for chunk_document."""
+
+    def test_chunks_are_deterministic_and_hashed(self):
+        """Re-chunking a source yields the same ids and content hashes."""
+        document = make_document("# Intro\n" + "word " * 600)
+
+        first = chunk_document(document)
+        second = chunk_document(document)
+
+        assert [chunk[0] for chunk in first] == [chunk[0] for chunk in second]
+        assert all(len(metadata["content_hash"]) == 64 for _, _, metadata in first)
+        assert first[0][2]["section_title"] == "Intro"
+
+
+class TestPlanChanges:
+    """Test suite for plan_changes."""
+
+    def test_unchanged_source(self):
+        """Nothing is embedded or deleted when a source did not change."""
+        chunks = chunk_document(make_document("word " * 600))
+
+        plan = plan_changes(chunks, stored(chunks))
+
+        assert plan["unchanged"] == len(chunks)
+        assert plan["embed"] == [] and plan["reuse"] == [] and plan["delete"] == []
+
+    def test_new_source(self):
+        """Every chunk of a new source is embedded."""
+        chunks = chunk_document(make_document("word " * 600))
+
+        plan = plan_changes(chunks, {})
+
+        assert plan["embed"] == chunks
+
+    def test_metadata_change_reuses_embedding(self):
+        """A metadata-only change keeps the stored embedding."""
+        chunks = chunk_document(make_document("word " * 600))
+        existing = stored(chunks)
+        for metadata in existing.values():
+            metadata["author"] = "someone else"
+
+        plan = plan_changes(chunks, existing)
+
+        assert plan["embed"] == []
+        assert [stored_id for _, stored_id in plan["reuse"]] == [chunk[0] for chunk in chunks]
+
+    def test_moved_text_reuses_embedding(self):
+        """Text that moved to another chunk position is not re-embedded."""
+        old = chunk_document(make_document("first " * 100 + "\n\n" + "second " * 100))
+        new = chunk_document(make_document("second " * 100))
+
+        plan = plan_changes(new, stored(old))
+
+        assert plan["embed"] == []
+        assert len(plan["reuse"]) == len(new)
+
+    def test_vanished_chunks_are_deleted(self):
+        """Chunks no longer produced by a shrunken source are deleted."""
+        old = chunk_document(make_document("word " * 600))
+        new = chunk_document(make_document("word " * 100))
+
+        plan = plan_changes(new, stored(old))
+
+        assert set(plan["delete"]) == {chunk[0] for chunk in old} - {chunk[0] for chunk in new}
+
+
+class TestCheckpoint:
+    """Test suite for resumable ingestion checkpoints."""
+
+    def test_modified_source_is_not_skipped(self, tmp_path):
+        """A source edited after it was checkpointed is ingested again on the next run."""
+        unchanged, edited = tmp_path / "a.md", tmp_path / "b.md"
+        unchanged.write_text("first version")
+        edited.write_text("first version")
+        checkpoint = Checkpoint(str(tmp_path / "ingest.ckpt"))
+        checkpoint.save(checkpoint_key(document) for document in iter_sources([str(tmp_path)]))
+
+        edited.write_text("second version")
+        resumed = Checkpoint(str(tmp_path / "ingest.ckpt"))
+        documents = list(iter_sources([str(tmp_path)], skip=resumed.done))
+
+        assert [document["source"] for document in documents] == [str(edited)]
+        assert resumed.sources == {str(unchanged), str(edited)}
+
+    def test_clear_removes_the_checkpoint(self, tmp_path):
+        """A completed run clears the checkpoint, so the next run sees every source."""
+        (tmp_path / "a.md").write_text("text")
+        path = tmp_path / "ingest.ckpt"
+        checkpoint = Checkpoint(str(path))
+        checkpoint.save(checkpoint_key(document) for document in iter_sources([str(tmp_path / "a.md")]))
+
+        checkpoint.clear()
+
+        assert not path.exists()
+        assert len(list(iter_sources([str(tmp_path / "a.md")], skip=Checkpoint(str(path)).done))) == 1
+
+
+class TestIngestKey:
+    """Test suite for the source keys of .jsonl records."""
+
+    def test_record_source_does_not_override_the_ingest_key(self, tmp_path):
+        """A record's own metadata.source is kept, but chunks are tracked by the ingest key."""
+        path = tmp_path / "a.jsonl"
+        path.write_text(json.dumps({"page_content": "text", "metadata": {"source": "crm/ticket-1"}}) + "\n")
+
+        document, = iter_sources([str(path)])
+        chunk, = chunk_document(document)
+
+        assert document["source"] == f"{path}:1"
+        assert chunk[2]["source"] == "crm/ticket-1"
+        assert chunk[2][INGEST_KEY] == document["source"]
+
+    def test_record_id_keys_survive_inserted_lines(self, tmp_path):
+        """Records with an id keep their key when lines are inserted above them."""
+        path = tmp_path / "a.jsonl"
+        record = json.dumps({"id": "t1", "page_content": "text", "metadata": {INGEST_KEY: "forged"}})
+        path.write_text(record + "\n")
+        before = [document["metadata"][INGEST_KEY] for document in iter_sources([str(path)])]
+
+        path.write_text(json.dumps({"page_content": "new"}) + "\n" + record + "\n")
+        after = [document["metadata"][INGEST_KEY] for document in iter_sources([str(path)])]
+
+        assert before == [f"{path}#t1"]
+        assert after == [f"{path}:1", f"{path}#t1"]
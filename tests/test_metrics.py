@@ -0,0 +1,42 @@
+"""Tests for the in-process metrics registry."""
+
+from src.metrics import MetricsRegistry
+
+
+class TestMetricsRegistry:
+    """Test suite for MetricsRegistry."""
+
+    def test_counters(self):
+        """Counters accumulate increments."""
+        registry = MetricsRegistry()
+        registry.incr("hits")
+        registry.incr("hits", 2)
+
+        assert registry.snapshot()["counters"]["hits"] == 3
+
+    def test_summaries(self):
+        """Summaries track count, sum, min, max and mean."""
+        registry = MetricsRegistry()
+        registry.observe("latency", 1.0)
+        registry.observe("latency", 3.0)
+
+        summary = registry.snapshot()["summaries"]["latency"]
+        assert summary["count"] == 2
+        assert summary["sum"] == 4.0
+        assert summary["min"] == 1.0
+        assert summary["max"] == 3.0
+        assert summary["mean"] == 2.0
+        assert registry.mean("latency") == 2.0
+
+    def test_mean_of_unknown_summary(self):
+        """Mean of an unobserved summary is zero."""
+        assert MetricsRegistry().mean("missing") == 0.0
+
+    def test_reset(self):
+        """Reset clears all metrics."""
+        registry = MetricsRegistry()
+        registry.incr("hits")
+        registry.observe("latency", 1.0)
+        registry.reset()
+
+        assert registry.snapshot() == {"counters": {}, "summaries": {}}
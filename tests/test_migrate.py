@@ -0,0 +1,75 @@
+"""Tests for the embedding dimension migration of the Agentic CoT RAG collection."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from src.models_gen.Agentic_CoT_RAG import migrate
+
+
+class FakeConnection:
+    """Connection answering the index and partition lookups, recording statements."""
+
+    def __init__(self, indexes, partitioned):
+        self.indexes = indexes
+        self.partitioned = partitioned
+        self.statements = []
+
+    def execution_options(self, **options):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append(sql)
+        if "pg_indexes" in sql:
+            return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: self.indexes))
+        return SimpleNamespace(scalar=lambda: self.partitioned)
+
+
+@pytest.fixture
+def connection(monkeypatch):
+    """A fake engine whose connections share one FakeConnection."""
+    conn = FakeConnection(
+        indexes=[
+            "ix_langchain_pg_embedding_embedding_hnsw",
+            "ix_langchain_pg_embedding_embedding_ivfflat_halfvec",
+            "ix_rag_part_sales_hnsw",
+        ],
+        partitioned=True,
+    )
+    engine = SimpleNamespace(connect=lambda: conn)
+    monkeypatch.setattr(migrate, "db_manager", SimpleNamespace(_initialized=True, _engine=engine))
+    return conn
+
+
+class TestEmbeddingIndexes:
+    """Test suite for dropping and rebuilding the indexes around a dimension change."""
+
+    def test_drops_every_index_including_partitions(self, connection):
+        """Indexes of other methods, storage formats and partitions are all dropped."""
+        dropped = migrate.drop_embedding_indexes()
+
+        assert dropped == connection.indexes
+        drops = [sql for sql in connection.statements if sql.startswith("DROP INDEX")]
+        assert drops == [f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"' for name in connection.indexes]
+
+    def test_rebuilds_partitions_when_the_collection_has_them(self, connection, monkeypatch):
+        """The main index and the department partitions are rebuilt."""
+        monkeypatch.setattr(migrate, "create_vector_index", lambda: {"status": "ok"})
+        monkeypatch.setattr(migrate, "create_partitions", lambda: [{"department": "sales"}])
+
+        assert migrate.rebuild_embedding_indexes() == {"index": {"status": "ok"}, "partitions": [{"department": "sales"}]}
+
+    def test_skips_partitions_when_there_are_none(self, connection, monkeypatch):
+        """Collections without partitions only get the main index."""
+        connection.partitioned = False
+        monkeypatch.setattr(migrate, "create_vector_index", lambda: {"status": "ok"})
+        monkeypatch.setattr(migrate, "create_partitions", lambda: pytest.fail("partitions rebuilt"))
+
+        assert migrate.rebuild_embedding_indexes()["partitions"] == []
@@ -0,0 +1,90 @@
+"""Tests for concurrent keywords_search calls of the Agentic CoT RAG agent."""
+
+import asyncio
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel, agenerate_from_stream
+from langchain_core.messages import AIMessageChunk, ToolMessage
+from langchain_core.outputs import ChatGenerationChunk
+from langgraph.prebuilt import create_react_agent
+from langgraph.types import Command
+
+from src.models_gen.Agentic_CoT_RAG import tool
+from src.models_gen.Agentic_CoT_RAG.state import AgenticCoTRAGState
+
+
+class ToolCallingModel(BaseChatModel):
+    """Chat model calling keywords_search ``calls`` times in its first turn, then answering."""
+
+    calls: int
+    turns: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "tool-calling"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        raise NotImplementedError
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.turns += 1
+        if self.turns == 1:
+            tool_calls = [
+                {"name": "keywords_search", "args": f'{{"keywords": "query {index}"}}', "id": f"call{index}", "index": index}
+                for index in range(self.calls)
+            ]
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=tool_calls))
+        else:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="answer"))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        return await agenerate_from_stream(self._astream(messages, stop=stop, **kwargs))
+
+
+@pytest.fixture
+def searches(monkeypatch):
+    """Stub the search backend, tracking how many searches run at once."""
+    state = {"running": 0, "peak": 0}
+
+    async def run_search(keywords, title, department, tool_call_id):
+        state["running"] += 1
+        state["peak"] = max(state["peak"], state["running"])
+        # Later calls finish first, so results complete out of call order
+        await asyncio.sleep(0.05 - 0.005 * int(keywords.split()[-1]))
+        state["running"] -= 1
+        return Command(update={"messages": [ToolMessage(f"results for {keywords}", tool_call_id=tool_call_id)]})
+
+    monkeypatch.setattr(tool, "_run_search", run_search)
+    return state
+
+
+async def run_turn(calls: int, cap: int) -> dict:
+    """Run one agent turn with ``calls`` parallel searches under a cap."""
+    agent = create_react_agent(
+        model=ToolCallingModel(calls=calls), tools=[tool.keywords_search], state_schema=AgenticCoTRAGState
+    )
+    tool.limit_parallel_searches(cap)
+    return await agent.ainvoke({"messages": [{"role": "user", "content": "question"}]})
+
+
+class TestParallelSearches:
+    """Test suite for the per-request cap on concurrent searches."""
+
+    @pytest.mark.asyncio
+    async def test_cap_bounds_concurrent_searches(self, searches):
+        """More calls than the cap never run more than the cap at once."""
+        await run_turn(calls=6, cap=2)
+
+        assert searches["peak"] == 2
+
+    @pytest.mark.asyncio
+    async def test_results_merge_in_call_order(self, searches):
+        """Tool results are merged in tool call order, whatever order they finish in."""
+        state = await run_turn(calls=6, cap=3)
+
+        results = [message for message in state["messages"] if isinstance(message, ToolMessage)]
+        assert [message.tool_call_id for message in results] == [f"call{index}" for index in range(6)]
+        assert state["messages"][-1].content == "answer"
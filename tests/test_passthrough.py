@@ -0,0 +1,125 @@
+"""Tests for passing small keywords_search results through without the summarizer."""
+
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage
+
+from src.models_gen.Agentic_CoT_RAG import tool
+
+DOCS = [
+    {
+        "metadata": {"title": "Budget", "author": "Ann", "department": "finance", "section_title": "Overview"},
+        "page_content": "Spending rose.",
+    },
+    {
+        "metadata": {"title": "Hiring", "author": "Bo", "department": "hr", "section_title": "Plan"},
+        "page_content": "Two roles open.",
+    },
+]
+
+
+@pytest.fixture
+def passthrough(monkeypatch):
+    """Use fixed pass-through thresholds."""
+    config = {"enabled": True, "max_documents": 2, "max_characters": 100, "max_distance": 0.3}
+    monkeypatch.setattr(tool, "passthrough_config", config)
+    return config
+
+
+class TestShouldPassThrough:
+    """Test suite for _should_pass_through."""
+
+    def test_small_close_results_pass_through(self, passthrough):
+        """Results within every threshold skip the summarizer."""
+        assert tool._should_pass_through(DOCS, [0.1, 0.3])
+
+    def test_disabled(self, passthrough):
+        """Disabling pass-through always summarizes."""
+        passthrough["enabled"] = False
+        assert not tool._should_pass_through(DOCS, [0.1, 0.3])
+
+    def test_too_many_documents(self, passthrough):
+        """More documents than max_documents are summarized."""
+        passthrough["max_documents"] = 1
+        assert not tool._should_pass_through(DOCS, [0.1, 0.3])
+
+    def test_too_many_characters(self, passthrough):
+        """Documents longer in total than max_characters are summarized."""
+        passthrough["max_characters"] = len("Spending rose.Two roles open.") - 1
+        assert not tool._should_pass_through(DOCS, [0.1, 0.3])
+
+    def test_distant_document(self, passthrough):
+        """A single document beyond max_distance makes the whole result summarized."""
+        assert not tool._should_pass_through(DOCS, [0.1, 0.31])
+
+
+class TestFormatDocuments:
+    """Test suite for _format_documents."""
+
+    def test_summarizer_layout(self):
+        """Documents use the summarizer's Markdown blocks, separated by '---' lines."""
+        assert tool._format_documents(DOCS) == (
+            "# Document: Budget\n"
+            "Spending rose.\n"
+            "## Author: Ann\n"
+            "## Department: finance\n"
+            "## Section: Overview\n"
+            "\n---\n"
+            "# Document: Hiring\n"
+            "Two roles open.\n"
+            "## Author: Bo\n"
+            "## Department: hr\n"
+            "## Section: Plan\n"
+        )
+
+    def test_missing_metadata_is_blank(self):
+        """Absent metadata fields leave their lines empty."""
+        assert tool._format_documents([{"metadata": {}, "page_content": "text"}]) == (
+            "# Document: \ntext\n## Author: \n## Department: \n## Section: \n"
+        )
+
+
+@pytest.fixture
+def search(monkeypatch, passthrough):
+    """Stub embeddings, vector search and the summarizer, recording summarizer calls."""
+    summarized = []
+
+    async def aembed_documents(queries):
+        return [[0.0] for _ in queries]
+
+    async def vector_search(vector, k, **filters):
+        return [(Document(page_content=doc["page_content"], metadata=doc["metadata"]), 0.1) for doc in DOCS]
+
+    async def ainvoke(prompt):
+        summarized.append(prompt)
+        return AIMessage("summary")
+
+    monkeypatch.setattr(tool, "retrieval_config", {"mode": "vector", "k": 10})
+    monkeypatch.setattr(tool, "mmr_config", {"enabled": False})
+    monkeypatch.setattr(tool, "embeddings", SimpleNamespace(aembed_documents=aembed_documents))
+    monkeypatch.setattr(tool, "vector_search", vector_search)
+    monkeypatch.setattr(tool, "chat_model", SimpleNamespace(ainvoke=ainvoke))
+    return summarized
+
+
+class TestRunSearch:
+    """Test suite for the pass-through path of keywords_search."""
+
+    @pytest.mark.asyncio
+    async def test_pass_through_skips_summarizer(self, search):
+        """Small results are formatted directly, without calling the summarizer."""
+        command = await tool._run_search("budget", None, None, "call0")
+
+        assert search == []
+        assert tool._format_documents(DOCS) in command.update["messages"][0].content
+
+    @pytest.mark.asyncio
+    async def test_large_results_are_summarized(self, search, passthrough):
+        """Results over a threshold go through the summarizer."""
+        passthrough["max_documents"] = 1
+        command = await tool._run_search("budget", None, None, "call0")
+
+        assert len(search) == 1
+        assert "summary" in command.update["messages"][0].content
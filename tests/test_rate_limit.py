@@ -0,0 +1,100 @@
+"""Tests for the shared upstream rate limiter."""
+
+from contextlib import asynccontextmanager, contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from src import rate_limit
+from src.rate_limit import RateLimitExceeded, RateLimitSettings, UpstreamRateLimiter
+
+
+class FakeSession:
+    """Session returning fixed bucket levels and recording the statements it runs."""
+
+    def __init__(self, levels):
+        self.levels = levels
+        self.statements = []
+
+    def _execute(self, statement, params):
+        self.statements.append(str(statement))
+        return SimpleNamespace(all=lambda: [SimpleNamespace(level=level, rate=1.0) for level in self.levels])
+
+    def execute(self, statement, params=None):
+        return self._execute(statement, params)
+
+
+class FakeAsyncSession(FakeSession):
+    async def execute(self, statement, params=None):
+        return self._execute(statement, params)
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    """A limiter on fake sessions with 10 chat requests per minute and a 5 second cap."""
+    sessions = {}
+
+    @contextmanager
+    def get_session():
+        yield sessions["sync"]
+
+    @asynccontextmanager
+    async def get_async_session():
+        yield sessions["async"]
+
+    monkeypatch.setattr(rate_limit, "db_manager", SimpleNamespace(get_session=get_session, get_async_session=get_async_session))
+    monkeypatch.setattr(rate_limit.time, "sleep", lambda seconds: None)
+
+    async def no_sleep(seconds):
+        pass
+
+    monkeypatch.setattr(rate_limit.asyncio, "sleep", no_sleep)
+
+    limiter = UpstreamRateLimiter(RateLimitSettings(chat_rpm=10, max_wait_seconds=5.0, _env_file=None))
+    limiter._table_ready = True
+
+    def use(level):
+        sessions["sync"], sessions["async"] = FakeSession([level]), FakeAsyncSession([level])
+        return sessions
+
+    limiter.use = use
+    return limiter
+
+
+class TestUpstreamRateLimiter:
+    """Test suite for UpstreamRateLimiter."""
+
+    @pytest.mark.asyncio
+    async def test_waits_for_a_due_reservation(self, limiter):
+        """A reservation due within the cap waits for it and keeps the debit."""
+        sessions = limiter.use(-3.0)
+
+        assert await limiter.acquire("chat", 100) == 3.0
+        assert len(sessions["async"].statements) == 1
+
+    @pytest.mark.asyncio
+    async def test_rejects_and_refunds_beyond_the_cap(self, limiter):
+        """A reservation due after the cap is refunded and rejected."""
+        sessions = limiter.use(-30.0)
+
+        with pytest.raises(RateLimitExceeded) as error:
+            await limiter.acquire("chat", 100)
+
+        assert error.value.wait == 30.0
+        assert sessions["async"].statements[-1].startswith("UPDATE upstream_rate_buckets")
+
+    def test_sync_rejects_and_refunds_beyond_the_cap(self, limiter):
+        """acquire_sync refunds and rejects like acquire."""
+        sessions = limiter.use(-30.0)
+
+        with pytest.raises(RateLimitExceeded):
+            limiter.acquire_sync("chat", 100)
+
+        assert sessions["sync"].statements[-1].startswith("UPDATE upstream_rate_buckets")
+
+    def test_unlimited_kind_skips_the_database(self, limiter):
+        """Requests without a configured quota are not limited."""
+        sessions = limiter.use(-30.0)
+
+        assert limiter.acquire_sync("embedding", 100) == 0.0
+        assert sessions["sync"].statements == []
@@ -0,0 +1,47 @@
+"""Tests for the readiness checks of the Agentic CoT RAG model."""
+
+import pytest
+
+import src.models_gen.Agentic_CoT_RAG as agentic
+
+
+@pytest.fixture
+def checks(monkeypatch):
+    """Stub the collection and upstream probes with switchable failures."""
+    failing = set()
+
+    def probe(name, result):
+        async def check():
+            if name in failing:
+                raise RuntimeError(f"{name} unavailable")
+            return result
+        return check
+
+    monkeypatch.setattr(agentic, "check_collection", probe("collection", {"ready": True, "documents": True}))
+    monkeypatch.setattr(agentic, "check_upstream", probe("upstream", {"ready": True, "model": "gpt"}))
+    return failing
+
+
+class TestReadiness:
+    """Test suite for AgenticCoTRAGModelGenerator.readiness."""
+
+    @pytest.mark.asyncio
+    async def test_all_checks_pass(self, checks):
+        """A reachable collection and upstream are ready and not degraded."""
+        result = await agentic.AgenticCoTRAGModelGenerator().readiness()
+        assert result["ready"] and not result["degraded"]
+
+    @pytest.mark.asyncio
+    async def test_upstream_failure_is_degraded(self, checks):
+        """An unreachable upstream degrades the worker without failing readiness."""
+        checks.add("upstream")
+        result = await agentic.AgenticCoTRAGModelGenerator().readiness()
+        assert result["ready"] and result["degraded"]
+        assert result["upstream"] == {"ready": False, "error": "upstream unavailable"}
+
+    @pytest.mark.asyncio
+    async def test_collection_failure_is_not_ready(self, checks):
+        """A missing collection fails readiness."""
+        checks.add("collection")
+        result = await agentic.AgenticCoTRAGModelGenerator().readiness()
+        assert not result["ready"]
@@ -0,0 +1,63 @@
+"""Tests for MMR reranking of the Agentic CoT RAG retrieval results."""
+
+import numpy as np
+
+from src.models_gen.Agentic_CoT_RAG.rerank import mmr
+
+
+def rank_relevance(n: int) -> np.ndarray:
+    """Relevance from rank alone, from 1.0 (first) decreasing linearly towards 0.0."""
+    return 1.0 - np.arange(n, dtype=np.float32) / max(n, 1)
+
+
+def clustered_embeddings(clusters: int, per_cluster: int, dimensions: int = 64) -> np.ndarray:
+    """Build near-duplicate embeddings, ordered cluster by cluster."""
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(clusters, dimensions))
+    noise = 0.01 * rng.normal(size=(clusters * per_cluster, dimensions))
+    return np.repeat(centers, per_cluster, axis=0) + noise
+
+
+class TestMMR:
+    """Test suite for mmr."""
+
+    def test_skips_near_duplicates(self):
+        """Each cluster of near-duplicate chunks contributes one hit before any repeats."""
+        embeddings = clustered_embeddings(clusters=4, per_cluster=5)
+
+        selected = mmr(rank_relevance(len(embeddings)), embeddings, k=4)
+
+        assert selected[0] == 0
+        assert sorted(index // 5 for index in selected) == [0, 1, 2, 3]
+
+    def test_relevance_only_keeps_rank_order(self):
+        """With lambda_mult=1.0 the candidates are returned in relevance order."""
+        embeddings = clustered_embeddings(clusters=2, per_cluster=3)
+
+        selected = mmr(rank_relevance(len(embeddings)), embeddings, k=6, lambda_mult=1.0)
+
+        assert selected == [0, 1, 2, 3, 4, 5]
+
+    def test_k_larger_than_pool(self):
+        """Every candidate is selected once when k exceeds the pool size."""
+        embeddings = clustered_embeddings(clusters=2, per_cluster=2)
+
+        selected = mmr(rank_relevance(len(embeddings)), embeddings, k=10)
+
+        assert sorted(selected) == [0, 1, 2, 3]
+
+    def test_empty_pool(self):
+        """No candidates yields no selection."""
+        assert mmr([], np.empty((0, 8)), k=5) == []
+
+    def test_uses_score_gaps_not_only_rank(self):
+        """A much weaker distinct hit does not displace a strong near-duplicate, unlike with rank scores."""
+        rng = np.random.default_rng(1)
+        strong = rng.normal(size=64)
+        embeddings = np.stack([strong, strong + 0.01 * rng.normal(size=64), rng.normal(size=64)])
+
+        by_score = mmr([0.9, 0.88, 0.1], embeddings, k=2, lambda_mult=0.7)
+        by_rank = mmr(rank_relevance(3), embeddings, k=2, lambda_mult=0.7)
+
+        assert by_score == [0, 1]
+        assert by_rank == [0, 2]
@@ -0,0 +1,102 @@
+"""Tests for the adaptive top-k cut and filtered searches of the Agentic CoT RAG retrieval."""
+
+import sqlite3
+
+import pytest
+
+from src.models_gen.Agentic_CoT_RAG import index, retrieval
+from src.models_gen.Agentic_CoT_RAG.thresholds import pseudo_query
+
+
+@pytest.fixture
+def run_cut(monkeypatch):
+    """Run the vector_cut CTE over given candidate distances (SQLite stands in for Postgres)."""
+    monkeypatch.setattr(
+        retrieval,
+        "vector_candidates_sql",
+        lambda where, limit, storage=None, exact=False: f"SELECT id, distance FROM candidates WHERE {where} ORDER BY distance LIMIT {limit}",
+    )
+
+    def run(distances, min_k=3, max_distance=None, elbow_gap=None):
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE TABLE candidates (id TEXT, distance REAL)")
+        conn.executemany("INSERT INTO candidates VALUES (?, ?)", [(f"c{i}", d) for i, d in enumerate(distances)])
+        sql = f"WITH {retrieval._vector_ranked_sql('1 = 1', 'CAST(:k AS int)')} SELECT id FROM vector_cut ORDER BY distance"
+        params = {"k": len(distances), "min_k": min_k, "max_distance": max_distance, "elbow_gap": elbow_gap}
+        return [row[0] for row in conn.execute(sql, params)]
+
+    return run
+
+
+class TestAdaptiveCut:
+    """Test suite for the vector_cut CTE."""
+
+    def test_no_thresholds_keeps_every_candidate(self, run_cut):
+        """NULL thresholds disable both cuts."""
+        assert run_cut([0.1, 0.2, 0.9, 0.95]) == ["c0", "c1", "c2", "c3"]
+
+    def test_gap_cuts_after_the_elbow(self, run_cut):
+        """Hits after the first large gap beyond min_k are dropped."""
+        distances = [0.10, 0.12, 0.14, 0.16, 0.50, 0.52]
+
+        assert run_cut(distances, min_k=3, elbow_gap=0.2) == ["c0", "c1", "c2", "c3"]
+
+    def test_gap_within_min_k_is_ignored(self, run_cut):
+        """A large gap among the first min_k hits does not cut the ranking."""
+        distances = [0.10, 0.50, 0.52, 0.54, 0.90]
+
+        assert run_cut(distances, min_k=3, elbow_gap=0.2) == ["c0", "c1", "c2", "c3"]
+
+    def test_max_distance_drops_distant_hits(self, run_cut):
+        """Hits farther than max_distance are dropped, even below min_k."""
+        distances = [0.10, 0.30, 0.60, 0.70]
+
+        assert run_cut(distances, min_k=3, max_distance=0.5) == ["c0", "c1"]
+
+
+class TestFilteredSearch:
+    """Test suite for searches with title or department filters."""
+
+    def test_exact_search_bypasses_the_ann_index(self):
+        """Exact candidates order by an expression no index matches."""
+        sql = retrieval.vector_candidates_sql("1 = 1", ":k", storage="binary", exact=True)
+
+        assert "+ 0 LIMIT :k" in sql
+        assert "binary_quantize" not in sql
+
+    def test_iterative_scan_requires_pgvector_0_8(self):
+        """Iterative scans are enabled from pgvector 0.8.0 on."""
+        assert not index._supports_iterative_scan("0.7.4")
+        assert index._supports_iterative_scan("0.8.0")
+        assert index._supports_iterative_scan("1.0")
+        assert not index._supports_iterative_scan(None)
+
+    def test_settings_enable_iterative_scan(self, monkeypatch):
+        """A pgvector 0.8 database gets the iterative scan settings."""
+        monkeypatch.setitem(index._pgvector, "iterative_scan", None)
+
+        settings = index._connection_settings(lambda: "0.8.0")
+
+        assert settings["hnsw.iterative_scan"] == index.vector_index_config["iterative_scan"]
+        assert settings["ivfflat.iterative_scan"] == "relaxed_order"
+
+
+class TestRelevance:
+    """Test suite for the relevance passed to MMR."""
+
+    @pytest.mark.parametrize("distance, expected", [("cosine", 0.75), ("euclidean", 0.8), ("inner_product", -0.25)])
+    def test_relevance_per_distance_strategy(self, monkeypatch, distance, expected):
+        """Relevance is the similarity matching the configured distance strategy."""
+        monkeypatch.setitem(retrieval.vector_index_config, "distance", distance)
+
+        value, = sqlite3.connect(":memory:").execute(f"SELECT {retrieval._relevance('0.25')}").fetchone()
+
+        assert value == pytest.approx(expected)
+
+
+class TestPseudoQuery:
+    """Test suite for pseudo_query."""
+
+    def test_keeps_leading_words(self):
+        """Stand-in queries are the first words of the chunk, whitespace collapsed."""
+        assert pseudo_query("Quarterly  revenue\ngrew by ten percent in", words=4) == "Quarterly revenue grew by"
@@ -0,0 +1,87 @@
+"""Tests for resuming Agentic CoT RAG conversations from session checkpoints."""
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel, agenerate_from_stream
+from langchain_core.messages import AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGenerationChunk
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import END, StateGraph
+from langgraph.prebuilt import create_react_agent
+
+import src.models_gen.Agentic_CoT_RAG as agentic
+from src.models import Message
+from src.models_gen.Agentic_CoT_RAG.state import AgenticCoTRAGState
+
+
+class EchoModel(BaseChatModel):
+    """Agent model answering with the user messages it was given."""
+
+    @property
+    def _llm_type(self) -> str:
+        return "echo"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        raise NotImplementedError
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        seen = " | ".join(message.content for message in messages if isinstance(message, HumanMessage))
+        yield ChatGenerationChunk(message=AIMessageChunk(content=seen, response_metadata={"finish_reason": "stop"}))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        return await agenerate_from_stream(self._astream(messages, stop=stop, **kwargs))
+
+
+@pytest.fixture
+def generator(monkeypatch):
+    """A generator whose session graph checkpoints in memory."""
+    workflow = StateGraph(AgenticCoTRAGState)
+    workflow.add_node("react_agent", create_react_agent(model=EchoModel(), tools=[], state_schema=AgenticCoTRAGState))
+    workflow.set_entry_point("react_agent")
+    workflow.add_edge("react_agent", END)
+    session_graph = workflow.compile(checkpointer=InMemorySaver())
+
+    async def get_session_graph():
+        return session_graph
+
+    monkeypatch.setattr(agentic, "graph", workflow.compile())
+    monkeypatch.setattr(agentic, "get_session_graph", get_session_graph)
+    monkeypatch.setitem(agentic.checkpoint_config, "enabled", True)
+    return agentic.AgenticCoTRAGModelGenerator()
+
+
+async def answer(generator, content: str, session_id=None) -> str:
+    """Run one turn with a single user message."""
+    messages = [Message(role="user", content=content)]
+    return "".join([chunk async for chunk in generator.generate(messages, session_id=session_id)])
+
+
+class TestSessions:
+    """Test suite for session checkpointing in generate."""
+
+    @pytest.mark.asyncio
+    async def test_session_resumes_earlier_messages(self, generator):
+        """A second turn with the same session id sees the messages of the first."""
+        assert await answer(generator, "first", session_id="s1") == "first"
+        assert await answer(generator, "second", session_id="s1") == "first | second"
+
+    @pytest.mark.asyncio
+    async def test_sessions_are_separate(self, generator):
+        """Turns of another session do not see each other's messages."""
+        await answer(generator, "first", session_id="s1")
+        assert await answer(generator, "other", session_id="s2") == "other"
+
+    @pytest.mark.asyncio
+    async def test_without_session_id_is_stateless(self, generator):
+        """Requests without a session id keep no state between turns."""
+        await answer(generator, "first")
+        assert await answer(generator, "second") == "second"
+
+    @pytest.mark.asyncio
+    async def test_disabled_checkpointing_is_stateless(self, generator, monkeypatch):
+        """With checkpointing disabled a session id is ignored."""
+        monkeypatch.setitem(agentic.checkpoint_config, "enabled", False)
+        await answer(generator, "first", session_id="s1")
+        assert await answer(generator, "second", session_id="s1") == "second"
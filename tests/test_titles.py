@@ -0,0 +1,23 @@
+"""Tests for routing title-filtered searches to department partitions."""
+
+from src.models_gen.Agentic_CoT_RAG.titles import common_department
+
+
+class TestCommonDepartment:
+    """Test suite for common_department."""
+
+    def test_titles_of_one_department(self):
+        departments = {"A": "finance", "B": "finance"}
+        assert common_department(["A", "B"], departments) == "finance"
+
+    def test_title_spanning_departments_disables_routing(self):
+        """A multi-department title (stored as NULL) must not narrow the search to the other title's partition."""
+        departments = {"A": "finance", "B": None}
+        assert common_department(["A", "B"], departments) is None
+
+    def test_titles_of_different_departments(self):
+        departments = {"A": "finance", "B": "legal"}
+        assert common_department(["A", "B"], departments) is None
+
+    def test_unknown_title_disables_routing(self):
+        assert common_department(["A", "C"], {"A": "finance"}) is None